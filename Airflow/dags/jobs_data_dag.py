@@ -14,7 +14,9 @@ sys.path.append(dag_folder)
 
 # Import functions from your scripts
 from multijob_transformed import extract_jobs_for_title, save_to_csv, save_to_json
-from upload_table import update_snowflake_from_csv
+from upload_table import update_snowflake_from_csv, notify_listings_reload
+from search_index_artifact import build_search_index_artifact
+from listing_aggregates import materialize_listing_aggregates
 
 # Define default arguments
 default_args = {
@@ -89,6 +91,29 @@ def upload_to_snowflake():
         print(f"Error uploading to Snowflake: {str(e)}")
         raise e
 
+def build_search_index():
+    """Function to build and publish the search index artifact, then tell the API to reload"""
+    try:
+        print("Starting search index build")
+        build_search_index_artifact()
+        print("Search index build completed successfully")
+    except Exception as e:
+        print(f"Error building search index: {str(e)}")
+        raise e
+    finally:
+        # Reload even if the build failed; the API then builds the indexes itself
+        notify_listings_reload()
+
+def materialize_aggregates():
+    """Function to precompute the dashboard aggregate table from the new listings"""
+    try:
+        print("Starting aggregate materialization")
+        materialize_listing_aggregates()
+        print("Aggregate materialization completed successfully")
+    except Exception as e:
+        print(f"Error materializing aggregates: {str(e)}")
+        raise e
+
 # Create the DAG
 with DAG(
     'job_scraping_and_upload_dag',
@@ -114,5 +139,20 @@ with DAG(
         dag=dag,
     )
     
+    # Task 3: Build the search index artifact the API memory-maps
+    build_search_index_task = PythonOperator(
+        task_id='build_search_index',
+        python_callable=build_search_index,
+        dag=dag,
+    )
+    
+    # Task 4: Precompute the dashboard aggregates
+    materialize_aggregates_task = PythonOperator(
+        task_id='materialize_aggregates',
+        python_callable=materialize_aggregates,
+        dag=dag,
+    )
+    
     # Set task dependencies
-    scrape_jobs_task >> upload_to_snowflake_task  # Run scraping first, then upload
\ No newline at end of file
+    scrape_jobs_task >> upload_to_snowflake_task  # Run scraping first, then upload
+    upload_to_snowflake_task >> [build_search_index_task, materialize_aggregates_task]  # Then index and aggregate
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import sys
+
+# Aggregate definitions are shared with the API (see search_index_artifact.py for the mount)
+SEARCH_SERVICE_PATH = os.getenv('SEARCH_SERVICE_PATH', '/opt/airflow/fastapi_services')
+if not os.path.isdir(SEARCH_SERVICE_PATH):
+    SEARCH_SERVICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'FastAPI_Services')
+sys.path.append(SEARCH_SERVICE_PATH)
+
+from analytics import AGGREGATES_TABLE, materialize_aggregates_sql
+from index_artifact import listings_version
+from upload_table import get_snowflake_connection
+
+def materialize_listing_aggregates():
+    """
+    Precompute the unfiltered dashboard aggregates of JOBLISTINGS into AGGREGATES_TABLE.
+    - Counts per location, company, title, search query, posted date and salary amount
+    - Rows are tagged with the table fingerprint, so the API ignores a stale table
+    Returns the number of aggregate rows written.
+    """
+    print("Connecting to Snowflake...")
+    conn = get_snowflake_connection()
+    try:
+        cursor = conn.cursor()
+        version = listings_version(cursor)
+        if version is None:
+            raise ValueError("JOBLISTINGS table not found; nothing to aggregate")
+
+        print(f"Materializing {AGGREGATES_TABLE} for table version {version}")
+        cursor.execute(materialize_aggregates_sql(), {"version": version})
+        cursor.execute(f"SELECT COUNT(*) FROM {AGGREGATES_TABLE}")
+        row_count = cursor.fetchone()[0]
+        print(f"{AGGREGATES_TABLE} now holds {row_count} rows")
+        return row_count
+    finally:
+        if "cursor" in locals():
+            cursor.close()
+        conn.close()
+        print("Snowflake connection closed")
+
+if __name__ == "__main__":
+    materialize_listing_aggregates()
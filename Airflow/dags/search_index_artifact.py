@@ -0,0 +1,94 @@
+import os
+import sys
+
+import boto3
+from dotenv import load_dotenv
+
+# The index code lives with the API (mounted read-only by docker-compose); fall back to the repo layout
+SEARCH_SERVICE_PATH = os.getenv('SEARCH_SERVICE_PATH', '/opt/airflow/fastapi_services')
+if not os.path.isdir(SEARCH_SERVICE_PATH):
+    SEARCH_SERVICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'FastAPI_Services')
+sys.path.append(SEARCH_SERVICE_PATH)
+
+from index_artifact import listings_version, upload_artifact, write_artifact
+from listings_snapshot import ListingsSnapshot
+from search_index import BM25Index
+from vector_index import VectorIndex
+from upload_table import get_snowflake_connection
+
+LISTING_COLUMNS = [
+    'JOB_ID', 'SEARCH_QUERY', 'TITLE', 'COMPANY', 'LOCATION', 'DESCRIPTION',
+    'POSTED_AT', 'POSTED_DATE', 'APPLY_LINKS', 'JOB_HIGHLIGHTS'
+]
+
+# Attempts at reading the rows while the table version stays the same
+SNAPSHOT_READ_ATTEMPTS = 3
+
+def read_consistent_snapshot(cursor):
+    """
+    Read (version, columns, rows) of JOBLISTINGS such that the rows belong to that version:
+    the fingerprint is read before and after the SELECT, and the read is retried if a
+    reload landed in between.
+    """
+    for attempt in range(SNAPSHOT_READ_ATTEMPTS):
+        version = listings_version(cursor)
+        cursor.execute(f"SELECT {', '.join(LISTING_COLUMNS)} FROM JOBLISTINGS")
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        if listings_version(cursor) == version:
+            return version, columns, rows
+        print(f"JOBLISTINGS changed while it was read (attempt {attempt + 1}); reading again")
+    raise RuntimeError("JOBLISTINGS kept changing while it was read; not building an index artifact")
+
+def build_search_index_artifact(output_dir='/opt/airflow/data/search_index'):
+    """
+    Build the BM25 and semantic indexes for the current JOBLISTINGS table and publish them
+    as an immutable artifact keyed by the table fingerprint, which the API loads (index
+    arrays memory-mapped) instead of rebuilding the indexes itself.
+    - Writes the artifact under output_dir/<artifact id>/
+    - Uploads it to s3://AWS_S3_BUCKET_NAME/SEARCH_INDEX_S3_PREFIX/<artifact id>/
+    Returns the local artifact path.
+    """
+    load_dotenv()
+
+    print("Connecting to Snowflake...")
+    conn = get_snowflake_connection()
+    try:
+        cursor = conn.cursor()
+        # Same fingerprint the API checks, so it can find the artifact for the table it sees
+        version, columns, rows = read_consistent_snapshot(cursor)
+    finally:
+        if "cursor" in locals():
+            cursor.close()
+        conn.close()
+        print("Snowflake connection closed")
+
+    if version is None:
+        raise ValueError("JOBLISTINGS table not found; nothing to index")
+    print(f"Indexing {len(rows)} listings for table version {version}")
+
+    snapshot = ListingsSnapshot(version, columns, rows, [])
+    bm25 = BM25Index.build(snapshot.rows)
+    print(f"BM25 index: {bm25.stats()}")
+    vectors = VectorIndex.build(snapshot.rows, dim=int(os.getenv('SEMANTIC_VECTOR_DIM', '128')))
+    print(f"Vector index: {vectors.stats()}")
+
+    path = write_artifact(output_dir, snapshot, bm25, vectors)
+    print(f"Search index artifact written to {path}")
+
+    bucket = os.getenv('AWS_S3_BUCKET_NAME')
+    prefix = os.getenv('SEARCH_INDEX_S3_PREFIX', 'search-index')
+    if bucket and prefix:
+        s3_client = boto3.client(
+            's3',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        )
+        key = upload_artifact(s3_client, bucket, prefix, path)
+        print(f"Search index artifact uploaded to s3://{bucket}/{key}")
+    else:
+        print("AWS_S3_BUCKET_NAME/SEARCH_INDEX_S3_PREFIX not set; artifact kept locally only")
+    return path
+
+if __name__ == "__main__":
+    build_search_index_artifact()
@@ -3,6 +3,7 @@ import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
 from dotenv import load_dotenv
 import os
+import urllib.request
 
 def update_snowflake_from_csv(csv_file='tech_jobs.csv'):
     """
@@ -14,15 +15,9 @@ def update_snowflake_from_csv(csv_file='tech_jobs.csv'):
         # Load environment variables
         load_dotenv()
         
-        # Get Snowflake credentials from environment variables
-        snowflake_user = os.getenv('SNOWFLAKE_USER')
-        snowflake_password = os.getenv('SNOWFLAKE_PASSWORD')
-        snowflake_account = os.getenv('SNOWFLAKE_ACCOUNT')
-        snowflake_warehouse = os.getenv('SNOWFLAKE_WAREHOUSE')
+        # Target database and schema; get_snowflake_connection reads the credentials
         snowflake_database = os.getenv('SNOWFLAKE_JOBSDB')
         snowflake_schema = os.getenv('SNOWFLAKE_SCHEMA')
-        #snowflake_role = os.getenv('SNOWFLAKE_ROLE')
-        snowflake_role = 'ACCOUNTADMIN'
         
         # Verify all required environment variables are present
         required_vars = [
@@ -85,15 +80,7 @@ def update_snowflake_from_csv(csv_file='tech_jobs.csv'):
         
         # Create Snowflake connection
         print("Connecting to Snowflake...")
-        conn = snowflake.connector.connect(
-            user=snowflake_user,
-            password=snowflake_password,
-            account=snowflake_account,
-            warehouse=snowflake_warehouse,
-            role=snowflake_role,
-            database=snowflake_database,
-            schema=snowflake_schema
-        )
+        conn = get_snowflake_connection()
         
         try:
             cursor = conn.cursor()
@@ -144,5 +131,37 @@ def update_snowflake_from_csv(csv_file='tech_jobs.csv'):
         print(f"Error updating Snowflake table: {str(e)}")
         raise
 
+def get_snowflake_connection():
+    """Connection to the JOBLISTINGS database, for the upload and the tasks that run after it."""
+    load_dotenv()
+    return snowflake.connector.connect(
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        role='ACCOUNTADMIN',
+        database=os.getenv('SNOWFLAKE_JOBSDB'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA')
+    )
+
+def notify_listings_reload():
+    """
+    Ask the FastAPI service to refresh its in-memory JOBLISTINGS snapshot; the DAG calls
+    this once the search index artifact for the new table has been published.
+    Skipped unless LISTINGS_RELOAD_URL and LISTINGS_RELOAD_TOKEN are set; a failure only
+    delays the refresh until the service's next scheduled check.
+    """
+    reload_url = os.getenv('LISTINGS_RELOAD_URL')
+    reload_token = os.getenv('LISTINGS_RELOAD_TOKEN')
+    if not reload_url or not reload_token:
+        print("LISTINGS_RELOAD_URL/LISTINGS_RELOAD_TOKEN not set; skipping API snapshot reload")
+        return
+    try:
+        request = urllib.request.Request(reload_url, method='POST', headers={'X-Reload-Token': reload_token})
+        with urllib.request.urlopen(request, timeout=120) as response:
+            print(f"API snapshot reload: {response.status} {response.read().decode('utf-8')}")
+    except Exception as e:
+        print(f"API snapshot reload failed: {str(e)}")
+
 if __name__ == "__main__":
     update_snowflake_from_csv()
\ No newline at end of file
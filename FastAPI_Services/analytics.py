@@ -0,0 +1,173 @@
+import re
+
+import numpy as np
+
+from search_index import top_k
+
+# First dollar amount in a description, e.g. "$120,000"; the SQL path uses the same pattern
+SALARY_PATTERN = re.compile(r"\$([\d,]+)")
+SALARY_SQL_PATTERN = "[$]([0-9,]+)"
+SALARY_SQL_EXPRESSION = f"TRY_TO_NUMBER(REPLACE(REGEXP_SUBSTR(DESCRIPTION, '{SALARY_SQL_PATTERN}', 1, 1, 'e', 1), ',', ''))"
+
+# Words of JOB_HIGHLIGHTS counted for the skills word cloud; the SQL path uses the same pattern
+HIGHLIGHT_TERM_PATTERN = re.compile(r"[a-z][a-z0-9+#]+")
+HIGHLIGHT_TERM_SQL_PATTERN = "[a-z][a-z0-9+#]+"
+HIGHLIGHT_STOPWORDS = frozenset("""
+    about above after all also an and any are as at be been being both but by can could did do does doing
+    each etc for from had has have having he her here his how if in into is it its just may more most must
+    no nor not of on once only or other our out over own per same she should so some such than that the
+    their them then there these they this those through to too under until up us very was we were what
+    when where which while who whom why will with within would you your
+""".split())
+
+# Unfiltered JOBLISTINGS aggregates materialized by the Airflow DAG after each load: one row
+# per (DIMENSION, VALUE) with its count N, tagged with the table fingerprint it was built from
+AGGREGATES_TABLE = "JOBLISTINGS_AGGREGATES"
+AGGREGATE_COLUMNS = ("LOCATION", "COMPANY", "TITLE", "SEARCH_QUERY", "POSTED_DATE")
+
+
+def salary_amount(text):
+    """The first dollar amount mentioned in `text` as a float, or None."""
+    match = SALARY_PATTERN.search(text) if text else None
+    digits = match.group(1).replace(",", "") if match else ""
+    return float(digits) if digits else None
+
+
+def salary_stats(amounts, top_n=10):
+    """Summary of an array of salary amounts: count, quartiles and the most mentioned amounts."""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if not len(amounts):
+        return {"mentions": 0, "min": None, "p25": None, "median": None, "p75": None, "max": None, "top": []}
+    p25, median, p75 = np.percentile(amounts, [25, 50, 75])
+    values, counts = np.unique(amounts, return_counts=True)
+    order = np.lexsort((values, -counts))[:top_n]
+    return {
+        "mentions": int(len(amounts)),
+        "min": float(amounts.min()),
+        "p25": float(p25),
+        "median": float(median),
+        "p75": float(p75),
+        "max": float(amounts.max()),
+        "top": [{"value": float(values[i]), "count": int(counts[i])} for i in order],
+    }
+
+
+class SalaryIndex:
+    """
+    First salary amount of every listing in a ListingsSnapshot (NaN when none), extracted
+    once per snapshot so salary stats under any filter are a masked array reduction.
+    """
+
+    def __init__(self, amounts):
+        self.amounts = amounts
+
+    @classmethod
+    def build(cls, documents):
+        amounts = np.fromiter(
+            (np.nan if (amount := salary_amount(document.get("DESCRIPTION"))) is None else amount
+             for document in documents),
+            dtype=np.float64,
+            count=len(documents),
+        )
+        return cls(amounts)
+
+    def summarize(self, mask=None, top_n=10):
+        """salary_stats() of the listings selected by the boolean `mask` (all by default)."""
+        amounts = self.amounts if mask is None else self.amounts[mask]
+        return salary_stats(amounts[~np.isnan(amounts)], top_n)
+
+    def stats(self):
+        return {
+            "documents": len(self.amounts),
+            "with_salary": int(np.count_nonzero(~np.isnan(self.amounts))),
+            "bytes": int(self.amounts.nbytes),
+        }
+
+
+def highlight_terms(text):
+    """Lower-cased words of `text` counted by the word cloud, stopwords removed."""
+    return [term for term in HIGHLIGHT_TERM_PATTERN.findall(text.lower()) if term not in HIGHLIGHT_STOPWORDS] if text else []
+
+
+class HighlightTermIndex:
+    """
+    Words of every listing's JOB_HIGHLIGHTS in a ListingsSnapshot, stored CSR-style
+    (`lengths[i]` term ids per listing, concatenated in `term_ids`), so the word counts
+    under any filter are one bincount of the masked term ids.
+    """
+
+    def __init__(self, terms, lengths, term_ids):
+        self.terms = terms
+        self.lengths = lengths
+        self.term_ids = term_ids
+
+    @classmethod
+    def build(cls, documents):
+        tokenized = [highlight_terms(document.get("JOB_HIGHLIGHTS")) for document in documents]
+        # Ids in alphabetical order, so equal counts rank alphabetically
+        terms = sorted({term for tokens in tokenized for term in tokens})
+        vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.int64, count=len(tokenized))
+        term_ids = np.fromiter(
+            (vocabulary[term] for tokens in tokenized for term in tokens), dtype=np.int32, count=int(lengths.sum())
+        )
+        return cls(terms, lengths, term_ids)
+
+    def counts(self, mask=None, top_n=100):
+        """[{"value", "count"}] of the most frequent words in the listings selected by `mask`."""
+        term_ids = self.term_ids if mask is None else self.term_ids[np.repeat(mask, self.lengths)]
+        counts = np.bincount(term_ids, minlength=len(self.terms))
+        present = top_k(counts, np.flatnonzero(counts), top_n)
+        return [{"value": self.terms[i], "count": int(counts[i])} for i in present]
+
+    def stats(self):
+        return {
+            "documents": len(self.lengths),
+            "terms": len(self.terms),
+            "tokens": len(self.term_ids),
+            "bytes": int(self.lengths.nbytes + self.term_ids.nbytes),
+        }
+
+
+def materialize_aggregates_sql(source_table="JOBLISTINGS", target_table=AGGREGATES_TABLE):
+    """
+    CREATE OR REPLACE statement for the aggregates table (bind `version`). Dimensions are
+    TOTAL, every AGGREGATE_COLUMNS column and SALARY (first dollar amount per description).
+    """
+    parts = [f"SELECT 'TOTAL' AS DIMENSION, CAST(NULL AS VARCHAR) AS VALUE, COUNT(*) AS N FROM {source_table}"]
+    parts += [
+        f"SELECT '{column}', CAST({column} AS VARCHAR), COUNT(*) FROM {source_table} "
+        f"WHERE {column} IS NOT NULL GROUP BY {column}"
+        for column in AGGREGATE_COLUMNS
+    ]
+    parts.append(
+        f"SELECT 'SALARY', CAST(AMOUNT AS VARCHAR), COUNT(*) FROM (SELECT {SALARY_SQL_EXPRESSION} AS AMOUNT "
+        f"FROM {source_table}) WHERE AMOUNT IS NOT NULL GROUP BY AMOUNT"
+    )
+    return (
+        f"CREATE OR REPLACE TABLE {target_table} AS "
+        f"SELECT U.*, %(version)s AS SOURCE_VERSION FROM ({' UNION ALL '.join(parts)}) U"
+    )
+
+
+def summarize_aggregates(rows, count_columns, top_n=10):
+    """
+    Turn materialized (DIMENSION, VALUE, N) rows into the /analytics response shape:
+    total, top-N counts per column, the POSTED_DATE series and salary stats.
+    """
+    by_dimension = {}
+    for dimension, value, count in rows:
+        by_dimension.setdefault(dimension, []).append((value, int(count)))
+    top = {
+        column: [{"value": value, "count": count}
+                 for value, count in sorted(by_dimension.get(column, []), key=lambda item: (-item[1], item[0]))[:top_n]]
+        for column in count_columns
+    }
+    salaries = by_dimension.get("SALARY", [])
+    amounts = np.repeat([float(value) for value, _ in salaries], [count for _, count in salaries])
+    return {
+        "total": sum(count for _, count in by_dimension.get("TOTAL", [])),
+        "top": top,
+        "posted_dates": [{"date": value, "count": count} for value, count in sorted(by_dimension.get("POSTED_DATE", []))],
+        "salary": salary_stats(amounts, top_n),
+    }
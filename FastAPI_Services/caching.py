@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with LRU eviction and a per-entry time-to-live.
+
+    Entries expire `ttl` seconds after they are written (never, if `ttl` is None); when
+    `max_entries` is reached the least recently used entry is evicted. Hit, miss and
+    eviction counters are kept for metrics.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at = item
+            if expires_at <= self._clock():
+                del self._data[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = float("inf") if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose key satisfies `predicate`; returns the number removed."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+        lookups = stats["hits"] + stats["misses"]
+        stats["max_entries"] = self.max_entries
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+class PersistentCache:
+    """
+    Two-level cache: an in-memory LRU in front of a local SQLite file that survives restarts.
+
+    Values must be JSON-serialisable. Every entry is stamped with `version`; entries written
+    under any other version are ignored and purged on open, so changing whatever the version
+    is derived from (a prompt, a map, a model name) invalidates the cache automatically.
+    `max_disk_bytes` additionally bounds the total size of the stored values, for caches
+    whose entries vary a lot in size.
+    """
+
+    def __init__(self, path, version, max_memory_entries=1024, max_disk_entries=50000, max_disk_bytes=None):
+        self.path = path
+        self.version = version
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = TTLCache(max_entries=max_memory_entries, ttl=None)
+        self._lock = threading.Lock()
+        self._stats = {"disk_hits": 0, "disk_misses": 0, "writes": 0, "disk_errors": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("DELETE FROM cache_entries WHERE version != ?", (version,))
+
+    def get(self, key, default=None):
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value FROM cache_entries WHERE key = ? AND version = ?", (key, self.version)
+                ).fetchone()
+                if row is None:
+                    self._stats["disk_misses"] += 1
+                    return default
+                with self._db:
+                    self._db.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._stats["disk_hits"] += 1
+        except sqlite3.Error as e:
+            print(f"Persistent cache read error: {str(e)}")
+            self._stats["disk_errors"] += 1
+            return default
+        value = json.loads(row[0])
+        self._memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self._memory.set(key, value)
+        payload = json.dumps(value)
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, version, value, last_access) VALUES (?, ?, ?, ?)",
+                    (key, self.version, payload, time.time()),
+                )
+                self._stats["writes"] += 1
+                self._prune()
+        except sqlite3.Error as e:
+            print(f"Persistent cache write error: {str(e)}")
+            self._stats["disk_errors"] += 1
+
+    def _prune(self):
+        # Keep the on-disk store bounded by dropping the least recently used rows
+        count = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+        if self.max_disk_bytes is not None:
+            # Keep the most recently used rows whose values fit in the byte budget
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(LENGTH(CAST(value AS BLOB))) OVER (ORDER BY last_access DESC, key) AS used "
+                "FROM cache_entries) WHERE used > ?)",
+                (self.max_disk_bytes,),
+            )
+
+    def invalidate(self, key):
+        self._memory.invalidate(key)
+        try:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Persistent cache delete error: {str(e)}")
+            self._stats["disk_errors"] += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self):
+        stats = self._memory.stats()
+        with self._lock:
+            stats.update(self._stats)
+            if self.max_disk_bytes is not None:
+                try:
+                    used = self._db.execute("SELECT SUM(LENGTH(CAST(value AS BLOB))) FROM cache_entries").fetchone()[0]
+                    stats.update({"disk_bytes": used or 0, "max_disk_bytes": self.max_disk_bytes})
+                except sqlite3.Error:
+                    pass
+        stats["version"] = self.version
+        return stats
@@ -0,0 +1,131 @@
+import hashlib
+import re
+import time
+import unicodedata
+
+import fitz
+
+# Bump when the output of process_document() changes so cached results are rebuilt
+PROCESSOR_VERSION = 1
+
+# Headings that start a section, by section name; matched against whole lines
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "objective", "career objective", "about me"),
+    "skills": ("skills", "technical skills", "core skills", "key skills", "core competencies", "competencies",
+               "technologies", "tools and technologies"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "relevant experience"),
+    "education": ("education", "academic background", "education and training", "qualifications"),
+    "projects": ("projects", "personal projects", "academic projects", "selected projects"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "awards"),
+}
+_HEADING_SECTIONS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# Text before the first recognised heading (name, contact details, a cover letter's body)
+PREAMBLE_SECTION = "header"
+
+# Tokenizer of the chat model the feedback prompts are sent to
+TOKEN_ENCODING = "o200k_base"
+# How long to use the word-count estimate before trying to load the encoding again
+TOKENIZER_RETRY_SECONDS = 300.0
+
+_BULLETS = re.compile(r"^[•‣▪●◦⁃∙■□➢–—*\-]+\s*", re.MULTILINE)
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_INLINE_SPACE = re.compile(r"[^\S\n]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_WORDS = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_failed_at = None
+
+
+def extract_pdf_text(pdf_bytes):
+    """Plain text of every page of a PDF, in page order."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+def normalize_text(text):
+    """
+    Canonical form of extracted text: NFKC (ligatures, full-width characters), re-joined
+    hyphenated line breaks, "- " for every bullet glyph, single spaces and at most one blank
+    line between paragraphs.
+    """
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHENATED_BREAK.sub(r"\1\2", text)
+    text = _INLINE_SPACE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = _BULLETS.sub("- ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _heading_section(line):
+    # Headings are short lines like "SKILLS", "Work Experience:" or "Education & Training"
+    words = line.rstrip(":").replace("&", "and").split()
+    if not words or len(words) > 4:
+        return None
+    return _HEADING_SECTIONS.get(" ".join(words).lower())
+
+
+def split_sections(text):
+    """
+    Split normalized text into {section: text} on SECTION_HEADINGS lines, in document order.
+    Anything before the first heading goes under PREAMBLE_SECTION; a repeated heading
+    appends to its section.
+    """
+    sections = {}
+    current, lines = PREAMBLE_SECTION, []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            sections[current] = f"{sections[current]}\n\n{body}" if current in sections else body
+
+    for line in text.split("\n"):
+        section = _heading_section(line)
+        if section is None:
+            lines.append(line)
+            continue
+        flush()
+        current, lines = section, []
+    flush()
+    return sections
+
+
+def count_tokens(text):
+    """
+    Prompt tokens in `text` under TOKEN_ENCODING. Falls back to counting words and
+    punctuation while the encoding cannot be loaded (tiktoken downloads it on first use),
+    and tries loading it again every TOKENIZER_RETRY_SECONDS.
+    """
+    global _encoding, _encoding_failed_at
+    if _encoding is None and (
+        _encoding_failed_at is None or time.monotonic() - _encoding_failed_at >= TOKENIZER_RETRY_SECONDS
+    ):
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            _encoding_failed_at = None
+        except Exception as e:
+            _encoding_failed_at = time.monotonic()
+            print(f"Could not load the {TOKEN_ENCODING} encoding, estimating tokens from words: {e}")
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(_WORDS.findall(text))
+
+
+def process_document(pdf_bytes, document_type):
+    """
+    Turn an uploaded resume or cover letter PDF into the structured form the feedback
+    endpoints use. Pure and picklable so it can run in a worker process.
+    """
+    text = normalize_text(extract_pdf_text(pdf_bytes))
+    sections = split_sections(text)
+    return {
+        "document_type": document_type,
+        "sha256": hashlib.sha256(pdf_bytes).hexdigest(),
+        "processor_version": PROCESSOR_VERSION,
+        "text": text,
+        "sections": sections,
+        "token_count": count_tokens(text),
+        "section_tokens": {name: count_tokens(body) for name, body in sections.items()},
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ResourceExecutors:
+    """
+    Bounded thread pools, one per class of blocking resource (Snowflake, S3, HTTP, LLM, CPU).
+
+    Async route handlers hand blocking calls to the pool for that resource so the event loop
+    keeps serving other requests while a call waits on I/O. Separate pools keep a burst of
+    slow LLM calls from starving database work, and vice versa.
+    """
+
+    def __init__(self, sizes):
+        self._sizes = dict(sizes)
+        self._executors = {}
+        self._lock = threading.Lock()
+        self._stats = {kind: {"submitted": 0, "active": 0, "completed": 0, "failed": 0} for kind in self._sizes}
+
+    def _get_executor(self, kind):
+        if kind not in self._sizes:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self._sizes[kind], thread_name_prefix=f"{kind}-worker")
+                self._executors[kind] = executor
+            return executor
+
+    def _track(self, kind, fn):
+        stats = self._stats[kind]
+        with self._lock:
+            stats["active"] += 1
+        try:
+            result = fn()
+        except BaseException:
+            with self._lock:
+                stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                stats["active"] -= 1
+                stats["completed"] += 1
+        return result
+
+    async def run(self, kind, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` on the `kind` pool and await its result."""
+        executor = self._get_executor(kind)
+        with self._lock:
+            self._stats[kind]["submitted"] += 1
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        return await loop.run_in_executor(executor, self._track, kind, call)
+
+    def stats(self):
+        """Per-pool worker limits, in-flight and queued call counts."""
+        with self._lock:
+            report = {}
+            for kind, size in self._sizes.items():
+                stats = dict(self._stats[kind])
+                pending = stats["submitted"] - stats["completed"]
+                stats.update({
+                    "max_workers": size,
+                    "queued": max(pending - stats["active"], 0),
+                })
+                report[kind] = stats
+            return report
+
+    def shutdown(self, wait=True):
+        """Stop every pool; pools are recreated lazily if used again."""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,114 @@
+import numpy as np
+
+from search_index import top_k
+
+# JOBLISTINGS columns exposed as multi-select facets
+FACET_FIELDS = ("LOCATION", "COMPANY", "SEARCH_QUERY", "POSTED_DATE")
+
+
+def _facet_value(value):
+    # POSTED_DATE may arrive as a date; facets and selections compare as strings
+    return None if value is None else str(value)
+
+
+class FacetIndex:
+    """
+    Bitmap index over the facet columns of a ListingsSnapshot.
+
+    Each column is dictionary-encoded: `values[field]` lists the distinct values and
+    `codes[field][doc]` is the position of a document's value plus one (0 for NULL). A
+    selection of values becomes a boolean bitmap with one lookup-table gather, so no
+    per-value bitmap has to be stored for high-cardinality columns like COMPANY, and facet
+    counts are a bincount of the codes under the combined bitmap. Document ids are row
+    positions in the snapshot the index was built from.
+    """
+
+    def __init__(self, values, codes, n_docs):
+        self.values = values
+        self.codes = codes
+        self.n_docs = n_docs
+        self._ids = {field: {value: i for i, value in enumerate(field_values)} for field, field_values in values.items()}
+
+    @classmethod
+    def build(cls, documents, fields=FACET_FIELDS):
+        """Index `documents`, a sequence of dicts keyed by column name."""
+        values, codes = {}, {}
+        for field in fields:
+            ids = {}
+            field_codes = np.fromiter(
+                (
+                    0 if value is None else ids.setdefault(value, len(ids)) + 1
+                    for value in (_facet_value(document.get(field)) for document in documents)
+                ),
+                dtype=np.int32,
+                count=len(documents),
+            )
+            values[field] = list(ids)
+            codes[field] = field_codes
+        return cls(values, codes, len(documents))
+
+    def bitmap(self, field, selected):
+        """Documents whose `field` is any of the `selected` values (OR within a facet)."""
+        lookup = np.zeros(len(self.values[field]) + 1, dtype=bool)
+        ids = self._ids[field]
+        for value in selected:
+            value_id = ids.get(str(value))
+            if value_id is not None:
+                lookup[value_id + 1] = True
+        return lookup[self.codes[field]]
+
+    def _value_counts(self, field, mask):
+        # Documents in `mask` per value id of `field` (NULLs dropped)
+        return np.bincount(self.codes[field][mask], minlength=len(self.values[field]) + 1)[1:]
+
+    def counts(self, field, mask, limit=10, value_counts=None):
+        """[{"value", "count"}] of `field` over the documents in `mask`, most frequent first."""
+        field_values = self.values[field]
+        counts = self._value_counts(field, mask) if value_counts is None else value_counts
+        present = np.flatnonzero(counts)
+        if limit:
+            present = top_k(counts, present, limit)
+        ranked = sorted((int(i) for i in present), key=lambda i: (-counts[i], field_values[i]))
+        return [{"value": field_values[i], "count": int(counts[i])} for i in ranked]
+
+    def select(self, selections, base=None, limit=100, fields=None):
+        """
+        Apply `selections` ({field: [values]}), AND across facets, on top of the optional
+        `base` bitmap. Returns (bitmap, facets) where facets maps every field to
+        [{"value", "count"}] sorted by count. Each field is counted under every selection
+        except its own, so the counts show what adding a value to that facet would match.
+        `limit` caps the values per facet (0 for all); selected values are always listed.
+        `fields` limits which facets are counted (all indexed fields by default).
+        """
+        bitmaps = {field: self.bitmap(field, values) for field, values in selections.items() if values}
+        if base is None:
+            base = np.ones(self.n_docs, dtype=bool)
+
+        facets = {}
+        for field in self.values if fields is None else fields:
+            others = base.copy()
+            for other, other_bitmap in bitmaps.items():
+                if other != field:
+                    others &= other_bitmap
+            value_counts = self._value_counts(field, others)
+            facets[field] = self.counts(field, others, limit, value_counts)
+            # Selected values stay listed, with their real count, even when they fall outside
+            # the top `limit` or the other facets exclude them
+            listed = {facet["value"] for facet in facets[field]}
+            facets[field] += [
+                {"value": value, "count": int(value_counts[self._ids[field][value]])}
+                for value in sorted({str(v) for v in selections.get(field) or ()} - listed)
+                if value in self._ids[field]
+            ]
+
+        mask = base
+        for field_bitmap in bitmaps.values():
+            mask = mask & field_bitmap
+        return mask, facets
+
+    def stats(self):
+        return {
+            "documents": self.n_docs,
+            "values": {field: len(field_values) for field, field_values in self.values.items()},
+            "bytes": int(sum(field_codes.nbytes for field_codes in self.codes.values())),
+        }
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from listings_snapshot import ListingsSnapshot
+from search_index import BM25Index
+from vector_index import HashedNgramEmbedder, VectorIndex
+
+ARTIFACT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# Fingerprint of JOBLISTINGS; the Airflow builder and the API must compute it the same way
+LISTINGS_VERSION_QUERY = (
+    "SELECT LAST_ALTERED, ROW_COUNT FROM INFORMATION_SCHEMA.TABLES "
+    "WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = 'JOBLISTINGS'"
+)
+
+
+def listings_version(cursor):
+    """Run LISTINGS_VERSION_QUERY on `cursor` and format the fingerprint (None if no table)."""
+    cursor.execute(LISTINGS_VERSION_QUERY)
+    row = cursor.fetchone()
+    return f"{row[0]}:{row[1]}" if row else None
+
+
+def artifact_id(version):
+    """Directory name / S3 key prefix for the artifact built from table `version`."""
+    return hashlib.sha256(str(version).encode("utf-8")).hexdigest()[:16]
+
+
+def _save(directory, files, name, array):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+    files.append(f"{name}.npy")
+
+
+def write_artifact(root, snapshot, bm25, vectors):
+    """
+    Write an immutable index artifact for `snapshot` under root/<artifact_id>/ and return its path.
+
+    Layout: one .npy file per array (memory-mappable with np.load(mmap_mode="r")), the
+    documents as concatenated UTF-8 JSON rows addressed by an offsets array, and a
+    manifest.json written last. The directory is assembled under a temporary name and
+    renamed into place, so readers never see a partial artifact.
+    """
+    final_path = os.path.join(root, artifact_id(snapshot.version))
+    if os.path.exists(os.path.join(final_path, MANIFEST_NAME)):
+        return final_path
+    os.makedirs(root, exist_ok=True)
+    work_path = tempfile.mkdtemp(prefix=".building-", dir=root)
+    files = []
+
+    # Document store: row i is documents.bin[offsets[i]:offsets[i + 1]]
+    offsets = np.zeros(len(snapshot.rows) + 1, dtype=np.int64)
+    with open(os.path.join(work_path, "documents.bin"), "wb") as f:
+        for i, row in enumerate(snapshot.rows):
+            payload = json.dumps([row.get(column) for column in snapshot.columns], default=str).encode("utf-8")
+            f.write(payload)
+            offsets[i + 1] = offsets[i] + len(payload)
+    files.append("documents.bin")
+    _save(work_path, files, "document_offsets", offsets)
+
+    terms = [None] * len(bm25.vocabulary)
+    for term, term_id in bm25.vocabulary.items():
+        terms[term_id] = term
+    with open(os.path.join(work_path, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f)
+    files.append("vocabulary.json")
+    _save(work_path, files, "bm25_offsets", bm25.offsets)
+    _save(work_path, files, "bm25_doc_ids", bm25.doc_ids)
+    _save(work_path, files, "bm25_impacts", bm25.impacts)
+    for field, (field_offsets, field_docs) in bm25.filter_postings.items():
+        _save(work_path, files, f"filter_{field}_offsets", field_offsets)
+        _save(work_path, files, f"filter_{field}_doc_ids", field_docs)
+
+    _save(work_path, files, "vectors", vectors.matrix)
+    _save(work_path, files, "vector_idf", vectors.embedder.idf)
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": snapshot.version,
+        "created_at": time.time(),
+        "documents": len(snapshot.rows),
+        "columns": snapshot.columns,
+        "filter_fields": list(bm25.filter_postings),
+        "vector_dim": int(vectors.matrix.shape[1]),
+        "files": files + [MANIFEST_NAME],
+    }
+    with open(os.path.join(work_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    try:
+        os.rename(work_path, final_path)
+    except OSError:
+        # Another builder published the same version first; its copy is identical
+        shutil.rmtree(work_path, ignore_errors=True)
+    return final_path
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported search index artifact format: {manifest.get('format')}")
+    return manifest
+
+
+def load_artifact(path, search_columns):
+    """
+    Open the artifact at `path` as (ListingsSnapshot, {index name: index}).
+
+    The BM25 and vector index arrays are memory-mapped read-only, so worker processes on
+    the host share one copy of them through the page cache and skip building them. The
+    listing rows are not shared: the snapshot's filters, facets and analytics need them as
+    Python objects, so each process still decodes its own copy (read through a mapping of
+    documents.bin rather than a second in-memory copy of the file). That decode is the part
+    of a worker's cold start and memory that still grows with the table.
+    """
+    manifest = read_manifest(path)
+    load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    offsets = load("document_offsets")
+    rows = []
+    if manifest["documents"]:
+        with open(os.path.join(path, "documents.bin"), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            rows = [tuple(json.loads(data[offsets[i]:offsets[i + 1]])) for i in range(manifest["documents"])]
+    snapshot = ListingsSnapshot(manifest["version"], manifest["columns"], rows, search_columns)
+    job_ids = [row[manifest["columns"].index("JOB_ID")] for row in rows]
+    if [row.get("JOB_ID") for row in snapshot.rows] != job_ids:
+        raise ValueError("Search index artifact rows are not in snapshot order.")
+
+    with open(os.path.join(path, "vocabulary.json"), encoding="utf-8") as f:
+        vocabulary = {term: term_id for term_id, term in enumerate(json.load(f))}
+    filter_postings = {
+        field: (load(f"filter_{field}_offsets"), load(f"filter_{field}_doc_ids"))
+        for field in manifest["filter_fields"]
+    }
+    bm25 = BM25Index(vocabulary, load("bm25_offsets"), load("bm25_doc_ids"), load("bm25_impacts"),
+                     filter_postings, manifest["documents"])
+    embedder = HashedNgramEmbedder(manifest["vector_dim"], idf=load("vector_idf"), frozen=True)
+    vectors = VectorIndex(embedder, load("vectors"))
+    return snapshot, {"bm25": bm25, "semantic": vectors}
+
+
+def prune_artifacts(root, keep):
+    """Delete artifact directories under `root` other than those named in `keep`."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name not in keep and os.path.isdir(path) and not name.startswith(".building-"):
+            # Safe while other workers still map the files: open mappings outlive the unlink
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def upload_artifact(s3_client, bucket, prefix, path):
+    """Copy the artifact at `path` to s3://bucket/prefix/<artifact id>/, manifest last."""
+    name = os.path.basename(os.path.normpath(path))
+    files = read_manifest(path)["files"]
+    for file_name in [f for f in files if f != MANIFEST_NAME] + [MANIFEST_NAME]:
+        s3_client.upload_file(os.path.join(path, file_name), bucket, f"{prefix}/{name}/{file_name}")
+    return f"{prefix}/{name}"
+
+
+def download_artifact(s3_client, bucket, prefix, name, root):
+    """
+    Fetch artifact `name` from S3 into root/<name>/ and return its path, or None if it has
+    not been published (its manifest is uploaded last, so a present manifest means complete).
+    """
+    try:
+        manifest = json.loads(s3_client.get_object(Bucket=bucket, Key=f"{prefix}/{name}/{MANIFEST_NAME}")["Body"].read())
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    final_path = os.path.join(root, name)
+    os.makedirs(root, exist_ok=True)
+    work_path = tempfile.mkdtemp(prefix=".building-", dir=root)
+    try:
+        for file_name in manifest["files"]:
+            if file_name != MANIFEST_NAME:
+                s3_client.download_file(bucket, f"{prefix}/{name}/{file_name}", os.path.join(work_path, file_name))
+        with open(os.path.join(work_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.rename(work_path, final_path)
+    except OSError:
+        if not os.path.exists(os.path.join(final_path, MANIFEST_NAME)):
+            raise
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+    return final_path
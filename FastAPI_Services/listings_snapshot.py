@@ -0,0 +1,222 @@
+import threading
+import time
+
+import numpy as np
+
+
+def _date_key(value):
+    # Cursors carry POSTED_DATE as str(value), so rows are compared the same way
+    return None if value is None else str(value)
+
+
+class ListingsSnapshot:
+    """
+    Immutable in-memory copy of JOBLISTINGS, pre-sorted in search order
+    (POSTED_DATE DESC NULLS LAST, JOB_ID ASC).
+
+    Instances are never modified after construction; the store swaps in a new one on
+    refresh, so a reader holding a snapshot always sees one complete version of the table.
+    """
+
+    def __init__(self, version, columns, rows, search_columns, loaded_at=None):
+        self.version = version
+        self.columns = list(columns)
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+        # Search indexes over `rows`, keyed by name; filled in before the snapshot is published
+        self.indexes = {}
+
+        records = [dict(zip(self.columns, row)) for row in rows]
+        dated = sorted((r for r in records if r.get("POSTED_DATE") is not None), key=lambda r: str(r.get("JOB_ID")))
+        # A stable reverse sort keeps JOB_ID ascending among rows with the same date
+        dated.sort(key=lambda r: _date_key(r["POSTED_DATE"]), reverse=True)
+        undated = sorted((r for r in records if r.get("POSTED_DATE") is None), key=lambda r: str(r.get("JOB_ID")))
+        self.rows = tuple(dated + undated)
+        self._by_id = {str(row.get("JOB_ID")): row for row in self.rows}
+
+        # Lower-cased text of every searchable column, so ILIKE '%term%' becomes a substring test
+        self._search_text = [
+            {column: str(row.get(column) or "").lower() for column in search_columns}
+            for row in self.rows
+        ]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, job_id):
+        return self._by_id.get(str(job_id))
+
+    def _matches(self, index, filters):
+        text = self._search_text[index]
+        # OR across the terms for one column, AND across columns (same as the generated SQL)
+        return all(
+            any(term in text.get(column, "") for term in terms)
+            for column, terms in filters.items()
+        )
+
+    def contains(self, text, columns):
+        """
+        Boolean mask of the rows where any of `columns` contains `text`, ignoring case: the
+        snapshot form of `column ILIKE '%text%' OR ...` with the text taken literally.
+        """
+        text = text.lower()
+        return np.fromiter(
+            (any(text in row_text.get(column, "") for column in columns) for row_text in self._search_text),
+            dtype=bool,
+            count=len(self.rows),
+        )
+
+    @staticmethod
+    def _after_cursor(row, cursor):
+        posted_date, job_id = _date_key(row.get("POSTED_DATE")), str(row.get("JOB_ID"))
+        if cursor["posted_date"] is None:
+            return posted_date is None and job_id > str(cursor["job_id"])
+        if posted_date is None:
+            return True
+        return posted_date < cursor["posted_date"] or (
+            posted_date == cursor["posted_date"] and job_id > str(cursor["job_id"])
+        )
+
+    def filter(self, filters=None):
+        """Yield rows matching `filters` ({column: [terms]}) in search order."""
+        filters = {column: [t.lower() for t in terms] for column, terms in (filters or {}).items() if terms}
+        for index, row in enumerate(self.rows):
+            if not filters or self._matches(index, filters):
+                yield row
+
+    def search(self, filters, limit, cursor=None, count=False):
+        """
+        One page of rows matching `filters` after the keyset `cursor`.
+        Returns (rows, has_more, total); total is only computed when `count` is set.
+        """
+        page = []
+        has_more = False
+        total = 0 if count else None
+        for row in self.filter(filters):
+            if count:
+                total += 1
+            if cursor and not self._after_cursor(row, cursor):
+                continue
+            if len(page) < limit:
+                page.append(row)
+            else:
+                has_more = True
+                if not count:
+                    break
+        return page, has_more, total
+
+    @staticmethod
+    def project(rows, columns):
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+
+class ListingsSnapshotStore:
+    """
+    Holds the current ListingsSnapshot and refreshes it from Snowflake.
+
+    `load_version()` returns a cheap fingerprint of the table; `load_rows()` returns
+    (columns, rows). refresh() skips the full load when the fingerprint is unchanged and
+    swaps the new snapshot in with a single reference assignment. `index_builders` maps an
+    index name to a function building it from a snapshot; indexes are built before the swap.
+    `load_artifact(version)`, if given, returns a prebuilt (snapshot, indexes) pair for that
+    fingerprint or None; when it does, the rows are not reloaded and only indexes missing
+    from the artifact are built.
+    """
+
+    def __init__(self, load_version, load_rows, search_columns, index_builders=None, load_artifact=None):
+        self._load_version = load_version
+        self._load_rows = load_rows
+        self._search_columns = list(search_columns)
+        self._index_builders = dict(index_builders or {})
+        self._load_artifact = load_artifact
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "refreshes": 0,
+            "unchanged": 0,
+            "failures": 0,
+            "index_failures": 0,
+            "artifact_loads": 0,
+            "last_error": None,
+            "last_load_seconds": None,
+            "last_checked_at": None,
+        }
+
+    def current(self):
+        """The snapshot to serve from, or None if none has loaded yet."""
+        return self._snapshot
+
+    def refresh(self, force=False):
+        """Reload the table if it changed; returns True if a new snapshot was swapped in."""
+        with self._refresh_lock:
+            start = time.monotonic()
+            try:
+                version = self._load_version()
+                current = self._snapshot
+                if not force and current is not None and version is not None and current.version == version:
+                    with self._stats_lock:
+                        self._stats["unchanged"] += 1
+                        self._stats["last_checked_at"] = time.time()
+                    return False
+                snapshot = self._open_artifact(version)
+                if snapshot is None:
+                    columns, rows = self._load_rows()
+                    snapshot = ListingsSnapshot(version, columns, rows, self._search_columns)
+                self._build_indexes(snapshot)
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats["failures"] += 1
+                    self._stats["last_error"] = str(e)
+                raise
+            self._snapshot = snapshot
+            with self._stats_lock:
+                self._stats["refreshes"] += 1
+                self._stats["last_error"] = None
+                self._stats["last_load_seconds"] = round(time.monotonic() - start, 3)
+                self._stats["last_checked_at"] = time.time()
+            return True
+
+    def _open_artifact(self, version):
+        if self._load_artifact is None or version is None:
+            return None
+        try:
+            artifact = self._load_artifact(version)
+        except Exception as e:
+            # A broken or missing artifact only costs a full load and a local index build
+            print(f"Failed to load search index artifact for listings snapshot {version}: {str(e)}")
+            return None
+        if artifact is None:
+            return None
+        snapshot, indexes = artifact
+        snapshot.indexes.update(indexes)
+        with self._stats_lock:
+            self._stats["artifact_loads"] += 1
+        return snapshot
+
+    def _build_indexes(self, snapshot):
+        for name, build in self._index_builders.items():
+            if name in snapshot.indexes:
+                continue
+            try:
+                snapshot.indexes[name] = build(snapshot)
+            except Exception as e:
+                # Listing and filter search still work from the rows; only this index is missing
+                print(f"Failed to build '{name}' index for listings snapshot {snapshot.version}: {str(e)}")
+                with self._stats_lock:
+                    self._stats["index_failures"] += 1
+
+    def stats(self):
+        snapshot = self._snapshot
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "rows": len(snapshot) if snapshot else 0,
+            "age_seconds": round(time.time() - snapshot.loaded_at, 1) if snapshot else None,
+            "indexes": {
+                name: index.stats() if hasattr(index, "stats") else {}
+                for name, index in (snapshot.indexes.items() if snapshot else ())
+            },
+        })
+        return stats
@@ -0,0 +1,351 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+
+# Responses worth retrying: timeouts, conflicts, rate limits and transient server errors
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# LangChain message types -> OpenAI chat roles
+MESSAGE_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+# Latency samples kept per model for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+
+class LLMError(Exception):
+    """A chat completion failed after all retries; `status_code` is None for transport errors."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMResult:
+    """A finished chat completion. `content` matches the attribute LangChain messages expose."""
+
+    def __init__(self, content, model, usage=None, hedged=False):
+        self.content = content
+        self.model = model
+        self.usage = usage or {}
+        self.hedged = hedged
+
+
+def chat_messages(messages):
+    """OpenAI chat messages from formatted LangChain messages (ChatPromptTemplate.format_messages)."""
+    return [{"role": MESSAGE_ROLES.get(message.type, message.type), "content": message.content} for message in messages]
+
+
+def estimate_tokens(messages):
+    # Rough prompt size (~4 characters per token) for the tokens-per-minute bucket
+    return max(sum(len(message["content"]) for message in messages) // 4, 1)
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to `capacity` units and refills `rate` units per
+    second. acquire() blocks until the requested units are available.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount=1):
+        """Take `amount` units if they are available now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount=1):
+        """Take `amount` units (capped at the capacity), waiting as needed; returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class LLMStream:
+    """
+    Iterator over the text chunks of a streamed chat completion. Holds the model's
+    concurrency slot until exhausted or closed; close() may be called from another thread
+    to abort a stream whose consumer has gone away.
+    """
+
+    def __init__(self, gateway, model, response, start):
+        self.model = model
+        self.usage = None
+        self._gateway = gateway
+        self._response = response
+        self._lines = response.iter_lines()
+        self._start = start
+        self._first_token = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            for line in self._lines:
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("usage"):
+                    self.usage = chunk["usage"]
+                for choice in chunk.get("choices") or ():
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        if self._first_token is None:
+                            self._first_token = time.perf_counter() - self._start
+                        return text
+        except Exception:
+            self._finish(failed=True)  # No-op when close() aborted the stream
+            raise
+        self._finish(failed=False)
+        raise StopIteration
+
+    def _finish(self, failed):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._response.close()
+        self._gateway._finished(self.model, self._start, self.usage, failed, first_token=self._first_token)
+
+    def close(self):
+        self._finish(failed=False)
+
+
+class LLMGateway:
+    """
+    Single entry point for OpenAI-compatible chat completions, shared by every call site.
+
+    - One keep-alive HTTP connection pool for all requests.
+    - A concurrency limit per model.
+    - Token buckets for requests and (estimated) prompt tokens per minute, so bursts queue
+      here instead of coming back as 429s.
+    - Retries with exponential backoff and full jitter on transient failures, honouring
+      Retry-After.
+    - Optional hedging: when a completion has not returned after `hedge_after` seconds, a
+      duplicate is sent if the request budget allows and the first answer wins. The loser
+      still runs to completion (blocking HTTP can't be interrupted), so keep this for
+      latency-sensitive, short calls.
+    - Latency, first-token and token-usage metrics per model.
+
+    Calls block; async code runs them on a thread pool.
+    """
+
+    def __init__(self, base_url, api_key, max_concurrency=8, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=2, backoff_base=0.5, backoff_max=8.0, timeout=60.0, hedge_after=None,
+                 max_connections=32, transport=None, sleep=time.sleep):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after or None
+        self._sleep = sleep
+        self._client = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._requests = TokenBucket(requests_per_minute / 60, requests_per_minute, sleep=sleep) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute, sleep=sleep) if tokens_per_minute else None
+        self._hedger = ThreadPoolExecutor(thread_name_prefix="llm-hedge") if self.hedge_after else None
+        self._semaphores = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        with self._lock:
+            if model not in self._semaphores:
+                self._semaphores[model] = threading.BoundedSemaphore(self.max_concurrency)
+                self._stats[model] = {
+                    "requests": 0, "failed": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "in_flight": 0,
+                    "rate_limit_wait_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "latency": deque(maxlen=LATENCY_SAMPLES), "first_token": deque(maxlen=LATENCY_SAMPLES),
+                }
+            return self._semaphores[model], self._stats[model]
+
+    def _update(self, model, **deltas):
+        with self._lock:
+            stats = self._stats[model]
+            for name, delta in deltas.items():
+                stats[name] += delta
+
+    def _admit(self, model, messages):
+        # Rate limits are applied before taking a concurrency slot so waiting calls don't hold one
+        waited = 0.0
+        if self._requests:
+            waited += self._requests.acquire()
+        if self._tokens:
+            waited += self._tokens.acquire(estimate_tokens(messages))
+        semaphore, _ = self._model(model)
+        semaphore.acquire()
+        self._update(model, requests=1, in_flight=1, rate_limit_wait_s=waited)
+        return time.perf_counter()
+
+    def _finished(self, model, start, usage, failed, first_token=None):
+        with self._lock:
+            stats = self._stats[model]
+            stats["in_flight"] -= 1
+            stats["failed"] += int(failed)
+            if not failed:
+                stats["latency"].append(time.perf_counter() - start)
+                if first_token is not None:
+                    stats["first_token"].append(first_token)
+            stats["prompt_tokens"] += (usage or {}).get("prompt_tokens", 0)
+            stats["completion_tokens"] += (usage or {}).get("completion_tokens", 0)
+        self._semaphores[model].release()
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def _send(self, model, payload, stream=False):
+        """POST the payload, retrying transient failures; returns the (open, if streaming) response."""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                request = self._client.build_request("POST", "/chat/completions", json=payload)
+                response = self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = LLMError(f"LLM request failed: {str(e)}")
+            else:
+                if response.status_code < 400:
+                    return response
+                body = response.read().decode("utf-8", "replace")[:500]
+                response.close()
+                error = LLMError(f"LLM request failed with {response.status_code}: {body}", response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                try:
+                    retry_after = float(response.headers.get("retry-after", ""))
+                except ValueError:
+                    retry_after = None
+            if attempt == self.max_retries:
+                raise error
+            self._update(model, retries=1)
+            self._sleep(self._backoff(attempt, retry_after))
+
+    def _complete_once(self, model, payload):
+        response = self._send(model, payload)
+        try:
+            return response.json()
+        finally:
+            response.close()
+
+    def _complete_hedged(self, model, payload):
+        primary = self._hedger.submit(self._complete_once, model, payload)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done or (self._requests and not self._requests.try_acquire()):
+            return primary.result(), False
+        self._update(model, hedged=1)
+        backup = self._hedger.submit(self._complete_once, model, payload)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._update(model, hedge_wins=1)
+                    return future.result(), future is backup
+                error = future.exception()
+        raise error
+
+    def complete(self, messages, model, temperature=0, **params):
+        """Run a chat completion to the end and return an LLMResult."""
+        payload = {"model": model, "messages": messages, "temperature": temperature, **params}
+        start = self._admit(model, messages)
+        body, usage, failed = None, None, True
+        try:
+            if self._hedger:
+                body, hedged = self._complete_hedged(model, payload)
+            else:
+                body, hedged = self._complete_once(model, payload), False
+            usage = body.get("usage")
+            failed = False
+        finally:
+            self._finished(model, start, usage, failed)
+        content = body["choices"][0]["message"].get("content") or ""
+        return LLMResult(content, body.get("model", model), usage, hedged)
+
+    def stream(self, messages, model, temperature=0, **params):
+        """
+        Start a streamed chat completion and return an LLMStream of its text chunks. Failures
+        before the first byte are retried like complete(); the stream itself is not.
+        """
+        payload = {"model": model, "messages": messages, "temperature": temperature, "stream": True,
+                   "stream_options": {"include_usage": True}, **params}
+        start = self._admit(model, messages)
+        try:
+            response = self._send(model, payload, stream=True)
+        except BaseException:
+            self._finished(model, start, None, failed=True)
+            raise
+        return LLMStream(self, model, response, start)
+
+    def stats(self):
+        """Per-model request, retry, hedge and token counters with latency percentiles in ms."""
+        with self._lock:
+            models = {
+                model: {
+                    **{name: value for name, value in stats.items() if name not in ("latency", "first_token")},
+                    "rate_limit_wait_s": round(stats["rate_limit_wait_s"], 3),
+                    "max_concurrency": self.max_concurrency,
+                    "latency_ms": _percentiles(stats["latency"]),
+                    "first_token_ms": _percentiles(stats["first_token"]),
+                }
+                for model, stats in self._stats.items()
+            }
+        return {
+            "requests_per_minute": self._requests.capacity if self._requests else None,
+            "tokens_per_minute": self._tokens.capacity if self._tokens else None,
+            "hedge_after": self.hedge_after,
+            "models": models,
+        }
+
+    def close(self):
+        if self._hedger:
+            self._hedger.shutdown(wait=False, cancel_futures=True)
+        self._client.close()
@@ -1,26 +1,63 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Header, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr, field_validator, ValidationError
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError, ExpiredSignatureError
-from passlib.context import CryptContext
 import boto3
 import os
 from uuid import uuid4, UUID
 from typing import Optional
 from snowflake.connector import connect, ProgrammingError
+from snowflake.connector.errors import DatabaseError, InterfaceError
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 import json
 from io import BytesIO
 
 from typing import TypedDict, List, Dict, Any
 from langgraph.graph import StateGraph
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 import pandas as pd
 import snowflake.connector
 import ast
+import sys
+import asyncio
+import threading
+import hashlib
+import time
+import hmac
+import base64
+
+# Add the directory containing the service modules to the Python path
+service_folder = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(service_folder)
+
+from snowflake_pool import SnowflakeConnectionPool, PoolTimeoutError
+from executors import ResourceExecutors
+from llm_gateway import LLMGateway, chat_messages
+from process_pool import ManagedProcessPool, TaskTimeoutError
+from password_hashing import hash_password, verify_password
+from caching import TTLCache, PersistentCache
+from task_queue import TaskQueue
+from query_rules import RuleBasedQueryParser
+from listings_snapshot import ListingsSnapshotStore
+from index_artifact import MANIFEST_NAME, artifact_id, download_artifact, listings_version, load_artifact, prune_artifacts
+from search_index import BM25Index
+from facet_index import FACET_FIELDS, FacetIndex
+from analytics import (
+    AGGREGATES_TABLE,
+    HIGHLIGHT_STOPWORDS,
+    HIGHLIGHT_TERM_SQL_PATTERN,
+    SALARY_SQL_EXPRESSION,
+    HighlightTermIndex,
+    SalaryIndex,
+    salary_stats,
+    summarize_aggregates,
+)
+from vector_index import VectorIndex, hybrid_search
+from document_processing import PROCESSOR_VERSION, count_tokens, process_document
+from prompt_budget import PromptBudget
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +80,99 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# Snowflake connection pool settings (shared by every database pool)
+SNOWFLAKE_POOL_MIN_SIZE = int(os.getenv("SNOWFLAKE_POOL_MIN_SIZE", "1"))
+SNOWFLAKE_POOL_MAX_SIZE = int(os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "8"))
+SNOWFLAKE_POOL_TIMEOUT = float(os.getenv("SNOWFLAKE_POOL_TIMEOUT", "10"))
+SNOWFLAKE_POOL_IDLE_TIMEOUT = float(os.getenv("SNOWFLAKE_POOL_IDLE_TIMEOUT", "600"))
+SNOWFLAKE_POOL_MAX_LIFETIME = float(os.getenv("SNOWFLAKE_POOL_MAX_LIFETIME", "3600"))
+SNOWFLAKE_POOL_REAP_INTERVAL = float(os.getenv("SNOWFLAKE_POOL_REAP_INTERVAL", "60"))
+
+# Worker threads per class of blocking resource
+EXECUTOR_SIZES = {
+    "snowflake": int(os.getenv("EXECUTOR_SNOWFLAKE_WORKERS", str(SNOWFLAKE_POOL_MAX_SIZE * 3))),
+    "s3": int(os.getenv("EXECUTOR_S3_WORKERS", "8")),
+    "http": int(os.getenv("EXECUTOR_HTTP_WORKERS", "16")),
+    "llm": int(os.getenv("EXECUTOR_LLM_WORKERS", "16")),
+    "cpu": int(os.getenv("EXECUTOR_CPU_WORKERS", str(os.cpu_count() or 2))),
+}
+
+# Worker processes for CPU-bound calls, and per task type how many may run at once and how
+# long a caller waits for one; keeping documents below the pool size leaves room for logins
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(os.cpu_count() or 2)))
+PROCESS_TASK_LIMITS = {
+    "password": int(os.getenv("PROCESS_PASSWORD_CONCURRENCY", str(PROCESS_POOL_WORKERS))),
+    "document": int(os.getenv("PROCESS_DOCUMENT_CONCURRENCY", str(max(PROCESS_POOL_WORKERS - 1, 1)))),
+}
+PROCESS_TASK_TIMEOUTS = {
+    "password": float(os.getenv("PROCESS_PASSWORD_TIMEOUT", "10")),
+    "document": float(os.getenv("PROCESS_DOCUMENT_TIMEOUT", "60")),
+}
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "30"))
+
+# Chat completions gateway shared by every LLM call: OpenAI-compatible endpoint, concurrent
+# calls per model, account rate limits (0 disables), retries, per-request timeout, hedge
+# delay in seconds (0 disables) and keep-alive connections
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+
+# /feedback stage deadlines: loading both documents (together) and the LLM call
+FEEDBACK_DOCUMENTS_TIMEOUT = float(os.getenv("FEEDBACK_DOCUMENTS_TIMEOUT", "45"))
+FEEDBACK_LLM_TIMEOUT = float(os.getenv("FEEDBACK_LLM_TIMEOUT", "120"))
+
+# Token budget for a whole feedback / chat-feedback prompt; long postings and documents are
+# cut down to their passages most relevant to the job
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "6000"))
+
+# Background /feedback tasks: concurrent tasks and how long finished results stay pollable
+FEEDBACK_TASK_WORKERS = int(os.getenv("FEEDBACK_TASK_WORKERS", "4"))
+TASK_RESULT_TTL = float(os.getenv("TASK_RESULT_TTL", "86400"))
+
+# Authenticated user profile cache settings
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+
+# Local directory for on-disk caches that should survive restarts
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(service_folder, ".cache"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2048"))
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "256"))
+FEEDBACK_CACHE_MAX_ENTRIES = int(os.getenv("FEEDBACK_CACHE_MAX_ENTRIES", "256"))
+FEEDBACK_CACHE_MAX_BYTES = int(os.getenv("FEEDBACK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_RULES_ENABLED = os.getenv("QUERY_RULES_ENABLED", "true").lower() == "true"
+
+# Search result paging: default page size and the hard server-side row cap per page
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+
+# Rows fetched from Snowflake per batch when streaming NDJSON responses
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# In-memory JOBLISTINGS snapshot: how often to check Snowflake for a new load, and the
+# shared secret for the reload hook (the hook is disabled when no token is set)
+LISTINGS_SNAPSHOT_ENABLED = os.getenv("LISTINGS_SNAPSHOT_ENABLED", "true").lower() == "true"
+LISTINGS_SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("LISTINGS_SNAPSHOT_REFRESH_INTERVAL", "900"))
+LISTINGS_RELOAD_TOKEN = os.getenv("LISTINGS_RELOAD_TOKEN")
+
+# Shared operator secret for the /metrics endpoints (they are disabled when no token is set)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Semantic search: embedding size, minimum cosine similarity for a match, and the weight of
+# the semantic score when blended with BM25 in hybrid mode
+SEMANTIC_VECTOR_DIM = int(os.getenv("SEMANTIC_VECTOR_DIM", "128"))
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.15"))
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+
+# Prebuilt search index artifacts published by the Airflow DAG: the S3 prefix they are
+# uploaded under (empty disables downloads) and the local directory they are mapped from
+SEARCH_INDEX_S3_PREFIX = os.getenv("SEARCH_INDEX_S3_PREFIX", "search-index")
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", os.path.join(CACHE_DIR, "search_index"))
+
 import os
 
 if "OPENAI_API_KEY" not in os.environ:
@@ -55,9 +185,55 @@ s3_client = boto3.client(
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
 )
 
+# Bounded thread pools for blocking calls made from async handlers
+executors = ResourceExecutors(EXECUTOR_SIZES)
+
+# Worker processes for CPU-bound calls that would hold the GIL (bcrypt, PDF parsing)
+process_pool = ManagedProcessPool(
+    PROCESS_POOL_WORKERS,
+    PROCESS_TASK_LIMITS,
+    PROCESS_TASK_TIMEOUTS,
+    warm_modules=("password_hashing", "document_processing"),
+)
+
+async def run_blocking(kind, fn, *args, **kwargs):
+    """Run a blocking call on the thread pool for its resource class without stalling the event loop."""
+    return await executors.run(kind, fn, *args, **kwargs)
+
+async def iterate_blocking(kind, iterator, deadline=None):
+    """
+    Async iteration over a blocking iterator, one next() per pool call; closes it when abandoned.
+    Raises asyncio.TimeoutError at `deadline` (a perf_counter time), even while a next() is blocked.
+    """
+    done = object()
+    try:
+        while True:
+            call = run_blocking(kind, next, iterator, done)
+            if deadline is not None:
+                call = asyncio.wait_for(call, max(deadline - time.perf_counter(), 0))
+            if (item := await call) is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
+
+# One pooled, rate-limited client for every chat completion
+llm_gateway = LLMGateway(
+    OPENAI_BASE_URL,
+    os.environ["OPENAI_API_KEY"],
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE or None,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE or None,
+    max_retries=LLM_MAX_RETRIES,
+    timeout=LLM_TIMEOUT,
+    hedge_after=LLM_HEDGE_AFTER,
+    max_connections=LLM_MAX_CONNECTIONS,
+)
+
 # Security and hashing utilities
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Query to create user_profiles table
 CREATE_USER_PROFILES_TABLE_QUERY = """
@@ -74,20 +250,50 @@ CREATE TABLE IF NOT EXISTS user_profiles (
 """
 
 
-# Snowflake connection function
-def get_snowflake_connection():
+def _snowflake_connect(database):
+    """Open a new Snowflake session against the given database."""
+    return connect(
+        user=SNOWFLAKE_USER,
+        password=SNOWFLAKE_PASSWORD,
+        account=SNOWFLAKE_ACCOUNT,
+        database=database,
+        schema=SNOWFLAKE_SCHEMA,
+        warehouse=SNOWFLAKE_WAREHOUSE,
+    )
+
+def _create_snowflake_pool(name, database_env):
+    return SnowflakeConnectionPool(
+        name=name,
+        connect_factory=lambda: _snowflake_connect(os.getenv(database_env)),
+        min_size=SNOWFLAKE_POOL_MIN_SIZE,
+        max_size=SNOWFLAKE_POOL_MAX_SIZE,
+        acquire_timeout=SNOWFLAKE_POOL_TIMEOUT,
+        idle_timeout=SNOWFLAKE_POOL_IDLE_TIMEOUT,
+        max_lifetime=SNOWFLAKE_POOL_MAX_LIFETIME,
+        # A session that raised mid-query (OperationalError and the other DatabaseErrors,
+        # or a dropped connection) may be unusable, so it is not handed to the next request
+        discard_on=(DatabaseError, InterfaceError),
+    )
+
+# One connection pool per database; sessions are reused across requests
+snowflake_pools = {
+    "user_profiles": _create_snowflake_pool("user_profiles", "SNOWFLAKE_USER_PROFILES_DB"),
+    "user_results": _create_snowflake_pool("user_results", "SNOWFLAKE_USER_RESULTS_DB"),
+    "jobs": _create_snowflake_pool("jobs", "SNOWFLAKE_JOBSDB"),
+}
+
+def _acquire_pooled_connection(pool_name):
     try:
-        return connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            database=SNOWFLAKE_USER_PROFILES_DB,
-            schema=SNOWFLAKE_SCHEMA,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-        )
+        return snowflake_pools[pool_name].acquire()
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Database busy, please retry: {e}")
     except ProgrammingError as e:
         raise HTTPException(status_code=500, detail=f"Snowflake connection error: {e}")
 
+# Snowflake connection function
+def get_snowflake_connection():
+    return _acquire_pooled_connection("user_profiles")
+
 # Create the user_profiles table if it doesn't exist
 def initialize_user_profiles_table():
     try:
@@ -101,6 +307,13 @@ def initialize_user_profiles_table():
         cur.close()
         conn.close()
 
+# Profiles of recently authenticated users, keyed by (username, token exp)
+user_profile_cache = TTLCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL)
+
+def invalidate_cached_user(username: str):
+    """Drop every cached profile for a user, whatever token it was cached under."""
+    user_profile_cache.invalidate_where(lambda key: key[0] == username)
+
 # Dependency to get current user
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -123,13 +336,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
 
+    # Serve from the profile cache; never keep an entry past the token's own expiry
+    cache_key = (token_data.username, payload.get("exp"))
+    cached_user = user_profile_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
     # Retrieve user from database
     try:
-        conn = get_snowflake_connection()
-        cur = conn.cursor()
-        query = f"SELECT id, email, resume_link, cover_letter_link, created_at, updated_at FROM {SNOWFLAKE_SCHEMA}.user_profiles WHERE username = %(username)s"
-        cur.execute(query, {'username': token_data.username})
-        user = cur.fetchone()
+        user = await run_blocking("snowflake", fetch_user_profile, token_data.username)
         if user is None:
             raise credentials_exception
         user_out = UserOut(
@@ -141,24 +356,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             created_at=user[4],
             updated_at=user[5],
         )
+        ttl = USER_CACHE_TTL
+        if cache_key[1] is not None:
+            ttl = min(ttl, cache_key[1] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            user_profile_cache.set(cache_key, user_out, ttl=ttl)
         return user_out
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"Error retrieving user: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error.")
+
+def fetch_user_profile(username: str):
+    """Blocking lookup of the profile row used to build UserOut."""
+    try:
+        conn = get_snowflake_connection()
+        cur = conn.cursor()
+        query = f"SELECT id, email, resume_link, cover_letter_link, created_at, updated_at FROM {SNOWFLAKE_SCHEMA}.user_profiles WHERE username = %(username)s"
+        cur.execute(query, {'username': username})
+        return cur.fetchone()
     finally:
         if "cur" in locals() and cur:
             cur.close()
         if "conn" in locals() and conn:
             conn.close()
 
-# Hashing and authentication functions
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def authenticate_user(username: str, password: str):
+def fetch_user_credentials(username: str):
+    """Blocking lookup of the id and password hash for a username."""
     try:
         conn = get_snowflake_connection()
         cur = conn.cursor()
@@ -166,19 +391,25 @@ def authenticate_user(username: str, password: str):
         # Use parameterized query to prevent SQL injection
         query = f"SELECT id, hashed_password FROM {SNOWFLAKE_SCHEMA}.user_profiles WHERE username = %(username)s"
         cur.execute(query, {'username': username})
-        user = cur.fetchone()
-        if user and verify_password(password, user[1]):
-            return {"id": user[0], "username": username}
-        return None
-    except Exception as e:
-        print(f"Error during authentication: {str(e)}")
-        return None
+        return cur.fetchone()
     finally:
         if "cur" in locals() and cur:
             cur.close()
         if "conn" in locals() and conn:
             conn.close()
 
+async def authenticate_user(username: str, password: str):
+    try:
+        user = await run_blocking("snowflake", fetch_user_credentials, username)
+        if user and await process_pool.run("password", verify_password, password, user[1]):
+            return {"id": user[0], "username": username}
+        return None
+    except TaskTimeoutError:
+        raise HTTPException(status_code=503, detail="Authentication is busy; please try again.")
+    except Exception as e:
+        print(f"Error during authentication: {str(e)}")
+        return None
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -222,10 +453,42 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+async def reap_idle_connections():
+    """Periodically close pooled connections that have been idle for too long."""
+    while True:
+        await asyncio.sleep(SNOWFLAKE_POOL_REAP_INTERVAL)
+        for pool in snowflake_pools.values():
+            await run_blocking("snowflake", pool.reap_idle)
+
+async def refresh_listings_snapshot():
+    """Load the JOBLISTINGS snapshot, then periodically pick up new DAG loads."""
+    while True:
+        try:
+            await run_blocking("snowflake", listings_snapshot.refresh)
+        except Exception as e:
+            # Keep serving the previous snapshot (or Snowflake, if none loaded yet)
+            print(f"Listings snapshot refresh failed: {str(e)}")
+        await asyncio.sleep(LISTINGS_SNAPSHOT_REFRESH_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    initialize_user_profiles_table()  # Ensure the table is created on startup
+    process_pool.start()  # Spawn and warm the worker processes before serving traffic
+    for pool in snowflake_pools.values():
+        await run_blocking("snowflake", pool.prewarm)  # Open the first sessions before serving traffic
+    await run_blocking("snowflake", initialize_user_profiles_table)  # Ensure the table is created on startup
+    get_search_workflow()  # Compile the search graph once before serving traffic
+    reaper = asyncio.create_task(reap_idle_connections())
+    refresher = asyncio.create_task(refresh_listings_snapshot()) if LISTINGS_SNAPSHOT_ENABLED else None
     yield
+    reaper.cancel()
+    if refresher:
+        refresher.cancel()
+    for pool in snowflake_pools.values():
+        pool.close_all()
+    executors.shutdown(wait=False)
+    llm_gateway.close()
+    process_pool.shutdown(wait=False)
+    feedback_tasks.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -256,14 +519,14 @@ async def register_user(
             raise HTTPException(status_code=400, detail="Both 'resume' and 'cover_letter' files are required.")
 
         # **Check if the email already exists**
-        conn = get_snowflake_connection()
+        conn = await run_blocking("snowflake", get_snowflake_connection)
         cur = conn.cursor()
         
         check_user_query = """
         SELECT email, username FROM user_profiles WHERE email = %(email)s OR username = %(username)s
         """
-        cur.execute(check_user_query, {'email': user_model.email, 'username': user_model.username})
-        existing_user = cur.fetchone()
+        await run_blocking("snowflake", cur.execute, check_user_query, {'email': user_model.email, 'username': user_model.username})
+        existing_user = await run_blocking("snowflake", cur.fetchone)
 
         if existing_user:
             existing_email, existing_username = existing_user
@@ -277,7 +540,7 @@ async def register_user(
                 raise HTTPException(status_code=400, detail="A user with this email or username already exists.")
         
         # Proceed with file uploads and user creation
-        hashed_password = hash_password(user_model.password)
+        hashed_password = await process_pool.run("password", hash_password, user_model.password)
         user_id = str(uuid4())
         folder_name = f"user-profiles/{user_id}/"
 
@@ -288,18 +551,23 @@ async def register_user(
         cover_letter_stream = BytesIO(cover_letter_content)
         
         # Upload files to S3 (ensure s3_client is properly initialized)
-        s3_client.upload_fileobj(
-            resume_stream,
-            AWS_S3_BUCKET_NAME,
-            resume_key,
-            ExtraArgs={'ContentType': 'application/pdf'}
-        )
-        
-        s3_client.upload_fileobj(
-            cover_letter_stream,
-            AWS_S3_BUCKET_NAME,
-            cover_letter_key,
-            ExtraArgs={'ContentType': 'application/pdf'}
+        await asyncio.gather(
+            run_blocking(
+                "s3",
+                s3_client.upload_fileobj,
+                resume_stream,
+                AWS_S3_BUCKET_NAME,
+                resume_key,
+                ExtraArgs={'ContentType': 'application/pdf'}
+            ),
+            run_blocking(
+                "s3",
+                s3_client.upload_fileobj,
+                cover_letter_stream,
+                AWS_S3_BUCKET_NAME,
+                cover_letter_key,
+                ExtraArgs={'ContentType': 'application/pdf'}
+            ),
         )
 
         resume_url = f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{resume_key}"
@@ -322,22 +590,29 @@ async def register_user(
             'cover_letter_link': cover_letter_url
         }
 
-        cur.execute(insert_query, params)
-        conn.commit()
+        await run_blocking("snowflake", cur.execute, insert_query, params)
+        await run_blocking("snowflake", conn.commit)
 
         # Retrieve created_at timestamp; updated_at will be None
-        cur.execute(
+        await run_blocking(
+            "snowflake",
+            cur.execute,
             "SELECT created_at FROM user_profiles WHERE id = %(id)s",
             {'id': user_id}
         )        
         
-        result = cur.fetchone()
+        result = await run_blocking("snowflake", cur.fetchone)
         if result:
             created_at = result[0]
             updated_at = None  # Since updated_at is NULL during registration
         else:
             raise HTTPException(status_code=500, detail="User creation failed.")
 
+        # Process the documents in the background so feedback requests start from structured text
+        version = profile_version(created_at, updated_at)
+        schedule_document_processing(user_id, "resume", version, resume_content)
+        schedule_document_processing(user_id, "cover_letter", version, cover_letter_content)
+
         return {
             "id": user_id,
             "username": user_model.username,
@@ -352,6 +627,9 @@ async def register_user(
         # Re-raise HTTPExceptions to be handled by FastAPI
         raise e
 
+    except TaskTimeoutError:
+        raise HTTPException(status_code=503, detail="Registration is busy; please try again.")
+
     except Exception as e:
         print(f"Error details: {str(e)}")  # Detailed error logging
         raise HTTPException(status_code=500, detail="An error occurred while registering the user.")
@@ -365,7 +643,7 @@ async def register_user(
 # Login endpoint
 @app.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=401,
@@ -391,7 +669,7 @@ async def update_user_files(
     Updates the logged-in user's resume and/or cover letter.
     """
     try:
-        conn = get_snowflake_connection()
+        conn = await run_blocking("snowflake", get_snowflake_connection)
         cur = conn.cursor()
 
         folder_name = f"user-profiles/{current_user.id}/"
@@ -401,7 +679,9 @@ async def update_user_files(
             resume_content = await resume.read()
             resume_key = f"{folder_name}resume.pdf"
             resume_stream = BytesIO(resume_content)
-            s3_client.upload_fileobj(
+            await run_blocking(
+                "s3",
+                s3_client.upload_fileobj,
                 resume_stream,
                 AWS_S3_BUCKET_NAME,
                 resume_key,
@@ -414,7 +694,9 @@ async def update_user_files(
             cover_letter_content = await cover_letter.read()
             cover_letter_key = f"{folder_name}cover_letter.pdf"
             cover_letter_stream = BytesIO(cover_letter_content)
-            s3_client.upload_fileobj(
+            await run_blocking(
+                "s3",
+                s3_client.upload_fileobj,
                 cover_letter_stream,
                 AWS_S3_BUCKET_NAME,
                 cover_letter_key,
@@ -438,11 +720,14 @@ async def update_user_files(
         update_params["id"] = str(current_user.id)
 
         # Execute the update query
-        cur.execute(update_query, update_params)
-        conn.commit()
+        await run_blocking("snowflake", cur.execute, update_query, update_params)
+        await run_blocking("snowflake", conn.commit)
+        invalidate_cached_user(current_user.username)
 
         # Retrieve updated user data
-        cur.execute(
+        await run_blocking(
+            "snowflake",
+            cur.execute,
             f"""
             SELECT id, username, email, resume_link, cover_letter_link, created_at, updated_at 
             FROM {SNOWFLAKE_SCHEMA}.user_profiles
@@ -450,10 +735,25 @@ async def update_user_files(
             """,
             {"id": str(current_user.id)}
         )
-        user = cur.fetchone()
+        user = await run_blocking("snowflake", cur.fetchone)
         if not user:
             raise HTTPException(status_code=404, detail="User not found after update.")
 
+        # Re-key the processed documents to the new profile version: replaced documents
+        # are processed in the background, unchanged ones keep their cached result
+        old_version = profile_version(current_user.created_at, current_user.updated_at)
+        new_version = profile_version(user[5], user[6])
+        uploads = {"resume": resume_content if resume else None, "cover_letter": cover_letter_content if cover_letter else None}
+        for document_type, content in uploads.items():
+            old_key = document_cache_key(current_user.id, document_type, old_version)
+            if content is not None:
+                schedule_document_processing(current_user.id, document_type, new_version, content)
+            else:
+                cached = document_text_cache.get(old_key)
+                if cached is not None:
+                    document_text_cache.set(document_cache_key(current_user.id, document_type, new_version), cached)
+            document_text_cache.invalidate(old_key)
+
         # Return updated user details
         return UserOut(
             id=user[0],
@@ -478,13 +778,45 @@ async def update_user_files(
         if "conn" in locals() and conn:
             conn.close()
 
-# Retrieve Snowflake connection details from environment variables
-account = os.getenv('SNOWFLAKE_ACCOUNT')
-user = os.getenv('SNOWFLAKE_USER')
-password = os.getenv('SNOWFLAKE_PASSWORD')
-database = os.getenv('SNOWFLAKE_JOBSDB')
-schema = os.getenv('SNOWFLAKE_SCHEMA')
-warehouse = os.getenv('SNOWFLAKE_WAREHOUSE')
+# Column projections for list endpoints. "summary" (the default) leaves out the long
+# text columns; clients fetch those for a single job from GET /jobs/{job_id}.
+LISTING_COLUMNS = [
+    "JOB_ID", "SEARCH_QUERY", "TITLE", "COMPANY", "LOCATION", "DESCRIPTION",
+    "POSTED_AT", "POSTED_DATE", "APPLY_LINKS", "JOB_HIGHLIGHTS",
+]
+LISTING_SUMMARY_COLUMNS = [
+    "JOB_ID", "SEARCH_QUERY", "TITLE", "COMPANY", "LOCATION", "POSTED_AT", "POSTED_DATE", "APPLY_LINKS",
+]
+SAVED_JOB_COLUMNS = [
+    "JOB_ID", "TITLE", "COMPANY", "LOCATION", "DESCRIPTION", "JOB_HIGHLIGHTS", "APPLY_LINKS",
+    "POSTED_DATE", "STATUS", "FEEDBACK", "CREATED_AT", "UPDATED_AT",
+]
+SAVED_JOB_SUMMARY_COLUMNS = [
+    "JOB_ID", "TITLE", "COMPANY", "LOCATION", "APPLY_LINKS", "POSTED_DATE", "STATUS", "CREATED_AT", "UPDATED_AT",
+]
+FIELDS_QUERY_DESCRIPTION = "'summary' (default), 'all', or a comma-separated list of columns"
+
+def resolve_projection(fields: Optional[str], allowed_columns, summary_columns, required_columns=()):
+    """
+    Turn a `fields=` query value into the list of columns to return.
+    Raises HTTPException(400) for columns outside `allowed_columns`.
+    """
+    fields = (fields or "summary").strip()
+    if fields.lower() == "all":
+        columns = list(allowed_columns)
+    elif fields.lower() == "summary":
+        columns = list(summary_columns)
+    else:
+        columns = list(dict.fromkeys(f.strip().upper() for f in fields.split(",") if f.strip()))
+        unknown = [column for column in columns if column not in allowed_columns]
+        if unknown or not columns:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown) or fields}. Allowed: {', '.join(allowed_columns)}",
+            )
+    # Columns the endpoint itself depends on (e.g. the paging key) are always selected
+    columns += [column for column in required_columns if column not in columns]
+    return columns
 
 # Pydantic models for request/response
 class JobSearchResponse(BaseModel):
@@ -492,6 +824,9 @@ class JobSearchResponse(BaseModel):
     data: List[Dict[str, Any]]
     parsed_query: Dict[str, List[str]]
     sql: str
+    limit: int
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
 
 class ErrorResponse(BaseModel):
     status: str
@@ -504,70 +839,125 @@ class AgentState(TypedDict):
     natural_query: str
     parsed_query: Dict[str, List[str]]
     sql: str
+    sql_params: Dict[str, Any]
+    mode: str
+    select_columns: List[str]
+    filters: Dict[str, List[str]]
+    count_sql: str
+    limit: int
+    cursor: Optional[Dict[str, Any]]
+    next_cursor: Optional[str]
+    total_estimate: Optional[int]
     results: str
     final_output: str
 
-    # Initialize LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+# Model for natural-language query parsing
+PARSER_MODEL = "gpt-4o-mini"
+
+# Maps natural-language fields to JOBLISTINGS columns
+SCHEMA_TO_TABLE_MAP = {
+    "role": "SEARCH_QUERY",
+    "job": "SEARCH_QUERY",
+    "title": "TITLE",
+    "company": "COMPANY",
+    "location": "LOCATION",
+    "description": "DESCRIPTION",
+    "posted_date": "POSTED_DATE"
+}
+
+# Synonyms the parser expands each recognised value into
+SYNONYM_MAP = {
+    "SEARCH_QUERY": {
+        "data": [
+            "data", "data engineer", "data scientist",
+            "data analyst", "data specialist", "data science",
+            "data engineering", "data analytics"
+        ],
+        "data engineer": ["data engineer", "data engineering"],
+        "data scientist": ["data scientist", "data science", "machine learning scientist"],
+        "AI engineer": ["AI engineer", "artificial intelligence engineer"],
+        "machine learning engineer": ["machine learning engineer", "ML engineer"],
+        "data analyst": ["data analyst", "data analytics"],
+        "AI/ML engineer": ["AI/ML engineer", "artificial intelligence/machine learning engineer"],
+        "software engineer": ["software engineer", "software developer", "software programming"],
+        "devops engineer": ["devops engineer", "site reliability engineer", "SRE"],
+        "full stack engineer": ["full stack engineer", "full stack developer", "front end and back end developer"]
+    }
+}
 
-def parse_natural_query(state: AgentState) -> AgentState:
-    parser_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert at parsing job search queries. Extract the column names 
+def _prompt_literal(value) -> str:
+    """Render a map as JSON with braces escaped for ChatPromptTemplate."""
+    return json.dumps(value, indent=4).replace("{", "{{").replace("}", "}}")
+
+PARSER_SYSTEM_PROMPT = f"""You are an expert at parsing job search queries. Extract the column names 
         and their corresponding values based on the following schema map:
-        {{
-            "role": "SEARCH_QUERY",
-            "job": "SEARCH_QUERY",
-            "title": "TITLE",
-            "company": "COMPANY",
-            "location": "LOCATION",
-            "description": "DESCRIPTION",
-            "posted_date": "POSTED_DATE"
-        }}
+        {_prompt_literal(SCHEMA_TO_TABLE_MAP)}
 
         Include relevant synonyms for each value from this synonym map:
-        {{
-            "SEARCH_QUERY": {{
-                "data": [
-                    "data", "data engineer", "data scientist", 
-                    "data analyst", "data specialist", "data science", 
-                    "data engineering", "data analytics"
-                ],
-                "data engineer": ["data engineer", "data engineering"],
-                "data scientist": ["data scientist", "data science", "machine learning scientist"],
-                "AI engineer": ["AI engineer", "artificial intelligence engineer"],
-                "machine learning engineer": ["machine learning engineer", "ML engineer"],
-                "data analyst": ["data analyst", "data analytics"],
-                "AI/ML engineer": ["AI/ML engineer", "artificial intelligence/machine learning engineer"],
-                "software engineer": ["software engineer", "software developer", "software programming"],
-                "devops engineer": ["devops engineer", "site reliability engineer", "SRE"],
-                "full stack engineer": ["full stack engineer", "full stack developer", "front end and back end developer"]
-            }}
-        }}
+        {_prompt_literal(SYNONYM_MAP)}
 
         If the query does not mention a specific role, job, title, company, or location explicitly (e.g., "give me jobs"), 
         or is irrelevant, return:
-        {{
+        {{{{
             'role': [], 
             'company': [], 
             'location': [], 
             'title': [], 
             'description': [], 
             'posted_date': []
-        }}.
+        }}}}.
 
         Return a valid Python dictionary where:
         - Keys are column names from the schema map.
         - Values are lists of terms to search for, including synonyms.
         Format the output as valid Python syntax with no extra text or code blocks.
-        Example: {{'column_name': ['value1', 'value2']}}"""),
-        ("user", "Parse this job search query: {natural_query}")
-    ])
+        Example: {{{{'column_name': ['value1', 'value2']}}}}"""
+
+# Built once at import; the template is immutable and safe to share across requests
+PARSER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", PARSER_SYSTEM_PROMPT),
+    ("user", "Parse this job search query: {natural_query}")
+])
+
+# Any edit to the prompt, the maps or the model changes this hash and retires old cache entries
+PARSER_CACHE_VERSION = hashlib.sha256(
+    json.dumps([PARSER_SYSTEM_PROMPT, SCHEMA_TO_TABLE_MAP, SYNONYM_MAP, PARSER_MODEL]).encode("utf-8")
+).hexdigest()[:16]
+
+# Normalized query -> parsed_query, in memory and on disk
+parsed_query_cache = PersistentCache(
+    os.path.join(CACHE_DIR, "parsed_queries.sqlite3"),
+    version=PARSER_CACHE_VERSION,
+    max_memory_entries=QUERY_CACHE_MAX_ENTRIES,
+)
 
-    
-    chain = parser_prompt | llm
-    response = chain.invoke({
-        "natural_query": state["natural_query"]
-    })
+# Deterministic fast path for plain "<role> jobs in <location>" queries
+rule_query_parser = RuleBasedQueryParser(SYNONYM_MAP)
+
+def normalize_search_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key for a search string."""
+    return " ".join(query.lower().split()).strip(" .,!?;:")
+
+def parse_natural_query(state: AgentState) -> AgentState:
+    if QUERY_RULES_ENABLED:
+        parsed = rule_query_parser.parse(state["natural_query"])
+        if parsed is not None:
+            state["parsed_query"] = parsed
+            print(f"Parsed query (rules): {state['parsed_query']}")
+            return state
+
+    cache_key = normalize_search_query(state["natural_query"])
+    cached = parsed_query_cache.get(cache_key)
+    if cached is not None:
+        state["parsed_query"] = {column: list(terms) for column, terms in cached.items()}
+        print(f"Parsed query (cached): {state['parsed_query']}")
+        return state
+
+    response = llm_gateway.complete(
+        chat_messages(PARSER_PROMPT.format_messages(natural_query=state["natural_query"])),
+        model=PARSER_MODEL,
+        temperature=0,
+    )
     
     try:
         content = response.content if hasattr(response, 'content') else response
@@ -578,6 +968,7 @@ def parse_natural_query(state: AgentState) -> AgentState:
         
         if isinstance(parsed, dict) and all(isinstance(v, list) for v in parsed.values()):
             state["parsed_query"] = parsed
+            parsed_query_cache.set(cache_key, parsed)
         else:
             raise ValueError("Parsed query does not return valid lists of terms.")
     except Exception as e:
@@ -587,63 +978,198 @@ def parse_natural_query(state: AgentState) -> AgentState:
     return state
 
 
+def encode_search_cursor(posted_date, job_id) -> str:
+    """Opaque keyset cursor pointing just after the given (POSTED_DATE, JOB_ID) row."""
+    payload = json.dumps([str(posted_date) if posted_date is not None else None, job_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def encode_rank_cursor(offset: int) -> str:
+    """Opaque cursor for ranked search modes, pointing at a position in the ranking."""
+    payload = json.dumps({"offset": int(offset)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_search_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if isinstance(value, dict):
+            offset = value["offset"]
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError
+            return {"offset": offset}
+        posted_date, job_id = value
+    except Exception:
+        raise ValueError("Invalid search cursor.")
+    return {"posted_date": posted_date, "job_id": job_id}
+
 def write_sql_query(state: AgentState) -> AgentState:
     conditions = []
-    schema_to_table_map = {
-        "role": "SEARCH_QUERY",
-        "job": "SEARCH_QUERY",
-        "title": "TITLE",
-        "company": "COMPANY",
-        "location": "LOCATION",
-        "description": "DESCRIPTION",
-        "posted_date": "POSTED_DATE"
-    }
+    params = {}
     
     # Consolidate and deduplicate conditions for fields mapping to the same column
     column_conditions = {}
-    for schema_field, table_column in schema_to_table_map.items():
+    for schema_field, table_column in SCHEMA_TO_TABLE_MAP.items():
         terms = state["parsed_query"].get(schema_field, [])
         if terms:  # Only add conditions for non-empty terms
             if table_column not in column_conditions:
                 column_conditions[table_column] = set()  # Use a set to avoid duplicates
             column_conditions[table_column].update(terms)  # Add terms to the set
 
-    # Generate SQL WHERE clause
+    # Generate SQL WHERE clause; search terms are bound as parameters, never inlined
     for table_column, terms in column_conditions.items():
         if terms:  # Avoid empty conditions
-            term_conditions = [f"{table_column} ILIKE '%{term}%'" for term in sorted(terms)]
+            term_conditions = []
+            for term in sorted(terms):
+                param = f"term_{len(params)}"
+                params[param] = f"%{term}%"
+                term_conditions.append(f"{table_column} ILIKE %({param})s")
             conditions.append(f"({' OR '.join(term_conditions)})")
-    
-    if conditions:
-        where_clause = " AND ".join(conditions)
-        sql_query = f"SELECT * FROM JOBLISTINGS WHERE {where_clause}"
-    else:
-        sql_query = "SELECT * FROM JOBLISTINGS"  # Default query if no conditions
+
+    state["filters"] = {column: sorted(terms) for column, terms in column_conditions.items() if terms}
+    filter_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    state["count_sql"] = f"SELECT COUNT(*) FROM JOBLISTINGS{filter_clause}"
+
+    # Keyset pagination over a stable order: newest first, ties broken by JOB_ID
+    cursor = state.get("cursor")
+    if cursor:
+        params["cursor_job_id"] = cursor["job_id"]
+        if cursor["posted_date"] is None:
+            conditions.append("(POSTED_DATE IS NULL AND JOB_ID > %(cursor_job_id)s)")
+        else:
+            params["cursor_posted_date"] = cursor["posted_date"]
+            conditions.append(
+                "(POSTED_DATE < %(cursor_posted_date)s"
+                " OR (POSTED_DATE = %(cursor_posted_date)s AND JOB_ID > %(cursor_job_id)s)"
+                " OR POSTED_DATE IS NULL)"
+            )
+
+    limit = min(state.get("limit") or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+    state["limit"] = limit
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Fetch one extra row to learn whether another page exists
+    sql_query = (
+        f"SELECT {', '.join(state.get('select_columns') or ['*'])} FROM JOBLISTINGS{where_clause}"
+        f" ORDER BY POSTED_DATE DESC NULLS LAST, JOB_ID ASC LIMIT {int(limit) + 1}"
+    )
     
     state["sql"] = sql_query
+    state["sql_params"] = params
     print(f"Generated SQL: {state['sql']}")
     return state
 
+def execute_snapshot_query(state: AgentState, snapshot) -> AgentState:
+    """Serve a search page from the in-memory JOBLISTINGS snapshot instead of Snowflake."""
+    limit = state["limit"]
+    first_page = not state.get("cursor")
+    rows, has_more, total = snapshot.search(
+        state.get("filters") or {}, limit, cursor=state.get("cursor"), count=first_page
+    )
+    columns = state.get("select_columns") or snapshot.columns
+    state["next_cursor"] = None
+    if has_more:
+        state["next_cursor"] = encode_search_cursor(rows[-1].get("POSTED_DATE"), rows[-1].get("JOB_ID"))
+    state["total_estimate"] = total
+    state["results"] = pd.DataFrame(snapshot.project(rows, columns), columns=columns)
+    return state
+
+# Parsed-query columns scored as free text in ranked modes; the rest are filters
+RANKED_TEXT_COLUMNS = ("SEARCH_QUERY", "TITLE", "DESCRIPTION")
+
+# Snapshot indexes each ranked mode needs; the BM25 index also evaluates company/location filters
+RANKED_MODE_INDEXES = {
+    "bm25": ("bm25",),
+    "semantic": ("bm25", "semantic"),
+    "hybrid": ("bm25", "semantic"),
+}
+
+def execute_ranked_query(state: AgentState, snapshot) -> AgentState:
+    """Serve a page of relevance-ranked results from the snapshot's search indexes."""
+    try:
+        mode = state["mode"]
+        missing = [name for name in RANKED_MODE_INDEXES[mode] if name not in snapshot.indexes]
+        if missing:
+            raise RuntimeError(f"The {', '.join(missing)} search index is not loaded.")
+        keyword_index = snapshot.indexes["bm25"]
+        filters = state.get("filters") or {}
+        text = " ".join(term for column in RANKED_TEXT_COLUMNS for term in filters.get(column, []))
+        field_filters = {column: terms for column, terms in filters.items() if column in ("COMPANY", "LOCATION")}
+        predicate = None
+        if filters.get("POSTED_DATE"):
+            posted_terms = [term.lower() for term in filters["POSTED_DATE"]]
+            predicate = lambda doc_id: any(
+                term in str(snapshot.rows[doc_id].get("POSTED_DATE") or "").lower() for term in posted_terms
+            )
+
+        offset = (state.get("cursor") or {}).get("offset", 0)
+        limit = state["limit"]
+        k = offset + limit + 1
+        if mode == "bm25":
+            doc_ids, scores, total = keyword_index.search(text, k, filters=field_filters, predicate=predicate)
+        else:
+            restrict = lambda candidates: keyword_index.restrict(candidates, field_filters, predicate)
+            if mode == "semantic":
+                doc_ids, scores, total = snapshot.indexes["semantic"].search(
+                    text, k, restrict=restrict, min_score=SEMANTIC_MIN_SCORE
+                )
+            else:
+                doc_ids, scores, total = hybrid_search(
+                    keyword_index, snapshot.indexes["semantic"], text, k,
+                    alpha=HYBRID_ALPHA, restrict=restrict, min_score=SEMANTIC_MIN_SCORE,
+                )
+
+        columns = state.get("select_columns") or snapshot.columns
+        page = []
+        for doc_id, score in zip(doc_ids[offset:offset + limit], scores[offset:offset + limit]):
+            row = {column: snapshot.rows[doc_id].get(column) for column in columns}
+            row["SCORE"] = round(float(score), 4)
+            page.append(row)
+        state["next_cursor"] = encode_rank_cursor(offset + limit) if len(doc_ids) > offset + limit else None
+        state["total_estimate"] = total
+        state["sql"] = ""  # Nothing ran against Snowflake
+        state["results"] = pd.DataFrame(page, columns=columns + ["SCORE"])
+    except Exception as e:
+        state["results"] = f"Error: {str(e)}"
+    return state
+
 # Execute Query
 def execute_query(state: AgentState) -> AgentState:
+    snapshot = listings_snapshot.current()
+    if state.get("mode", "filter") != "filter":
+        return execute_ranked_query(state, snapshot)
+    if snapshot is not None:
+        return execute_snapshot_query(state, snapshot)
     try:
-        conn = snowflake.connector.connect(
-            account=account,
-            user=user,
-            password=password,
-            database=database,
-            schema=schema,
-            warehouse=warehouse
-        )
+        conn = get_snowflake_joblistings_connection()
         cursor = conn.cursor()
-        cursor.execute(state["sql"])
+        params = state.get("sql_params") or {}
+        cursor.execute(state["sql"], params)
         columns = [col[0] for col in cursor.description]
         results = cursor.fetchall()
+
+        limit = state["limit"]
+        state["next_cursor"] = None
+        if len(results) > limit:
+            results = results[:limit]
+            last_row = dict(zip(columns, results[-1]))
+            state["next_cursor"] = encode_search_cursor(last_row.get("POSTED_DATE"), last_row.get("JOB_ID"))
+
+        # Count matches only for the first page; later pages reuse the client's first total
+        state["total_estimate"] = None
+        if not state.get("cursor"):
+            if state["next_cursor"] is None:
+                state["total_estimate"] = len(results)
+            else:
+                count_params = {k: v for k, v in params.items() if k.startswith("term_")}
+                cursor.execute(state["count_sql"], count_params)
+                state["total_estimate"] = cursor.fetchone()[0]
+
         state["results"] = pd.DataFrame(results, columns=columns)
-        cursor.close()
-        conn.close()
     except Exception as e:
         state["results"] = f"Error: {str(e)}"
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+        if "conn" in locals() and conn:
+            conn.close()
     return state
 
 # Format Output
@@ -653,7 +1179,10 @@ def format_output(state: AgentState) -> AgentState:
             "status": "success",
             "parsed_query": state["parsed_query"],
             "data": state["results"].to_dict(orient="records"),
-            "sql": state["sql"]
+            "sql": state["sql"],
+            "limit": state["limit"],
+            "next_cursor": state.get("next_cursor"),
+            "total_estimate": state.get("total_estimate"),
         }
     else:
         state["final_output"] = {
@@ -684,22 +1213,65 @@ def create_workflow():
     
     return workflow.compile()
 
+# The compiled graph holds no per-request state (no checkpointer), so one instance is shared
+search_workflow = None
+search_workflow_lock = threading.Lock()
+
+def get_search_workflow():
+    """Return the shared compiled search graph, compiling it on first use."""
+    global search_workflow
+    if search_workflow is None:
+        with search_workflow_lock:
+            if search_workflow is None:
+                search_workflow = create_workflow()
+    return search_workflow
+
 # Add this to your existing endpoint
 @app.get("/search/jobs", response_model=JobSearchResponse)
 async def search_job_listings(
     query: str,
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, description=f"Page size, capped at {SEARCH_MAX_LIMIT}"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query("summary", description=FIELDS_QUERY_DESCRIPTION),
+    mode: str = Query("filter", pattern="^(filter|bm25|semantic|hybrid)$",
+                      description="'filter' matches terms newest first; 'bm25' ranks by keyword relevance, "
+                                  "'semantic' by vector similarity, 'hybrid' blends the two"),
     current_user: UserOut = Depends(get_current_user)
 ):
     try:
-        graph = create_workflow()
+        decoded_cursor = decode_search_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if decoded_cursor and ("offset" in decoded_cursor) != (mode != "filter"):
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this search mode.")
+    if mode != "filter":
+        snapshot = listings_snapshot.current()
+        if snapshot is None or any(name not in snapshot.indexes for name in RANKED_MODE_INDEXES[mode]):
+            raise HTTPException(status_code=503, detail=f"The {mode} search index is not loaded yet.")
+    # The paging cursor is built from POSTED_DATE and JOB_ID, so both are always selected
+    select_columns = resolve_projection(
+        fields, LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS, required_columns=("JOB_ID", "POSTED_DATE")
+    )
+
+    try:
+        graph = get_search_workflow()
         initial_state = {
             "natural_query": query,
             "parsed_query": {},
             "sql": "",
+            "sql_params": {},
+            "mode": mode,
+            "select_columns": select_columns,
+            "filters": {},
+            "count_sql": "",
+            "limit": min(limit, SEARCH_MAX_LIMIT),
+            "cursor": decoded_cursor,
+            "next_cursor": None,
+            "total_estimate": None,
             "results": "",
             "final_output": ""
         }
-        result = graph.invoke(initial_state)
+        result = await run_blocking("llm", graph.invoke, initial_state)
         
         if result["final_output"]["status"] == "error":
             raise HTTPException(
@@ -716,17 +1288,7 @@ async def search_job_listings(
     
 # Snowflake connection function for USER_RESULTS_DB
 def get_user_results_db_connection():
-    try:
-        return connect(
-            user=os.getenv("SNOWFLAKE_USER"),
-            password=os.getenv("SNOWFLAKE_PASSWORD"),
-            account=os.getenv("SNOWFLAKE_ACCOUNT"),
-            database=os.getenv("SNOWFLAKE_USER_RESULTS_DB"),
-            schema=os.getenv("SNOWFLAKE_SCHEMA"),
-            warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        )
-    except ProgrammingError as e:
-        raise HTTPException(status_code=500, detail=f"Snowflake connection error for USER_RESULTS_DB: {e}")
+    return _acquire_pooled_connection("user_results")
     
 @app.post("/jobs/save")
 async def save_job(
@@ -746,7 +1308,7 @@ async def save_job(
     Creates a new table for the user based on their UUID if it does not already exist.
     """
     try:
-        conn = get_user_results_db_connection()
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
         cur = conn.cursor()
 
         # Ensure the UUID is converted to a string before replacing characters
@@ -770,7 +1332,7 @@ async def save_job(
             PRIMARY KEY (job_id)                   -- Primary key for unique jobs
         );
         """
-        cur.execute(create_table_query)
+        await run_blocking("snowflake", cur.execute, create_table_query)
 
         # Use a MERGE statement for upserting
         merge_query = f"""
@@ -819,8 +1381,8 @@ async def save_job(
             'status': status
         }
 
-        cur.execute(merge_query, params)
-        conn.commit()
+        await run_blocking("snowflake", cur.execute, merge_query, params)
+        await run_blocking("snowflake", conn.commit)
 
         return {"message": f"Job saved successfully in table '{table_name}'."}
     except Exception as e:
@@ -832,22 +1394,26 @@ async def save_job(
             conn.close()
 
 @app.get("/jobs/saved", response_model=list)
-async def get_saved_jobs(current_user: UserOut = Depends(get_current_user)):
+async def get_saved_jobs(
+    fields: Optional[str] = Query("summary", description=FIELDS_QUERY_DESCRIPTION),
+    current_user: UserOut = Depends(get_current_user),
+):
     """
     Fetch all saved jobs for the logged-in user.
     """
+    select_list = ", ".join(resolve_projection(fields, SAVED_JOB_COLUMNS, SAVED_JOB_SUMMARY_COLUMNS))
     try:
-        conn = get_user_results_db_connection()
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
         cur = conn.cursor()
 
         # Dynamically generate the table name
         table_name = f"user_{str(current_user.id).replace('-', '_')}"
 
         # Query to fetch all jobs
-        fetch_jobs_query = f"SELECT * FROM {table_name};"
-        cur.execute(fetch_jobs_query)
+        fetch_jobs_query = f"SELECT {select_list} FROM {table_name};"
+        await run_blocking("snowflake", cur.execute, fetch_jobs_query)
         columns = [col[0] for col in cur.description]  # Get column names
-        rows = cur.fetchall()
+        rows = await run_blocking("snowflake", cur.fetchall)
 
         # Format results as a list of dictionaries
         saved_jobs = [dict(zip(columns, row)) for row in rows]
@@ -871,7 +1437,7 @@ async def update_job_status(
     Update the status of a saved job for the logged-in user.
     """
     try:
-        conn = get_user_results_db_connection()
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
         cur = conn.cursor() 
 
         # Dynamically generate the table name
@@ -884,8 +1450,8 @@ async def update_job_status(
         WHERE job_id = %(job_id)s;
         """
         params = {'job_id': job_id, 'new_status': new_status}
-        cur.execute(update_query, params)
-        conn.commit()
+        await run_blocking("snowflake", cur.execute, update_query, params)
+        await run_blocking("snowflake", conn.commit)
 
         return {"message": "Job status updated successfully."}
     except Exception as e:
@@ -902,7 +1468,7 @@ async def delete_job(job_id: str, current_user: UserOut = Depends(get_current_us
     Endpoint to delete a saved job by job_id for the logged-in user.
     """
     try:
-        conn = get_user_results_db_connection()
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
         cur = conn.cursor()
 
         # Generate the user's table name dynamically based on their UUID
@@ -914,14 +1480,14 @@ async def delete_job(job_id: str, current_user: UserOut = Depends(get_current_us
         WHERE TABLE_NAME = '{table_name.upper()}' 
         AND TABLE_SCHEMA = '{os.getenv("SNOWFLAKE_SCHEMA").upper()}';
         """
-        cur.execute(check_table_query)
-        if cur.fetchone()[0] == 0:
+        await run_blocking("snowflake", cur.execute, check_table_query)
+        if (await run_blocking("snowflake", cur.fetchone))[0] == 0:
             raise HTTPException(status_code=404, detail="No saved jobs found for this user.")
 
         # Delete the job
         delete_query = f"DELETE FROM {table_name} WHERE job_id = %s"
-        cur.execute(delete_query, (job_id,))
-        conn.commit()
+        await run_blocking("snowflake", cur.execute, delete_query, (job_id,))
+        await run_blocking("snowflake", conn.commit)
 
         # Check if the job was deleted
         if cur.rowcount == 0:
@@ -939,79 +1505,153 @@ async def delete_job(job_id: str, current_user: UserOut = Depends(get_current_us
             conn.close()
 
 import fitz 
+import requests
 
-def extract_text_from_pdf(pdf_content: bytes) -> str:
-    text = ""
-    try:
-        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}")
-    return text
+# Processed resume / cover letter (see document_processing), keyed by user, document type
+# and profile version. The profile's updated_at changes whenever a file is replaced, so
+# replaced documents miss on every instance, not just the one that handled the upload.
+DOCUMENT_LINK_FIELDS = {"resume": "resume_link", "cover_letter": "cover_letter_link"}
+document_text_cache = PersistentCache(
+    os.path.join(CACHE_DIR, "document_text.sqlite3"),
+    version=f"pymupdf-{fitz.VersionBind}-processor-{PROCESSOR_VERSION}",
+    max_memory_entries=DOCUMENT_CACHE_MAX_ENTRIES,
+)
 
-import requests
+# Upload-time processing still running, by cache key, so a feedback request that arrives
+# first waits for it instead of parsing the same PDF again
+document_jobs = {}
 
-@app.post("/feedback")
-async def generate_feedback(
-    job_id: str,
-    description: str,
-    highlights: str,
-    current_user: UserOut = Depends(get_current_user),
-):
+def profile_version(created_at, updated_at) -> str:
+    return str(updated_at or created_at)
+
+def document_cache_key(user_id, document_type, version) -> str:
+    return f"{user_id}:{document_type}:{version}"
+
+def processed_document_key(user_id, document_type) -> str:
+    # Stored next to the uploaded PDF
+    return f"user-profiles/{user_id}/{document_type}.json"
+
+async def process_uploaded_document(user_id, document_type, version, content: bytes) -> dict:
     """
-    Generate detailed feedback for the user's resume and cover letter based on the job description and highlights.
+    Extract, normalize, section-split and token-count a document on the process pool,
+    cache the result and persist it to S3 for instances with a cold cache.
     """
+    processed = await process_pool.run("document", process_document, content, document_type)
+    processed["profile_version"] = version
+    document_text_cache.set(document_cache_key(user_id, document_type, version), processed)
+    await run_blocking(
+        "s3",
+        s3_client.put_object,
+        Bucket=AWS_S3_BUCKET_NAME,
+        Key=processed_document_key(user_id, document_type),
+        Body=json.dumps(processed).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return processed
+
+async def _process_in_background(user_id, document_type, version, content: bytes):
     try:
-        # Fetch the publicly accessible links for the resume and cover letter
-        resume_link = current_user.resume_link
-        cover_letter_link = current_user.cover_letter_link
-        if not resume_link or not cover_letter_link:
-            raise HTTPException(status_code=400, detail="Resume or cover letter not found.")
-
-        # Fetch the files from the public URLs
-        resume_response = requests.get(resume_link)
-        cover_letter_response = requests.get(cover_letter_link)
-
-        # Check for successful retrieval
-        if resume_response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch resume from the provided URL.")
-        if cover_letter_response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch cover letter from the provided URL.")
-
-        # Extract text from PDFs
-        resume_text = extract_text_from_pdf(resume_response.content)
-        cover_letter_text = extract_text_from_pdf(cover_letter_response.content)
-
-        # Debug: Log extracted content (optional, remove in production)
-        print("=== Extracted Resume Content ===")
-        print(resume_text)
-        print("\n=== Extracted Cover Letter Content ===")
-        print(cover_letter_text)
-
-        # Prepare context for the LLM
-        context = {
-            "job_description": description,
-            "job_highlights": highlights,
-            "resume_text": resume_text,
-            "cover_letter_text": cover_letter_text,
-        }
+        return await process_uploaded_document(user_id, document_type, version, content)
+    except Exception as e:
+        # Only costs a parse on first use
+        print(f"Could not process {document_type} for user {user_id}: {str(e)}")
+        return None
 
-        # Create a prompt template
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert career advisor."),
-            ("user", """
-                Job Description:
-                {job_description}
+def schedule_document_processing(user_id, document_type, version, content: bytes):
+    """Start processing a just-uploaded document without holding up the upload response."""
+    key = document_cache_key(user_id, document_type, version)
+    job = asyncio.create_task(_process_in_background(user_id, document_type, version, content))
+    document_jobs[key] = job
+    job.add_done_callback(lambda _: document_jobs.pop(key, None) if document_jobs.get(key) is job else None)
+    return job
 
-                Job Highlights:
-                {job_highlights}
+def read_processed_document(user_id, document_type, version):
+    """The processed document persisted to S3 for this profile version, or None."""
+    try:
+        response = s3_client.get_object(Bucket=AWS_S3_BUCKET_NAME, Key=processed_document_key(user_id, document_type))
+        processed = json.loads(response["Body"].read())
+    except Exception:
+        return None
+    if processed.get("profile_version") != version or processed.get("processor_version") != PROCESSOR_VERSION:
+        return None
+    return processed
 
-                Candidate's Resume:
-                {resume_text}
+@contextmanager
+def record_stage(timings, name):
+    """Record the wall-clock milliseconds spent in the block as timings[name] (if timings is given)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
 
-                Candidate's Cover Letter:
-                {cover_letter_text}
+async def run_stage(timings, name, awaitable, timeout):
+    """Await one stage of a request under its own deadline, recording how long it took."""
+    with record_stage(timings, name):
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Timed out in the {name} stage.")
+
+def server_timing(timings) -> str:
+    # Server-Timing header value, so stage durations show up in browser and proxy traces
+    return ", ".join(f"{name};dur={duration}" for name, duration in timings.items())
+
+async def get_processed_document(user: UserOut, document_type: str, timings=None) -> dict:
+    """
+    The user's processed resume or cover letter. Served from the cache populated at
+    upload time, then from the copy persisted to S3; only when neither has it is the PDF
+    downloaded and processed once. Each step taken is recorded in `timings` as
+    "<document type>_<step>".
+    """
+    version = profile_version(user.created_at, user.updated_at)
+    key = document_cache_key(user.id, document_type, version)
+    with record_stage(timings, f"{document_type}_cache"):
+        cached = document_text_cache.get(key)
+    if cached is not None:
+        return cached
+
+    job = document_jobs.get(key)
+    if job is not None and not job.done():
+        with record_stage(timings, f"{document_type}_upload_processing"):
+            processed = await asyncio.shield(job)
+        if processed is not None:
+            return processed
+
+    with record_stage(timings, f"{document_type}_s3"):
+        processed = await run_blocking("s3", read_processed_document, user.id, document_type, version)
+    if processed is not None:
+        document_text_cache.set(key, processed)
+        return processed
+
+    with record_stage(timings, f"{document_type}_download"):
+        response = await run_blocking(
+            "http", requests.get, getattr(user, DOCUMENT_LINK_FIELDS[document_type]), timeout=HTTP_FETCH_TIMEOUT
+        )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch {document_type.replace('_', ' ')} from the provided URL."
+        )
+    try:
+        with record_stage(timings, f"{document_type}_process"):
+            return await process_uploaded_document(user.id, document_type, version, response.content)
+    except TaskTimeoutError:
+        raise HTTPException(status_code=503, detail="Document processing is busy; please try again.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}")
+
+async def get_document_text(user: UserOut, document_type: str) -> str:
+    """Normalized text of the user's resume or cover letter."""
+    return (await get_processed_document(user, document_type))["text"]
+
+# Built once; /feedback only formats it
+FEEDBACK_MODEL = "gpt-4o-mini"
+FEEDBACK_TEMPERATURE = 0.7
+FEEDBACK_PROMPT = ChatPromptTemplate.from_messages([
+    # Static instructions first so repeat requests share a cacheable prompt prefix
+    ("system", """
+                You are an expert career advisor.
 
                 Instructions:
                 - Validate the document type before providing feedback:
@@ -1038,125 +1678,428 @@ async def generate_feedback(
 
                 Focus on actionable feedback that helps the candidate improve alignment with the job.
             """),
-        ])
+    ("user", """
+                Job Description:
+                {job_description}
 
-        # Initialize LangChain LLM
-        chat_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-        response = chat_llm.invoke(prompt_template.format(**context))
+                Job Highlights:
+                {job_highlights}
+
+                Candidate's Resume:
+                {resume_text}
 
-        return {"feedback": response.content}
+                Candidate's Cover Letter:
+                {cover_letter_text}
+            """),
+])
 
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    
+# Shares of the prompt budget; sections under their share keep their full text
+feedback_budget = PromptBudget(
+    PROMPT_MAX_TOKENS,
+    {"resume_text": 0.35, "job_description": 0.3, "cover_letter_text": 0.2, "job_highlights": 0.15},
+)
 
-@app.post("/chat-feedback")
-async def chat_feedback(
-    document_type: str = Form(..., description="Type of document (resume or cover letter)"),
-    question: str = Form(..., description="User's specific question"),
-    description: str = Form(..., description="Job description for context"),
-    highlights: str = Form(..., description="Job highlights for context"),
-    current_user: UserOut = Depends(get_current_user),
-):
+def fit_prompt(budget: PromptBudget, prompt: ChatPromptTemplate, sections: dict, queries: dict, fixed: dict = None):
     """
-    Generate feedback for a specific question based on the user's selected document.
+    Fit `sections` into `budget` around the prompt's own text and the `fixed` (never cut)
+    values. Returns (prompt context, report of original and final tokens per section).
     """
-    try:
-        # Get public resume and cover letter links
-        if document_type == "resume":
-            document_link = current_user.resume_link
-        elif document_type == "cover_letter":
-            document_link = current_user.cover_letter_link
-        else:
-            raise HTTPException(status_code=400, detail="Invalid document type.")
+    fixed = fixed or {}
+    template = prompt.format_messages(**{name: "" for name in sections}, **fixed)
+    reserved = sum(count_tokens(message.content) for message in template)
+    fitted, report = budget.fit(sections, queries, reserved)
+    return {**fitted, **fixed}, report
+
+# Generated feedback, content-addressed by the prompt template, model settings and the
+# hashes of all four (budget-fitted) inputs; a replaced document has new text and so a new key
+feedback_cache = PersistentCache(
+    os.path.join(CACHE_DIR, "feedback.sqlite3"),
+    version="feedback-v1",
+    max_memory_entries=FEEDBACK_CACHE_MAX_ENTRIES,
+    max_disk_bytes=FEEDBACK_CACHE_MAX_BYTES,
+)
+FEEDBACK_PROMPT_HASH = hashlib.sha256(FEEDBACK_PROMPT.pretty_repr().encode("utf-8")).hexdigest()
+
+def feedback_cache_key(context: dict) -> str:
+    def digest(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    parts = {
+        "prompt": FEEDBACK_PROMPT_HASH,
+        "model": FEEDBACK_MODEL,
+        "temperature": FEEDBACK_TEMPERATURE,
+        **{name: digest(value) for name, value in sorted(context.items())},
+    }
+    return digest(json.dumps(parts, sort_keys=True))
 
-        if not document_link:
-            raise HTTPException(status_code=400, detail="Selected document not found.")
+async def prepare_feedback(current_user: UserOut, description: str, highlights: str, timings: dict):
+    """
+    Load both documents, fit them and the posting into the prompt budget and look up cached
+    feedback; returns (prompt context, cache key, cached entry, prompt token report).
+    """
+    # Fetch the publicly accessible links for the resume and cover letter
+    resume_link = current_user.resume_link
+    cover_letter_link = current_user.cover_letter_link
+    if not resume_link or not cover_letter_link:
+        raise HTTPException(status_code=400, detail="Resume or cover letter not found.")
+
+    # Documents are processed at upload time; on a cold cache both are fetched and
+    # processed concurrently
+    resume, cover_letter = await run_stage(
+        timings,
+        "documents",
+        asyncio.gather(
+            get_processed_document(current_user, "resume", timings),
+            get_processed_document(current_user, "cover_letter", timings),
+        ),
+        FEEDBACK_DOCUMENTS_TIMEOUT,
+    )
+    resume_text, cover_letter_text = resume["text"], cover_letter["text"]
+
+    # Prepare context for the LLM, keeping the passages most relevant to the job
+    sections = {
+        "job_description": description,
+        "job_highlights": highlights,
+        "resume_text": resume_text,
+        "cover_letter_text": cover_letter_text,
+    }
+    queries = {
+        "job_description": f"{highlights}\n{resume_text}",
+        "job_highlights": resume_text,
+        "resume_text": f"{description}\n{highlights}",
+        "cover_letter_text": f"{description}\n{highlights}",
+    }
+    with record_stage(timings, "budget"):
+        context, prompt_tokens = await run_blocking("cpu", fit_prompt, feedback_budget, FEEDBACK_PROMPT, sections, queries)
 
-        # Fetch the document content
-        document_response = requests.get(document_link)
-        if document_response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch the document.")
+    # Repeat views of the same job with the same documents skip the LLM
+    with record_stage(timings, "cache"):
+        cache_key = feedback_cache_key(context)
+        cached = feedback_cache.get(cache_key)
+    return context, cache_key, cached, prompt_tokens
 
-        document_text = extract_text_from_pdf(document_response.content)
+# Headers that keep proxies (nginx) from buffering an event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
-        # Prepare context for the LLM
-        context = {
-            "job_description": description,
-            "job_highlights": highlights,
-            "document_text": document_text,
-            "question": question,
-        }
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "You are a career coach specializing in job applications."),
-            ("user", """
-                Job Description:
-                {job_description}
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-                Job Highlights:
-                {job_highlights}
+def close_abandoned_stream(opening):
+    if not opening.cancelled() and opening.exception() is None:
+        opening.result().close()
 
-                Selected Document Content:
-                {document_text}
+async def stream_llm_as_sse(messages: list, timings: dict, start: float, on_complete=None):
+    """
+    Yield the completion of `messages` as server-sent events while it is generated: one
+    "token" event per chunk, then "done" with the stage timings, or "error". When the client
+    disconnects the response cancels this generator, which closes the upstream LLM stream; so
+    does FEEDBACK_LLM_TIMEOUT running out, whether or not a chunk is arriving.
+    """
+    chunks = []
+    llm_start = time.perf_counter()
+    deadline = llm_start + FEEDBACK_LLM_TIMEOUT
+    opening = asyncio.ensure_future(run_blocking(
+        "llm", llm_gateway.stream, messages, model=FEEDBACK_MODEL, temperature=FEEDBACK_TEMPERATURE
+    ))
+    try:
+        try:
+            stream = await asyncio.wait_for(asyncio.shield(opening), FEEDBACK_LLM_TIMEOUT)
+        except BaseException:
+            # A stream that opens after we stop waiting would otherwise hold its concurrency slot
+            opening.add_done_callback(close_abandoned_stream)
+            raise
+        async for text in iterate_blocking("llm", stream, deadline):
+            if not chunks:
+                timings["first_token"] = round((time.perf_counter() - start) * 1000, 1)
+            chunks.append(text)
+            yield sse_event("token", {"text": text})
+    except asyncio.TimeoutError:
+        yield sse_event("error", {"detail": "Timed out in the llm stage."})
+        return
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Unexpected error: {str(e)}"})
+        return
+
+    timings["llm"] = round((time.perf_counter() - llm_start) * 1000, 1)
+    if on_complete:
+        on_complete("".join(chunks))
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+    yield sse_event("done", {"cached": False, "timings": timings})
+
+async def replay_as_sse(text: str, timings: dict, start: float):
+    """A cached completion in the same event format as stream_llm_as_sse."""
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+    yield sse_event("token", {"text": text})
+    yield sse_event("done", {"cached": True, "timings": timings})
+
+async def compute_feedback(current_user: UserOut, description: str, highlights: str, timings: dict) -> dict:
+    """Feedback for the user's documents against the job, from the cache or the LLM, with stage timings."""
+    start = time.perf_counter()
+    context, cache_key, cached, prompt_tokens = await prepare_feedback(current_user, description, highlights, timings)
+
+    if cached is not None:
+        feedback = cached["feedback"]
+    else:
+        with record_stage(timings, "prompt"):
+            messages = chat_messages(FEEDBACK_PROMPT.format_messages(**context))
+
+        llm_response = await run_stage(
+            timings,
+            "llm",
+            run_blocking("llm", llm_gateway.complete, messages, model=FEEDBACK_MODEL, temperature=FEEDBACK_TEMPERATURE),
+            FEEDBACK_LLM_TIMEOUT,
+        )
+        feedback = llm_response.content
+        feedback_cache.set(cache_key, {"feedback": feedback})
 
-                Question:
-                {question}
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+    return {"feedback": feedback, "cached": cached is not None, "timings": timings, "prompt_tokens": prompt_tokens}
 
-                Instructions:
-                - If the document content is a resume:
-                    - Provide detailed suggestions and improvements based on the alignment with the job description and highlights.
-                    - Highlight specific areas that can be improved, such as tailoring skills, optimizing keywords, or structuring the resume for clarity and relevance.
-                    - Provide a relevance score (0-100) indicating how well the resume matches the job requirements, based on factors like skills, experience, and alignment with job highlights.
-                - If the document content is a cover letter:
-                    - Provide detailed suggestions and improvements based on how well it aligns with the job description and highlights.
-                    - Suggest ways to make the cover letter more compelling and tailored, such as emphasizing achievements or aligning the tone with the company culture.
-                - If the document content is irrelevant (not a resume or cover letter):
-                    - Respond with: "The provided content is not relevant for resume or cover letter feedback. Please provide relevant documents."
-                - If the user asks anything irrelevant (not related to job applications, resumes, or cover letters):
-                    - Respond with: "The question is not related to job applications, resumes, or cover letters. I can only assist with these topics."
-                - Address edge cases such as:
-                    - Missing key sections in the resume (e.g., education, work experience).
-                    - Overly generic cover letters that lack customization.
-                    - Documents with insufficient content for evaluation.
-                - Focus feedback specifically on how the document content can better align with the job requirements and make a stronger impact.
+# Background /feedback tasks; status and results survive restarts for polling
+feedback_tasks = TaskQueue(
+    os.path.join(CACHE_DIR, "tasks.sqlite3"), workers=FEEDBACK_TASK_WORKERS, result_ttl=TASK_RESULT_TTL
+)
 
-                Provide your response accordingly.
-            """),
-        ])
+def feedback_task_key(current_user: UserOut, job_id: str, description: str, highlights: str) -> str:
+    # Identical requests against the same documents share one pending task; document links
+    # are fixed per user, so the profile version tells a re-upload apart
+    version = profile_version(current_user.created_at, current_user.updated_at)
+    parts = [str(current_user.id), job_id, description, highlights, version]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
 
-        # Generate response using LangChain LLM
-        chat_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-        response = chat_llm.invoke(prompt_template.format(**context))
+async def run_feedback_task(current_user: UserOut, job_id: str, description: str, highlights: str) -> dict:
+    """
+    Background /feedback: generate the feedback, then save it to the job in the user's table.
+    The feedback is in the result even when saving fails; "saved" says whether a row was updated.
+    """
+    result = {**await compute_feedback(current_user, description, highlights, {}), "job_id": job_id}
+    try:
+        updated = await store_feedback(current_user, job_id, result["feedback"])
+    except Exception as e:
+        return {**result, "saved": False, "save_error": f"Error saving feedback: {str(e)}"}
+    if not updated:
+        return {**result, "saved": False, "save_error": "Job not found in saved jobs."}
+    return {**result, "saved": True}
 
-        return {"response": response.content}
+@app.post("/feedback")
+async def generate_feedback(
+    job_id: str,
+    description: str,
+    highlights: str,
+    response: Response,
+    background: bool = Query(False, description="Queue the work and return a task id to poll at /tasks/{task_id}"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Generate detailed feedback for the user's resume and cover letter based on the job description and highlights.
+    Stage durations in milliseconds are returned under "timings" and in the Server-Timing header.
+    With background=true the request returns 202 with a task id at once; the finished
+    feedback is saved to the job in the user's table and returned by /tasks/{task_id}.
+    """
+    if background:
+        task_id, deduplicated = feedback_tasks.submit(
+            "feedback",
+            run_feedback_task,
+            current_user,
+            job_id,
+            description,
+            highlights,
+            owner=str(current_user.id),
+            dedup_key=feedback_task_key(current_user, job_id, description, highlights),
+        )
+        response.status_code = 202
+        return {"task_id": task_id, "status": feedback_tasks.get(task_id)["status"], "deduplicated": deduplicated}
+
+    try:
+        result = await compute_feedback(current_user, description, highlights, {})
+        response.headers["Server-Timing"] = server_timing(result["timings"])
+        return result
 
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: str, current_user: UserOut = Depends(get_current_user)):
+    """
+    Status of a background task: "queued", "running", "completed" (with "result") or
+    "failed" (with "error").
+    """
+    task = feedback_tasks.get(task_id)
+    # Other users' tasks are reported as missing rather than forbidden
+    if task is None or task["owner"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Task not found.")
+    return {
+        "task_id": task["id"],
+        "kind": task["kind"],
+        "status": task["status"],
+        "result": task["result"],
+        "error": task["error"],
+        "created_at": datetime.fromtimestamp(task["created_at"], timezone.utc),
+        "updated_at": datetime.fromtimestamp(task["updated_at"], timezone.utc),
+    }
 
-class SaveFeedbackRequest(BaseModel):
-    job_id: str
-    feedback: str
+@app.post("/feedback/stream")
+async def stream_feedback(
+    job_id: str,
+    description: str,
+    highlights: str,
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    /feedback as a text/event-stream: "token" events carry the feedback as it is generated,
+    and a final "done" event carries "cached" and the stage timings (or an "error" event).
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        context, cache_key, cached, _ = await prepare_feedback(current_user, description, highlights, timings)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-@app.post("/jobs/save-feedback")
-async def save_feedback(
-    feedback_request: SaveFeedbackRequest,
+    if cached is not None:
+        events = replay_as_sse(cached["feedback"], timings, start)
+    else:
+        with record_stage(timings, "prompt"):
+            messages = chat_messages(FEEDBACK_PROMPT.format_messages(**context))
+        events = stream_llm_as_sse(
+            messages, timings, start, on_complete=lambda feedback: feedback_cache.set(cache_key, {"feedback": feedback})
+        )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+# Built once; /chat-feedback only formats it
+CHAT_FEEDBACK_PROMPT = ChatPromptTemplate.from_messages([
+    # Static instructions first so repeat requests share a cacheable prompt prefix
+    ("system", """
+                You are a career coach specializing in job applications.
+
+                Instructions:
+                - If the document content is a resume:
+                    - Provide detailed suggestions and improvements based on the alignment with the job description and highlights.
+                    - Highlight specific areas that can be improved, such as tailoring skills, optimizing keywords, or structuring the resume for clarity and relevance.
+                    - Provide a relevance score (0-100) indicating how well the resume matches the job requirements, based on factors like skills, experience, and alignment with job highlights.
+                - If the document content is a cover letter:
+                    - Provide detailed suggestions and improvements based on how well it aligns with the job description and highlights.
+                    - Suggest ways to make the cover letter more compelling and tailored, such as emphasizing achievements or aligning the tone with the company culture.
+                - If the document content is irrelevant (not a resume or cover letter):
+                    - Respond with: "The provided content is not relevant for resume or cover letter feedback. Please provide relevant documents."
+                - If the user asks anything irrelevant (not related to job applications, resumes, or cover letters):
+                    - Respond with: "The question is not related to job applications, resumes, or cover letters. I can only assist with these topics."
+                - Address edge cases such as:
+                    - Missing key sections in the resume (e.g., education, work experience).
+                    - Overly generic cover letters that lack customization.
+                    - Documents with insufficient content for evaluation.
+                - Focus feedback specifically on how the document content can better align with the job requirements and make a stronger impact.
+
+                Provide your response accordingly.
+            """),
+    ("user", """
+                Job Description:
+                {job_description}
+
+                Job Highlights:
+                {job_highlights}
+
+                Selected Document Content:
+                {document_text}
+
+                Question:
+                {question}
+            """),
+])
+
+# The question is never cut, so it comes out of the budget before the other sections
+chat_feedback_budget = PromptBudget(
+    PROMPT_MAX_TOKENS, {"document_text": 0.5, "job_description": 0.35, "job_highlights": 0.15}
+)
+
+async def prepare_chat_feedback(current_user: UserOut, document_type: str, question: str, description: str, highlights: str) -> list:
+    """Load the selected document and format the /chat-feedback prompt as chat messages."""
+    # Get public resume and cover letter links
+    if document_type not in DOCUMENT_LINK_FIELDS:
+        raise HTTPException(status_code=400, detail="Invalid document type.")
+
+    if not getattr(current_user, DOCUMENT_LINK_FIELDS[document_type]):
+        raise HTTPException(status_code=400, detail="Selected document not found.")
+
+    document_text = await get_document_text(current_user, document_type)
+
+    # Prepare context for the LLM, keeping the passages most relevant to the job and question
+    sections = {
+        "job_description": description,
+        "job_highlights": highlights,
+        "document_text": document_text,
+    }
+    queries = {
+        "job_description": f"{question}\n{highlights}\n{document_text}",
+        "job_highlights": f"{question}\n{document_text}",
+        "document_text": f"{question}\n{description}\n{highlights}",
+    }
+    context, _ = await run_blocking(
+        "cpu", fit_prompt, chat_feedback_budget, CHAT_FEEDBACK_PROMPT, sections, queries, {"question": question}
+    )
+    return chat_messages(CHAT_FEEDBACK_PROMPT.format_messages(**context))
+
+@app.post("/chat-feedback")
+async def chat_feedback(
+    document_type: str = Form(..., description="Type of document (resume or cover letter)"),
+    question: str = Form(..., description="User's specific question"),
+    description: str = Form(..., description="Job description for context"),
+    highlights: str = Form(..., description="Job highlights for context"),
     current_user: UserOut = Depends(get_current_user),
 ):
     """
-    Save feedback to the logged-in user's saved jobs table.
+    Generate feedback for a specific question based on the user's selected document.
     """
     try:
-        conn = get_user_results_db_connection()
+        messages = await prepare_chat_feedback(current_user, document_type, question, description, highlights)
+
+        response = await run_blocking(
+            "llm", llm_gateway.complete, messages, model=FEEDBACK_MODEL, temperature=FEEDBACK_TEMPERATURE
+        )
+
+        return {"response": response.content}
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@app.post("/chat-feedback/stream")
+async def stream_chat_feedback(
+    document_type: str = Form(..., description="Type of document (resume or cover letter)"),
+    question: str = Form(..., description="User's specific question"),
+    description: str = Form(..., description="Job description for context"),
+    highlights: str = Form(..., description="Job highlights for context"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    /chat-feedback as a text/event-stream, in the same event format as /feedback/stream.
+    """
+    start = time.perf_counter()
+    try:
+        messages = await prepare_chat_feedback(current_user, document_type, question, description, highlights)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    return StreamingResponse(stream_llm_as_sse(messages, {}, start), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+class SaveFeedbackRequest(BaseModel):
+    job_id: str
+    feedback: str
+
+def _store_feedback(user_id, job_id: str, feedback: str) -> int:
+    conn = get_user_results_db_connection()
+    try:
         cur = conn.cursor()
 
         # Get the table name for the current user
-        table_name = f"user_{str(current_user.id).replace('-', '_')}"
-        
+        table_name = f"user_{str(user_id).replace('-', '_')}"
+
         # Update the feedback for the specific job
         update_query = f"""
         UPDATE {table_name}
@@ -1164,51 +2107,174 @@ async def save_feedback(
         WHERE job_id = %(job_id)s
         """
         params = {
-            "job_id": feedback_request.job_id,
-            "feedback": feedback_request.feedback,
+            "job_id": job_id,
+            "feedback": feedback,
         }
         cur.execute(update_query, params)
         conn.commit()
+        return cur.rowcount
+    finally:
+        if "cur" in locals() and cur:
+            cur.close()
+        conn.close()
+
+async def store_feedback(current_user: UserOut, job_id: str, feedback: str) -> int:
+    """Save feedback on a job in the user's saved jobs table; returns the number of rows updated."""
+    return await run_blocking("snowflake", _store_feedback, current_user.id, job_id, feedback)
 
+@app.post("/jobs/save-feedback")
+async def save_feedback(
+    feedback_request: SaveFeedbackRequest,
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Save feedback to the logged-in user's saved jobs table.
+    """
+    try:
+        await store_feedback(current_user, feedback_request.job_id, feedback_request.feedback)
         return {"message": "Feedback saved successfully."}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving feedback: {str(e)}")
+
+# Snowflake connection function
+def get_snowflake_joblistings_connection():
+    return _acquire_pooled_connection("jobs")
+
+def fetch_listings_version():
+    """Cheap fingerprint of JOBLISTINGS; it changes whenever the DAG reloads the table."""
+    conn = get_snowflake_joblistings_connection()
+    try:
+        cur = conn.cursor()
+        return listings_version(cur)
     finally:
         if "cur" in locals() and cur:
             cur.close()
-        if "conn" in locals() and conn:
-            conn.close()
+        conn.close()
 
-# Snowflake connection function
-def get_snowflake_joblistings_connection():
+def fetch_listings_rows():
+    conn = get_snowflake_joblistings_connection()
     try:
-        return connect(
-            user = os.getenv("SNOWFLAKE_USER"),
-            password = os.getenv("SNOWFLAKE_PASSWORD"),
-            account = os.getenv("SNOWFLAKE_ACCOUNT"),
-            database = os.getenv("SNOWFLAKE_JOBSDB"),
-            schema = os.getenv("SNOWFLAKE_SCHEMA"),
-            warehouse = os.getenv("SNOWFLAKE_WAREHOUSE"),
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(LISTING_COLUMNS)} FROM JOBLISTINGS")
+        columns = [col[0] for col in cur.description]
+        return columns, cur.fetchall()
+    finally:
+        if "cur" in locals() and cur:
+            cur.close()
+        conn.close()
+
+LISTINGS_SEARCH_COLUMNS = sorted(set(SCHEMA_TO_TABLE_MAP.values()))
+
+def fetch_search_index_artifact(version):
+    """
+    Snapshot and memory-mapped indexes prebuilt by the DAG for `version`, or None if no
+    artifact was published for it. Downloads from S3 once; later starts map the local copy.
+    """
+    name = artifact_id(version)
+    path = os.path.join(SEARCH_INDEX_DIR, name)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        if not AWS_S3_BUCKET_NAME or not SEARCH_INDEX_S3_PREFIX:
+            return None
+        path = download_artifact(s3_client, AWS_S3_BUCKET_NAME, SEARCH_INDEX_S3_PREFIX, name, SEARCH_INDEX_DIR)
+        if path is None:
+            return None
+    artifact = load_artifact(path, LISTINGS_SEARCH_COLUMNS)
+    # Keep the artifact being replaced as well; requests may still be reading from it
+    current = listings_snapshot.current()
+    prune_artifacts(SEARCH_INDEX_DIR, keep={name, artifact_id(current.version) if current else name})
+    return artifact
+
+# Read replica of JOBLISTINGS; the table only changes when the Airflow DAG reloads it
+listings_snapshot = ListingsSnapshotStore(
+    fetch_listings_version,
+    fetch_listings_rows,
+    LISTINGS_SEARCH_COLUMNS,
+    index_builders={
+        "bm25": lambda snapshot: BM25Index.build(snapshot.rows),
+        "semantic": lambda snapshot: VectorIndex.build(snapshot.rows, dim=SEMANTIC_VECTOR_DIM),
+        "facets": lambda snapshot: FacetIndex.build(snapshot.rows, fields=FACET_FIELDS + ("TITLE",)),
+        "salaries": lambda snapshot: SalaryIndex.build(snapshot.rows),
+        "highlight_terms": lambda snapshot: HighlightTermIndex.build(snapshot.rows),
+    },
+    load_artifact=fetch_search_index_artifact,
+)
+
+async def stream_snapshot_as_ndjson(rows, columns, batch_size: int = STREAM_BATCH_SIZE):
+    """Yield snapshot rows as NDJSON in batches, like stream_rows_as_ndjson."""
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        yield "".join(
+            json.dumps({column: row.get(column) for column in columns}, default=str) + "\n" for row in batch
         )
-    except ProgrammingError as e:
-        raise HTTPException(status_code=500, detail=f"Snowflake connection error: {e}")
- 
+
+async def stream_rows_as_ndjson(conn, cur, batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Yield an executed cursor's rows as NDJSON, one batch at a time.
+    Only one batch is held in memory; the connection goes back to the pool when the
+    stream finishes or the client disconnects.
+    """
+    try:
+        columns = [col[0] for col in cur.description]
+        while True:
+            rows = await run_blocking("snowflake", cur.fetchmany, batch_size)
+            if not rows:
+                break
+            yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+    finally:
+        cur.close()
+        conn.close()
+
 @app.get("/jobs/listings", response_model=list)
-async def get_job_listings(current_user: UserOut = Depends(get_current_user)):
+async def get_job_listings(
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                               description="'ndjson' streams one listing per line as rows arrive"),
+    fields: Optional[str] = Query("summary", description=FIELDS_QUERY_DESCRIPTION),
+    role: Optional[str] = Query(None, description="Case-insensitive match on SEARCH_QUERY"),
+    title: Optional[str] = Query(None, description="Case-insensitive match on TITLE"),
+    company: Optional[str] = Query(None, description="Case-insensitive match on COMPANY"),
+    location: Optional[str] = Query(None, description="Case-insensitive match on LOCATION"),
+    current_user: UserOut = Depends(get_current_user),
+):
     """
     Fetch all job listings for authenticated users.
+    Served from the in-memory snapshot once it has loaded, otherwise from Snowflake.
     """
+    columns = resolve_projection(fields, LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS)
+    filters = {
+        column: [term]
+        for column, term in (("SEARCH_QUERY", role), ("TITLE", title), ("COMPANY", company), ("LOCATION", location))
+        if term
+    }
+
+    snapshot = listings_snapshot.current()
+    if snapshot is not None:
+        rows = list(snapshot.filter(filters))
+        if output_format == "ndjson":
+            return StreamingResponse(stream_snapshot_as_ndjson(rows, columns), media_type="application/x-ndjson")
+        return snapshot.project(rows, columns)
+
+    streaming = False
     try:
         # Establish Snowflake connection
-        conn = get_snowflake_joblistings_connection()
+        conn = await run_blocking("snowflake", get_snowflake_joblistings_connection)
         cur = conn.cursor()
 
         # Query to fetch all job listings
-        fetch_listings_query = "SELECT * FROM JOBLISTINGS;"
-        cur.execute(fetch_listings_query)
+        params = {f"filter_{i}": f"%{terms[0]}%" for i, terms in enumerate(filters.values())}
+        where_clause = " AND ".join(f"{column} ILIKE %(filter_{i})s" for i, column in enumerate(filters))
+        fetch_listings_query = f"SELECT {', '.join(columns)} FROM JOBLISTINGS"
+        if where_clause:
+            fetch_listings_query += f" WHERE {where_clause}"
+        await run_blocking("snowflake", cur.execute, fetch_listings_query, params)
+
+        if output_format == "ndjson":
+            # The stream now owns the cursor and connection and closes them when done
+            streaming = True
+            return StreamingResponse(stream_rows_as_ndjson(conn, cur), media_type="application/x-ndjson")
+
         columns = [col[0] for col in cur.description]  # Get column names
-        rows = cur.fetchall()
+        rows = await run_blocking("snowflake", cur.fetchall)
 
         # Format results as a list of dictionaries
         job_listings = [dict(zip(columns, row)) for row in rows]
@@ -1217,27 +2283,32 @@ async def get_job_listings(current_user: UserOut = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching job listings: {e}")
     finally:
-        if "cur" in locals() and cur:
-            cur.close()
-        if "conn" in locals() and conn:
-            conn.close()
+        if not streaming:
+            if "cur" in locals() and cur:
+                cur.close()
+            if "conn" in locals() and conn:
+                conn.close()
 
 @app.get("/users/jobs", response_model=list)
-async def get_user_jobs(current_user: UserOut = Depends(get_current_user)):
+async def get_user_jobs(
+    fields: Optional[str] = Query("summary", description=FIELDS_QUERY_DESCRIPTION),
+    current_user: UserOut = Depends(get_current_user),
+):
     """
     Fetch the entire table of saved jobs for the logged-in user.
     """
+    select_list = ", ".join(resolve_projection(fields, SAVED_JOB_COLUMNS, SAVED_JOB_SUMMARY_COLUMNS))
     try:
-        conn = get_user_results_db_connection()
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
         cur = conn.cursor()
 
         # Dynamically create the user-specific table name
         table_name = f"user_{str(current_user.id).replace('-', '_')}"
 
         # Query all rows from the user's table
-        fetch_query = f"SELECT * FROM {table_name};"
-        cur.execute(fetch_query)
-        rows = cur.fetchall()
+        fetch_query = f"SELECT {select_list} FROM {table_name};"
+        await run_blocking("snowflake", cur.execute, fetch_query)
+        rows = await run_blocking("snowflake", cur.fetchall)
         columns = [col[0] for col in cur.description]
 
         # Convert rows to a list of dictionaries
@@ -1252,3 +2323,447 @@ async def get_user_jobs(current_user: UserOut = Depends(get_current_user)):
             cur.close()
         if "conn" in locals() and conn:
             conn.close()
+
+@app.post("/jobs/listings/reload")
+async def reload_job_listings(
+    force: bool = Query(False, description="Reload even if the table fingerprint is unchanged"),
+    x_reload_token: Optional[str] = Header(None),
+):
+    """
+    Refresh the in-memory JOBLISTINGS snapshot; called by the Airflow DAG after a load.
+    """
+    if not LISTINGS_RELOAD_TOKEN or not x_reload_token or not hmac.compare_digest(x_reload_token, LISTINGS_RELOAD_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid reload token.")
+    try:
+        reloaded = await run_blocking("snowflake", listings_snapshot.refresh, force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading job listings: {str(e)}")
+    return {"reloaded": reloaded, **listings_snapshot.stats()}
+
+# /jobs/facets and the analytics endpoints match `keyword` as a literal, case-insensitive
+# substring of any of these columns, whether they read the snapshot or Snowflake
+KEYWORD_COLUMNS = ("TITLE", "DESCRIPTION")
+KEYWORD_QUERY_DESCRIPTION = "Only rows whose title or description contains this text (case-insensitive)"
+
+def select_listings_mask(snapshot, selections, keyword):
+    """Boolean mask of the snapshot rows matching the facet `selections` and `keyword`."""
+    base = snapshot.contains(keyword, KEYWORD_COLUMNS) if keyword else None
+    return snapshot.indexes["facets"].select(selections, base=base, fields=())[0]
+
+def select_facets(snapshot, selections, keyword, limit, offset, facet_limit, columns):
+    """Filtered page plus facet counts for /jobs/facets, computed from the snapshot's bitmaps."""
+    base = snapshot.contains(keyword, KEYWORD_COLUMNS) if keyword else None
+    mask, facets = snapshot.indexes["facets"].select(selections, base=base, limit=facet_limit, fields=FACET_FIELDS)
+    matches = mask.nonzero()[0]
+    page = [snapshot.rows[i] for i in matches[offset:offset + limit]]
+    return {
+        "total": int(len(matches)),
+        "offset": offset,
+        "limit": limit,
+        "rows": snapshot.project(page, columns),
+        "facets": facets,
+    }
+
+@app.get("/jobs/facets", response_model=dict)
+async def get_job_facets(
+    location: List[str] = Query([], description="LOCATION values to match (any of)"),
+    company: List[str] = Query([], description="COMPANY values to match (any of)"),
+    search_query: List[str] = Query([], description="SEARCH_QUERY values to match (any of)"),
+    posted_date: List[str] = Query([], description="POSTED_DATE values to match (any of)"),
+    keyword: Optional[str] = Query(None, description=KEYWORD_QUERY_DESCRIPTION),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=0, description=f"Page size, capped at {SEARCH_MAX_LIMIT}"),
+    offset: int = Query(0, ge=0),
+    facet_limit: int = Query(100, ge=0, description="Values returned per facet; 0 returns every value"),
+    fields: Optional[str] = Query("summary", description=FIELDS_QUERY_DESCRIPTION),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                               description="'ndjson' streams every matching listing, one per line, without facets"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Multi-select filtering over LOCATION, COMPANY, SEARCH_QUERY and POSTED_DATE: values of
+    one facet are OR-ed, facets are AND-ed. Returns one page of matching listings, newest
+    first, together with the value counts of every facet; with format=ndjson, streams all
+    matching listings instead (for exports).
+    """
+    columns = resolve_projection(fields, LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS)
+    snapshot = listings_snapshot.current()
+    if snapshot is None or "facets" not in snapshot.indexes:
+        raise HTTPException(status_code=503, detail="The facet index is not loaded yet.")
+    selections = dict(zip(FACET_FIELDS, (location, company, search_query, posted_date)))
+    if output_format == "ndjson":
+        mask = await run_blocking("cpu", select_listings_mask, snapshot, selections, keyword)
+        rows = [snapshot.rows[i] for i in mask.nonzero()[0]]
+        return StreamingResponse(stream_snapshot_as_ndjson(rows, columns), media_type="application/x-ndjson")
+    return await run_blocking(
+        "cpu", select_facets, snapshot, selections, keyword, min(limit, SEARCH_MAX_LIMIT), offset, facet_limit, columns
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job_details(
+    job_id: str,
+    source: str = Query("listings", pattern="^(listings|saved)$",
+                        description="'listings' for JOBLISTINGS, 'saved' for the user's saved jobs"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Fetch every column of a single job, including the long text columns
+    left out of the summary projection.
+    """
+    snapshot = listings_snapshot.current()
+    if source == "listings" and snapshot is not None:
+        row = snapshot.get(job_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        return row
+
+    try:
+        if source == "saved":
+            conn = await run_blocking("snowflake", get_user_results_db_connection)
+            table_name = f"user_{str(current_user.id).replace('-', '_')}"
+            columns = SAVED_JOB_COLUMNS
+        else:
+            conn = await run_blocking("snowflake", get_snowflake_joblistings_connection)
+            table_name = "JOBLISTINGS"
+            columns = LISTING_COLUMNS
+        cur = conn.cursor()
+
+        fetch_query = f"SELECT {', '.join(columns)} FROM {table_name} WHERE JOB_ID = %(job_id)s LIMIT 1;"
+        await run_blocking("snowflake", cur.execute, fetch_query, {"job_id": job_id})
+        row = await run_blocking("snowflake", cur.fetchone)
+        if not row:
+            raise HTTPException(status_code=404, detail="Job not found.")
+
+        return dict(zip([col[0] for col in cur.description], row))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job details: {str(e)}")
+    finally:
+        if "cur" in locals() and cur:
+            cur.close()
+        if "conn" in locals() and conn:
+            conn.close()
+
+# Columns with top-N counts in the analytics responses; POSTED_DATE is returned as a time series
+LISTING_ANALYTICS_COLUMNS = ["LOCATION", "COMPANY", "TITLE", "SEARCH_QUERY"]
+USER_JOB_ANALYTICS_COLUMNS = ["LOCATION", "COMPANY", "TITLE", "STATUS"]
+
+def analytics_filter_clause(selections, keyword):
+    """WHERE clause and bind parameters for {column: [values]} (any of) plus a keyword."""
+    conditions, params = [], {}
+    for column, values in selections.items():
+        if not values:
+            continue
+        names = []
+        for i, value in enumerate(values):
+            params[f"{column.lower()}_{i}"] = value
+            names.append(f"%({column.lower()}_{i})s")
+        target = f"CAST({column} AS VARCHAR)" if column == "POSTED_DATE" else column
+        conditions.append(f"{target} IN ({', '.join(names)})")
+    if keyword:
+        # Literal, case-insensitive substring match, the same as ListingsSnapshot.contains
+        params["keyword"] = keyword.lower()
+        conditions.append("(" + " OR ".join(f"CONTAINS(LOWER({column}), %(keyword)s)" for column in KEYWORD_COLUMNS) + ")")
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+# Snowflake error code for a table or other object that does not exist
+SNOWFLAKE_OBJECT_NOT_FOUND = 2003
+
+def aggregate_with_sql(conn, table_name, count_columns, selections, keyword, top_n):
+    """Analytics computed by Snowflake with GROUP BY; only the aggregates are transferred."""
+    where, params = analytics_filter_clause(selections, keyword)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT COUNT(*) FROM {table_name}{where}", params)
+        total = cur.fetchone()[0]
+
+        top = {}
+        for column in count_columns:
+            cur.execute(
+                f"SELECT {column}, COUNT(*) AS N FROM {table_name}{where} GROUP BY {column} "
+                f"HAVING {column} IS NOT NULL ORDER BY N DESC, {column} LIMIT {int(top_n)}",
+                params,
+            )
+            top[column] = [{"value": str(value), "count": count} for value, count in cur.fetchall()]
+
+        cur.execute(
+            f"SELECT CAST(POSTED_DATE AS VARCHAR) AS POSTED, COUNT(*) FROM {table_name}{where} "
+            f"GROUP BY POSTED HAVING POSTED IS NOT NULL ORDER BY POSTED",
+            params,
+        )
+        posted_dates = [{"date": date, "count": count} for date, count in cur.fetchall()]
+
+        salaries = f"(SELECT {SALARY_SQL_EXPRESSION} AS AMOUNT FROM {table_name}{where})"
+        cur.execute(
+            f"SELECT COUNT(AMOUNT), MIN(AMOUNT), PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY AMOUNT), "
+            f"MEDIAN(AMOUNT), PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY AMOUNT), MAX(AMOUNT) FROM {salaries}",
+            params,
+        )
+        mentions, *quantiles = cur.fetchone()
+        salary = salary_stats([], top_n)
+        if mentions:
+            salary.update(zip(("min", "p25", "median", "p75", "max"), (float(q) for q in quantiles)))
+            salary["mentions"] = mentions
+            cur.execute(
+                f"SELECT AMOUNT, COUNT(*) AS N FROM {salaries} WHERE AMOUNT IS NOT NULL "
+                f"GROUP BY AMOUNT ORDER BY N DESC, AMOUNT LIMIT {int(top_n)}",
+                params,
+            )
+            salary["top"] = [{"value": float(amount), "count": count} for amount, count in cur.fetchall()]
+    finally:
+        cur.close()
+    return {"total": total, "top": top, "posted_dates": posted_dates, "salary": salary, "source": "snowflake"}
+
+def highlight_terms_with_sql(conn, table_name, selections, keyword, top_n):
+    """The most frequent JOB_HIGHLIGHTS words, as HighlightTermIndex counts them, computed by Snowflake."""
+    where, params = analytics_filter_clause(selections, keyword)
+    stopwords = {f"stopword_{i}": term for i, term in enumerate(sorted(HIGHLIGHT_STOPWORDS))}
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"SELECT W.VALUE::VARCHAR AS TERM, COUNT(*) AS N FROM (SELECT JOB_HIGHLIGHTS FROM {table_name}{where}) J, "
+            f"LATERAL FLATTEN(INPUT => REGEXP_SUBSTR_ALL(LOWER(J.JOB_HIGHLIGHTS), '{HIGHLIGHT_TERM_SQL_PATTERN}')) W "
+            f"WHERE W.VALUE::VARCHAR NOT IN ({', '.join(f'%({name})s' for name in stopwords)}) "
+            f"GROUP BY TERM ORDER BY N DESC, TERM LIMIT {int(top_n)}",
+            {**params, **stopwords},
+        )
+        terms = [{"value": term, "count": count} for term, count in cur.fetchall()]
+    finally:
+        cur.close()
+    return {"terms": terms, "source": "snowflake"}
+
+# Materialized aggregates per JOBLISTINGS fingerprint; a new DAG load changes the key
+listing_aggregates_cache = TTLCache(max_entries=4, ttl=LISTINGS_SNAPSHOT_REFRESH_INTERVAL)
+
+def load_materialized_listing_aggregates(snapshot):
+    """
+    (DIMENSION, VALUE, N) rows the DAG materialized for the current JOBLISTINGS load, or
+    None when the table is missing or was built from a different version of the listings.
+    """
+    try:
+        version = snapshot.version if snapshot is not None else fetch_listings_version()
+        rows = listing_aggregates_cache.get(version)
+        if rows is None:
+            conn = get_snowflake_joblistings_connection()
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    f"SELECT DIMENSION, VALUE, N FROM {AGGREGATES_TABLE} WHERE SOURCE_VERSION = %(version)s",
+                    {"version": version},
+                )
+                rows = cur.fetchall()
+            finally:
+                if "cur" in locals() and cur:
+                    cur.close()
+                conn.close()
+            if not rows:
+                return None
+            listing_aggregates_cache.set(version, rows)
+        return rows
+    except Exception as e:
+        print(f"Materialized listing aggregates unavailable: {str(e)}")
+        return None
+
+def aggregate_listings_snapshot(snapshot, selections, keyword, top_n):
+    """The same aggregates as aggregate_with_sql, from the snapshot's facet and salary indexes."""
+    facets = snapshot.indexes["facets"]
+    mask = select_listings_mask(snapshot, selections, keyword)
+    posted_dates = sorted(facets.counts("POSTED_DATE", mask, limit=0), key=lambda facet: facet["value"])
+    return {
+        "total": int(mask.sum()),
+        "top": {column: facets.counts(column, mask, limit=top_n) for column in LISTING_ANALYTICS_COLUMNS},
+        "posted_dates": [{"date": facet["value"], "count": facet["count"]} for facet in posted_dates],
+        "salary": snapshot.indexes["salaries"].summarize(mask, top_n),
+        "source": "snapshot",
+    }
+
+@app.get("/analytics/listings", response_model=dict)
+async def get_listings_analytics(
+    location: List[str] = Query([], description="LOCATION values to match (any of)"),
+    company: List[str] = Query([], description="COMPANY values to match (any of)"),
+    search_query: List[str] = Query([], description="SEARCH_QUERY values to match (any of)"),
+    posted_date: List[str] = Query([], description="POSTED_DATE values to match (any of)"),
+    keyword: Optional[str] = Query(None, description=KEYWORD_QUERY_DESCRIPTION),
+    top_n: int = Query(10, ge=1, le=100, description="Values returned per top-N list"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Aggregates over JOBLISTINGS under the /jobs/facets filters: total, top-N counts per
+    column, postings per POSTED_DATE and salary stats. Without filters they come from the
+    table the DAG materializes after each load; otherwise they are computed from the
+    in-memory snapshot when its indexes are loaded, or with GROUP BY queries in Snowflake.
+    """
+    selections = dict(zip(FACET_FIELDS, (location, company, search_query, posted_date)))
+    snapshot = listings_snapshot.current()
+    if not keyword and not any(selections.values()):
+        # The unfiltered dashboard reads the counts the DAG precomputed for this load
+        rows = await run_blocking("snowflake", load_materialized_listing_aggregates, snapshot)
+        if rows is not None:
+            return {**summarize_aggregates(rows, LISTING_ANALYTICS_COLUMNS, top_n), "source": "materialized"}
+    if snapshot is not None and all(name in snapshot.indexes for name in ("facets", "salaries")):
+        return await run_blocking("cpu", aggregate_listings_snapshot, snapshot, selections, keyword, top_n)
+
+    try:
+        conn = await run_blocking("snowflake", get_snowflake_joblistings_connection)
+        return await run_blocking(
+            "snowflake", aggregate_with_sql, conn, "JOBLISTINGS", LISTING_ANALYTICS_COLUMNS, selections, keyword, top_n
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing listing analytics: {str(e)}")
+    finally:
+        if "conn" in locals() and conn:
+            conn.close()
+
+def highlight_terms_from_snapshot(snapshot, selections, keyword, top_n):
+    mask = select_listings_mask(snapshot, selections, keyword)
+    return {"terms": snapshot.indexes["highlight_terms"].counts(mask, top_n), "source": "snapshot"}
+
+@app.get("/analytics/listings/terms", response_model=dict)
+async def get_listings_highlight_terms(
+    location: List[str] = Query([], description="LOCATION values to match (any of)"),
+    company: List[str] = Query([], description="COMPANY values to match (any of)"),
+    search_query: List[str] = Query([], description="SEARCH_QUERY values to match (any of)"),
+    posted_date: List[str] = Query([], description="POSTED_DATE values to match (any of)"),
+    keyword: Optional[str] = Query(None, description=KEYWORD_QUERY_DESCRIPTION),
+    top_n: int = Query(200, ge=1, le=1000, description="Words returned"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    The most frequent JOB_HIGHLIGHTS words over every listing matching the /jobs/facets
+    filters, for the skills word cloud. Counted from the snapshot's term index when it is
+    loaded, otherwise in Snowflake.
+    """
+    selections = dict(zip(FACET_FIELDS, (location, company, search_query, posted_date)))
+    snapshot = listings_snapshot.current()
+    if snapshot is not None and all(name in snapshot.indexes for name in ("facets", "highlight_terms")):
+        return await run_blocking("cpu", highlight_terms_from_snapshot, snapshot, selections, keyword, top_n)
+
+    try:
+        conn = await run_blocking("snowflake", get_snowflake_joblistings_connection)
+        return await run_blocking("snowflake", highlight_terms_with_sql, conn, "JOBLISTINGS", selections, keyword, top_n)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error counting listing highlight terms: {str(e)}")
+    finally:
+        if "conn" in locals() and conn:
+            conn.close()
+
+@app.get("/analytics/user-jobs", response_model=dict)
+async def get_user_jobs_analytics(
+    location: List[str] = Query([], description="LOCATION values to match (any of)"),
+    company: List[str] = Query([], description="COMPANY values to match (any of)"),
+    status: List[str] = Query([], description="STATUS values to match (any of)"),
+    posted_date: List[str] = Query([], description="POSTED_DATE values to match (any of)"),
+    keyword: Optional[str] = Query(None, description=KEYWORD_QUERY_DESCRIPTION),
+    top_n: int = Query(10, ge=1, le=100, description="Values returned per top-N list"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Aggregates over the logged-in user's saved jobs, computed in Snowflake: total,
+    top-N counts per column, saved jobs per POSTED_DATE and salary stats.
+    """
+    selections = {"LOCATION": location, "COMPANY": company, "STATUS": status, "POSTED_DATE": posted_date}
+    try:
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
+        table_name = f"user_{str(current_user.id).replace('-', '_')}"
+        return await run_blocking(
+            "snowflake", aggregate_with_sql, conn, table_name, USER_JOB_ANALYTICS_COLUMNS, selections, keyword, top_n
+        )
+    except ProgrammingError as e:
+        # The user's table is only created by their first saved job
+        if e.errno != SNOWFLAKE_OBJECT_NOT_FOUND:
+            raise HTTPException(status_code=500, detail=f"Error computing user job analytics: {str(e)}")
+        return {"total": 0, "top": {column: [] for column in USER_JOB_ANALYTICS_COLUMNS}, "posted_dates": [],
+                "salary": salary_stats([], top_n), "source": "snowflake"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing user job analytics: {str(e)}")
+    finally:
+        if "conn" in locals() and conn:
+            conn.close()
+
+@app.get("/analytics/user-jobs/terms", response_model=dict)
+async def get_user_jobs_highlight_terms(
+    location: List[str] = Query([], description="LOCATION values to match (any of)"),
+    company: List[str] = Query([], description="COMPANY values to match (any of)"),
+    status: List[str] = Query([], description="STATUS values to match (any of)"),
+    posted_date: List[str] = Query([], description="POSTED_DATE values to match (any of)"),
+    keyword: Optional[str] = Query(None, description=KEYWORD_QUERY_DESCRIPTION),
+    top_n: int = Query(200, ge=1, le=1000, description="Words returned"),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """The most frequent JOB_HIGHLIGHTS words over the logged-in user's matching saved jobs, counted in Snowflake."""
+    selections = {"LOCATION": location, "COMPANY": company, "STATUS": status, "POSTED_DATE": posted_date}
+    try:
+        conn = await run_blocking("snowflake", get_user_results_db_connection)
+        table_name = f"user_{str(current_user.id).replace('-', '_')}"
+        return await run_blocking("snowflake", highlight_terms_with_sql, conn, table_name, selections, keyword, top_n)
+    except ProgrammingError as e:
+        # The user's table is only created by their first saved job
+        if e.errno != SNOWFLAKE_OBJECT_NOT_FOUND:
+            raise HTTPException(status_code=500, detail=f"Error counting saved job highlight terms: {str(e)}")
+        return {"terms": [], "source": "snowflake"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error counting saved job highlight terms: {str(e)}")
+    finally:
+        if "conn" in locals() and conn:
+            conn.close()
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """Only operators holding METRICS_TOKEN may read pool, cache, LLM and task internals."""
+    if not METRICS_TOKEN or not x_metrics_token or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid metrics token.")
+
+@app.get("/metrics/pools", dependencies=[Depends(require_metrics_token)])
+async def get_pool_metrics():
+    """
+    Report utilisation counters for each Snowflake connection pool.
+    """
+    return {name: pool.stats() for name, pool in snowflake_pools.items()}
+
+@app.get("/metrics/caches", dependencies=[Depends(require_metrics_token)])
+async def get_cache_metrics():
+    """
+    Report hit/miss counters for the in-process caches.
+    """
+    return {
+        "user_profiles": user_profile_cache.stats(),
+        "parsed_queries": parsed_query_cache.stats(),
+        "document_text": document_text_cache.stats(),
+        "feedback": feedback_cache.stats(),
+        "listings_snapshot": listings_snapshot.stats(),
+        "listing_aggregates": listing_aggregates_cache.stats(),
+    }
+
+@app.get("/metrics/search", dependencies=[Depends(require_metrics_token)])
+async def get_search_metrics():
+    """
+    Report how many search queries the rule-based parser handled without the LLM.
+    """
+    return {"query_rules": rule_query_parser.stats()}
+
+@app.get("/metrics/executors", dependencies=[Depends(require_metrics_token)])
+async def get_executor_metrics():
+    """
+    Report worker limits, in-flight and queued calls for each blocking-call thread pool.
+    """
+    return executors.stats()
+
+@app.get("/metrics/llm", dependencies=[Depends(require_metrics_token)])
+async def get_llm_metrics():
+    """
+    Report the LLM gateway's rate limits and, per model, request/retry/hedge counts, token
+    usage and latency percentiles.
+    """
+    return llm_gateway.stats()
+
+@app.get("/metrics/process-pool", dependencies=[Depends(require_metrics_token)])
+async def get_process_pool_metrics():
+    """
+    Report the worker process count and, per task type, its concurrency limit, timeout,
+    queue depth and completed/failed/timed-out counts.
+    """
+    return process_pool.stats()
+
+@app.get("/metrics/tasks", dependencies=[Depends(require_metrics_token)])
+async def get_task_metrics():
+    """Report the background task worker count, submitted/deduplicated/outcome counts and tasks per status."""
+    return feedback_tasks.stats()
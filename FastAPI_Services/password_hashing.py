@@ -0,0 +1,12 @@
+from passlib.context import CryptContext
+
+# Kept out of main so process-pool workers can import it without loading the API
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str):
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
@@ -0,0 +1,151 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class TaskTimeoutError(Exception):
+    """A process-pool task did not finish within its task type's timeout."""
+
+
+def _warm_up(modules):
+    # Import the task modules in a fresh worker so the first real task doesn't pay for it
+    for module in modules:
+        importlib.import_module(module)
+    return os.getpid()
+
+
+class ManagedProcessPool:
+    """
+    A pool of worker processes for CPU-bound calls that would otherwise hold the GIL in the
+    API process (PDF parsing, bcrypt).
+
+    Every call belongs to a task type with its own concurrency limit and timeout, so a burst
+    of one type (feedback requests parsing PDFs) queues behind its own limit instead of
+    taking every worker from another (logins). A task that times out keeps its slot until
+    its worker actually finishes, so stuck tasks can't pile up beyond the limit. Functions
+    and arguments must be picklable; workers are spawned, not forked.
+    """
+
+    def __init__(self, max_workers, limits, timeouts=None, warm_modules=()):
+        self.max_workers = max_workers
+        self._limits = dict(limits)
+        self._timeouts = dict(timeouts or {})
+        self._warm_modules = tuple(warm_modules)
+        self._executor = None
+        self._restarts = 0
+        self._lock = threading.Lock()
+        # asyncio semaphores belong to one event loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats = {
+            task_type: {"submitted": 0, "queued": 0, "active": 0, "completed": 0, "failed": 0, "timed_out": 0}
+            for task_type in self._limits
+        }
+
+    def start(self):
+        """Create the worker processes and warm them up; safe to call more than once."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            for _ in range(self.max_workers):
+                self._executor.submit(_warm_up, self._warm_modules)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self.start()
+        return self._executor
+
+    def _restart(self, broken):
+        # A worker died (e.g. killed by the OOM killer); replace the whole pool once
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self._restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _semaphore(self, loop, task_type):
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            if task_type not in semaphores:
+                semaphores[task_type] = asyncio.Semaphore(self._limits[task_type])
+            return semaphores[task_type]
+
+    def _update(self, task_type, **deltas):
+        with self._lock:
+            stats = self._stats[task_type]
+            for name, delta in deltas.items():
+                stats[name] += delta
+
+    def _finished(self, loop, semaphore, task_type, _future):
+        self._update(task_type, active=-1)
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(semaphore.release)
+
+    async def run(self, task_type, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` in a worker process under `task_type`'s limit and await
+        its result. Raises TaskTimeoutError when the task type's timeout elapses.
+        """
+        if task_type not in self._limits:
+            raise ValueError(f"Unknown process task type: {task_type}")
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop, task_type)
+        self._update(task_type, submitted=1, queued=1)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._update(task_type, queued=-1)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            self._update(task_type, failed=1)
+            raise
+        self._update(task_type, active=1)
+        future.add_done_callback(lambda done: self._finished(loop, semaphore, task_type, done))
+
+        timeout = self._timeouts.get(task_type)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._update(task_type, timed_out=1)
+            raise TaskTimeoutError(f"{task_type} task exceeded {timeout}s") from None
+        except BrokenProcessPool:
+            self._update(task_type, failed=1)
+            self._restart(executor)
+            raise
+        except BaseException:
+            self._update(task_type, failed=1)
+            raise
+        self._update(task_type, completed=1)
+        return result
+
+    def stats(self):
+        """Pool size and, per task type, its limit, timeout, queue depth and outcome counts."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "started": self._executor is not None,
+                "restarts": self._restarts,
+                "tasks": {
+                    task_type: {**stats, "limit": self._limits[task_type], "timeout": self._timeouts.get(task_type)}
+                    for task_type, stats in self._stats.items()
+                },
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the workers; the pool is recreated lazily if used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
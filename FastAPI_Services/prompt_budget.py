@@ -0,0 +1,142 @@
+from collections import Counter
+
+import numpy as np
+
+from document_processing import count_tokens
+from search_index import tokenize
+from vector_index import HashedNgramEmbedder
+
+# Passages are runs of lines up to this many tokens, split at blank lines
+PASSAGE_MAX_TOKENS = 80
+# Share of a passage's relevance that comes from keyword overlap (the rest is vector similarity)
+KEYWORD_WEIGHT = 0.5
+# Marks where passages were left out
+OMISSION = "[...]"
+
+
+def _is_heading(line):
+    # Short title-like lines ("Skills", "WORK EXPERIENCE:") are kept with the passage they head
+    words = line.rstrip(":").split()
+    return 0 < len(words) <= 4 and not line.endswith((".", ","))
+
+
+def split_passages(text, max_tokens=PASSAGE_MAX_TOKENS):
+    """Split text into passages of whole lines, breaking at blank lines and every `max_tokens` tokens."""
+    passages, lines, size = [], [], 0
+    for line in (text or "").split("\n"):
+        line = line.strip()
+        tokens = count_tokens(line) if line else 0
+        # A heading on its own never ends a passage; it stays with the lines it introduces
+        if lines and not all(_is_heading(kept) for kept in lines) and (not line or size + tokens > max_tokens):
+            passages.append("\n".join(lines))
+            lines, size = [], 0
+        if line:
+            lines.append(line)
+            size += tokens
+    if lines:
+        passages.append("\n".join(lines))
+    return passages
+
+
+def allocate_budget(sizes, weights, budget):
+    """
+    Split `budget` tokens across sections in proportion to `weights`. Sections smaller than
+    their share keep their full size and the surplus goes to the others.
+    """
+    allocation, remaining, left = {}, dict(sizes), budget
+    while remaining:
+        total_weight = sum(weights[name] for name in remaining)
+        fitting = {name: size for name, size in remaining.items() if size <= left * weights[name] / total_weight}
+        if not fitting:
+            allocation.update({name: int(left * weights[name] / total_weight) for name in remaining})
+            break
+        for name, size in fitting.items():
+            allocation[name] = size
+            left -= size
+            del remaining[name]
+    return allocation
+
+
+class PromptBudget:
+    """
+    Fits the variable sections of a prompt into a token budget.
+
+    Every section gets a share of `max_tokens` by weight (allocate_budget). A section over
+    its share is cut into passages, each scored against the section's query by keyword
+    overlap and hashed n-gram vector similarity, and the best passages that fit are kept
+    in their original order with OMISSION marking the gaps. Sections within their share are
+    left untouched, so short inputs produce exactly the prompt they did before.
+    """
+
+    def __init__(self, max_tokens, weights, dim=256):
+        self.max_tokens = max_tokens
+        self.weights = dict(weights)
+        # Frozen: passages differ on every request and must not grow the embedder's word cache
+        self.embedder = HashedNgramEmbedder(dim, frozen=True)
+
+    def relevance(self, passages, query):
+        """Relevance of each passage to `query`, in [0, 1]."""
+        passage_tokens = [Counter(tokenize(passage)) for passage in passages]
+        query_tokens = set(tokenize(query))
+        # Terms rare among the passages say more about which passage matches than common ones
+        document_frequency = Counter(token for tokens in passage_tokens for token in tokens)
+        idf = {token: np.log(1 + len(passages) / document_frequency[token]) for token in document_frequency}
+        keyword = np.array([
+            sum(idf[token] for token in tokens if token in query_tokens) / np.sqrt(sum(tokens.values()) or 1)
+            for tokens in passage_tokens
+        ])
+        if keyword.max(initial=0) > 0:
+            keyword = keyword / keyword.max()
+        vectors = self.embedder.vectorise([self.embedder.terms([(passage, 1.0)]) for passage in passages])
+        similarity = np.clip(vectors @ self.embedder.embed(query), 0, 1)
+        return KEYWORD_WEIGHT * keyword + (1 - KEYWORD_WEIGHT) * similarity
+
+    def select(self, text, query, budget):
+        """The passages of `text` most relevant to `query` that fit in `budget` tokens, in order."""
+        passages = split_passages(text)
+        sizes = [count_tokens(passage) for passage in passages]
+        scores = self.relevance(passages, query)
+        ranked = [int(i) for i in np.lexsort((np.arange(len(passages)), -scores))]
+        kept, used = [], 0
+        for i in ranked:
+            if used + sizes[i] <= budget:
+                kept.append(i)
+                used += sizes[i]
+        # Omission markers cost tokens too: drop the weakest kept passages until everything fits
+        while kept and count_tokens(selected := self._join(passages, set(kept))) > budget:
+            kept.pop()
+        if kept:
+            return selected
+        if not passages:
+            return ""
+        # Even the best passage is over budget: keep its first words
+        best = ranked[0]
+        words = passages[best].split(" ")
+        return " ".join(words[:max(budget * len(words) // max(sizes[best], 1) - 2, 1)]) + f" {OMISSION}"
+
+    @staticmethod
+    def _join(passages, kept):
+        parts = []
+        for i, passage in enumerate(passages):
+            if i in kept:
+                parts.append(passage)
+            elif not parts or parts[-1] != OMISSION:
+                parts.append(OMISSION)
+        return "\n".join(parts)
+
+    def fit(self, sections, queries, reserved=0):
+        """
+        Fit `sections` ({name: text}) into max_tokens minus `reserved` (fixed prompt text),
+        selecting passages by relevance to queries[name]. Returns (fitted sections, report)
+        where the report has the original and final token counts per section.
+        """
+        sizes = {name: count_tokens(text or "") for name, text in sections.items()}
+        allocation = allocate_budget(sizes, self.weights, max(self.max_tokens - reserved, 0))
+        fitted, report = {}, {}
+        for name, text in sections.items():
+            if sizes[name] <= allocation[name]:
+                fitted[name] = text
+            else:
+                fitted[name] = self.select(text, queries.get(name, ""), allocation[name])
+            report[name] = {"original": sizes[name], "tokens": count_tokens(fitted[name] or "")}
+        return fitted, report
@@ -0,0 +1,147 @@
+import re
+import threading
+
+# Words that carry no search intent in queries like "show me data engineer jobs in Boston"
+FILLER_WORDS = {
+    "a", "an", "the", "me", "my", "i", "am", "im", "i'm", "want", "need", "looking", "for", "find",
+    "show", "give", "get", "list", "search", "any", "all", "some", "please", "open", "new", "latest",
+    "job", "jobs", "position", "positions", "role", "roles", "opening", "openings", "opportunity",
+    "opportunities", "listing", "listings", "vacancy", "vacancies", "career", "careers", "hiring",
+    "available", "current", "currently", "with", "of", "as", "to", "and", "there", "are", "is",
+    "posted", "on",
+}
+
+# Prepositions that introduce a location or a company phrase
+LOCATION_MARKERS = {"in", "near", "around", "within"}
+COMPANY_MARKERS = {"at"}
+
+# Words that end a location/company phrase
+PHRASE_STOP_WORDS = LOCATION_MARKERS | COMPANY_MARKERS | {"posted", "from", "since", "for", "with", "jobs", "job", "and"}
+
+# Anything time-related is left to the LLM, which knows how to phrase posted_date terms
+DATE_WORDS = {
+    "today", "yesterday", "week", "weeks", "month", "months", "day", "days", "recent", "recently",
+    "since", "ago", "last", "past", "this",
+}
+
+# Words the LLM tends to interpret loosely (remote -> location, senior -> title, ...)
+AMBIGUOUS_WORDS = {"remote", "hybrid", "onsite", "senior", "junior", "lead", "principal", "intern", "internship",
+                   "entry", "level", "part", "time", "full-time", "part-time", "contract", "salary", "paying"}
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#/&.'-]*|,")
+ISO_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+EMPTY_FIELDS = ("role", "company", "location", "title", "description", "posted_date")
+
+
+class RuleBasedQueryParser:
+    """
+    Deterministic parser for the common "<role> jobs in <location>" style of query.
+
+    Uses the same schema and synonym maps as the LLM parser prompt. parse() returns a
+    parsed_query dict when every token of the query is accounted for, and None when the
+    query is ambiguous so the caller can fall back to the LLM.
+    """
+
+    def __init__(self, synonym_map):
+        self.role_synonyms = {}
+        for canonical, synonyms in synonym_map.get("SEARCH_QUERY", {}).items():
+            self.role_synonyms[canonical.lower()] = list(synonyms)
+
+        # Every phrase that identifies a role, mapped to its canonical synonym-map key.
+        # Canonical keys win over synonyms, and a synonym shared by several keys goes to the
+        # most specific one, so "data science" is not read as the broad "data".
+        self.role_phrases = {}
+        for canonical in self.role_synonyms:
+            words = canonical.split()
+            self.role_phrases[tuple(words)] = canonical
+            # Plural forms ("data engineers") map to the same role
+            self.role_phrases.setdefault(tuple(words[:-1] + [words[-1] + "s"]), canonical)
+        for canonical, synonyms in sorted(self.role_synonyms.items(), key=lambda item: len(item[1])):
+            for phrase in synonyms:
+                self.role_phrases.setdefault(tuple(phrase.lower().split()), canonical)
+        self.max_phrase_length = max((len(p) for p in self.role_phrases), default=1)
+
+        self._lock = threading.Lock()
+        self._stats = {"handled": 0, "fallbacks": 0}
+
+    @staticmethod
+    def tokenize(query):
+        return TOKEN_PATTERN.findall(query.strip().rstrip(".?!"))
+
+    def _match_role(self, lowered, start):
+        for length in range(min(self.max_phrase_length, len(lowered) - start), 0, -1):
+            phrase = tuple(lowered[start:start + length])
+            if phrase in self.role_phrases:
+                return self.role_phrases[phrase], length
+        return None, 0
+
+    def _read_phrase(self, tokens, lowered, start):
+        end = start
+        while end < len(tokens) and lowered[end] not in PHRASE_STOP_WORDS:
+            if lowered[end] in DATE_WORDS or lowered[end] in AMBIGUOUS_WORDS:
+                return None, start
+            end += 1
+        words = tokens[start:end]
+        while words and words[-1] == ",":
+            words = words[:-1]
+        if not words:
+            return None, start
+        phrase = " ".join(words).replace(" ,", ",")
+        return phrase, end
+
+    def _parse(self, query):
+        tokens = self.tokenize(query)
+        lowered = [token.lower() for token in tokens]
+        roles, locations, companies, dates = [], [], [], []
+
+        i = 0
+        while i < len(tokens):
+            word = lowered[i]
+            if word in AMBIGUOUS_WORDS or word in DATE_WORDS:
+                return None
+            role, length = self._match_role(lowered, i)
+            if role:
+                roles.append(role)
+                i += length
+                continue
+            if ISO_DATE_PATTERN.match(word):
+                dates.append(word)
+                i += 1
+                continue
+            if word in LOCATION_MARKERS or word in COMPANY_MARKERS:
+                phrase, end = self._read_phrase(tokens, lowered, i + 1)
+                if phrase is None:
+                    return None
+                (locations if word in LOCATION_MARKERS else companies).append(phrase)
+                i = end
+                continue
+            if word in FILLER_WORDS or word == ",":
+                i += 1
+                continue
+            # Unknown word outside a location/company phrase: let the LLM decide what it means
+            return None
+
+        parsed = {field: [] for field in EMPTY_FIELDS}
+        for role in dict.fromkeys(roles):
+            for synonym in self.role_synonyms[role]:
+                if synonym not in parsed["role"]:
+                    parsed["role"].append(synonym)
+        parsed["location"] = list(dict.fromkeys(locations))
+        parsed["company"] = list(dict.fromkeys(companies))
+        parsed["posted_date"] = list(dict.fromkeys(dates))
+        return parsed
+
+    def parse(self, query):
+        """Return a parsed_query dict for confident matches, otherwise None."""
+        parsed = self._parse(query)
+        with self._lock:
+            self._stats["handled" if parsed is not None else "fallbacks"] += 1
+        return parsed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["handled"] + stats["fallbacks"]
+        stats["coverage"] = round(stats["handled"] / total, 3) if total else 0.0
+        return stats
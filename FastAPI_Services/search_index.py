@@ -0,0 +1,202 @@
+import re
+from array import array
+from functools import lru_cache
+
+import numpy as np
+
+# Weight of a term occurrence in each indexed JOBLISTINGS column (BM25F field weights)
+FIELD_WEIGHTS = {
+    "TITLE": 3.0,
+    "JOB_HIGHLIGHTS": 1.5,
+    "COMPANY": 1.5,
+    "LOCATION": 1.0,
+    "DESCRIPTION": 1.0,
+}
+# Columns that also keep exact per-field postings so company/location can be used as filters
+FILTER_FIELDS = ("COMPANY", "LOCATION")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "our", "the", "this", "to", "we", "will", "with", "you", "your",
+}
+
+
+@lru_cache(maxsize=200_000)
+def _stem(token):
+    # Light plural folding so "engineers" matches "engineer"; anything fancier hurts names like "aws"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-case word tokens with stop words removed and plurals folded."""
+    if not text:
+        return []
+    return [_stem(token) for token in TOKEN_PATTERN.findall(str(text).lower()) if token not in STOP_WORDS]
+
+
+def top_k(scores, candidates, k):
+    """The `k` best of `candidates` by `scores`, best first; ties keep candidate (index) order."""
+    if len(candidates) > k:
+        top = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = np.sort(candidates[top])
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class BM25Index:
+    """
+    Inverted index over the JOBLISTINGS text columns with BM25F scoring.
+
+    Postings are stored CSR-style: the postings of term `t` are
+    `doc_ids[offsets[t]:offsets[t + 1]]` with a precomputed BM25 impact per entry, so a
+    query is a handful of vectorised scatter-adds followed by a partial top-k sort.
+    Document ids are row positions in the ListingsSnapshot the index was built from.
+    """
+
+    def __init__(self, vocabulary, offsets, doc_ids, impacts, filter_postings, n_docs):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.filter_postings = filter_postings
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, documents, field_weights=FIELD_WEIGHTS, filter_fields=FILTER_FIELDS, k1=1.2, b=0.75):
+        """Index `documents`, a sequence of dicts keyed by column name."""
+        fields = list(field_weights)
+        n_docs = len(documents)
+        vocabulary = {}
+        term_ids, docs, field_ids, tfs = array("i"), array("i"), array("b"), array("f")
+        lengths = np.zeros((len(fields), n_docs), dtype=np.float32)
+
+        for doc_id, document in enumerate(documents):
+            for field_id, field in enumerate(fields):
+                tokens = tokenize(document.get(field))
+                lengths[field_id, doc_id] = len(tokens)
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, count in counts.items():
+                    term_id = vocabulary.setdefault(token, len(vocabulary))
+                    term_ids.append(term_id)
+                    docs.append(doc_id)
+                    field_ids.append(field_id)
+                    tfs.append(count)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        docs = np.frombuffer(docs, dtype=np.int32)
+        field_ids = np.frombuffer(field_ids, dtype=np.int8)
+        tfs = np.frombuffer(tfs, dtype=np.float32)
+
+        # BM25F: length-normalise each field's term frequency, weight it, then sum across fields
+        average = np.maximum(lengths.mean(axis=1), 1e-9) if n_docs else np.ones(len(fields), dtype=np.float32)
+        weights = np.asarray([field_weights[field] for field in fields], dtype=np.float32)
+        norm = 1 - b + b * lengths[field_ids, docs] / average[field_ids]
+        pseudo_tf = weights[field_ids] * tfs / norm
+
+        order = np.lexsort((docs, term_ids))
+        term_ids, docs, pseudo_tf = term_ids[order], docs[order], pseudo_tf[order]
+        # Merge the per-field entries of the same (term, doc) pair
+        if len(order):
+            starts = np.flatnonzero(np.r_[True, (term_ids[1:] != term_ids[:-1]) | (docs[1:] != docs[:-1])])
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        merged_terms = term_ids[starts]
+        merged_docs = docs[starts].astype(np.int32)
+        merged_tf = np.add.reduceat(pseudo_tf, starts) if len(starts) else pseudo_tf
+
+        df = np.bincount(merged_terms, minlength=len(vocabulary))
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        impacts = (idf[merged_terms] * merged_tf * (k1 + 1) / (merged_tf + k1)).astype(np.float32)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        filter_postings = {}
+        for field in filter_fields:
+            if field not in fields:
+                continue
+            in_field = field_ids[order] == fields.index(field)
+            field_terms, field_docs = term_ids[in_field], docs[in_field].astype(np.int32)
+            field_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(field_terms, minlength=len(vocabulary)), out=field_offsets[1:])
+            filter_postings[field] = (field_offsets, field_docs)
+
+        return cls(vocabulary, offsets, merged_docs, impacts, filter_postings, n_docs)
+
+    def _field_docs(self, field, token):
+        term_id = self.vocabulary.get(token)
+        if term_id is None or field not in self.filter_postings:
+            return np.zeros(0, dtype=np.int32)
+        offsets, doc_ids = self.filter_postings[field]
+        return doc_ids[offsets[term_id]:offsets[term_id + 1]]
+
+    def filter_mask(self, filters):
+        """
+        Boolean mask of documents matching `filters` ({field: [phrases]}): any phrase per
+        field, all tokens of a phrase present in that field, and every field must match.
+        """
+        mask = np.ones(self.n_docs, dtype=bool)
+        for field, phrases in filters.items():
+            field_mask = np.zeros(self.n_docs, dtype=bool)
+            for phrase in phrases:
+                tokens = tokenize(phrase)
+                if not tokens:
+                    continue
+                matched = self._field_docs(field, tokens[0])
+                for token in tokens[1:]:
+                    matched = np.intersect1d(matched, self._field_docs(field, token), assume_unique=True)
+                field_mask[matched] = True
+            mask &= field_mask
+        return mask
+
+    def score(self, text):
+        """BM25 score of every document for `text`; all zeros when `text` has no tokens."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in dict.fromkeys(tokenize(text)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.doc_ids[start:end]] += self.impacts[start:end]
+        return scores
+
+    def search(self, text, k, filters=None, predicate=None):
+        """
+        Rank documents for the free text `text`.
+        Returns (doc_ids, scores, total) for the top `k` matches, best first, where
+        `total` counts every match. Documents must contain at least one query term, pass
+        `filters` (see filter_mask) and, if given, `predicate(doc_id)`. Without query
+        terms, every filtered document matches with score 0 in index order.
+        """
+        scores = self.score(text)
+        if tokenize(text):
+            candidates = np.flatnonzero(scores > 0)
+        else:
+            candidates = np.arange(self.n_docs)
+        candidates = self.restrict(candidates, filters, predicate)
+        # Highest score first; ties keep index order (newest postings first in a snapshot)
+        ranked = top_k(scores, candidates, k)
+        return ranked, scores[ranked], len(candidates)
+
+    def restrict(self, candidates, filters=None, predicate=None):
+        """Drop candidates failing `filters` (see filter_mask) or `predicate(doc_id)`."""
+        if filters:
+            candidates = candidates[self.filter_mask(filters)[candidates]]
+        if predicate is not None:
+            keep = np.fromiter((predicate(int(d)) for d in candidates), dtype=bool, count=len(candidates))
+            candidates = candidates[keep]
+        return candidates
+
+    def stats(self):
+        return {
+            "documents": self.n_docs,
+            "terms": len(self.vocabulary),
+            "postings": int(len(self.doc_ids)),
+            "bytes": int(self.offsets.nbytes + self.doc_ids.nbytes + self.impacts.nbytes
+                         + sum(o.nbytes + d.nbytes for o, d in self.filter_postings.values())),
+        }
@@ -0,0 +1,313 @@
+import functools
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the wait timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a borrowed Snowflake connection.
+    Calling close() hands the connection back to the pool instead of logging out,
+    so existing `finally: conn.close()` blocks keep working unchanged. If a call on the
+    connection or one of its cursors raised one of the pool's `discard_on` errors, close()
+    discards the connection instead of returning it for reuse.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+        self._broken = False
+
+    def _guard(self, fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except self._pool.discard_on:
+                self._broken = True
+                raise
+        return call
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._entry, broken=self._broken)
+
+    def discard(self):
+        """Return the connection to the pool marked as broken so it is not reused."""
+        self._broken = True
+        self.close()
+
+    def cursor(self, *args, **kwargs):
+        return _PooledCursor(self, self._guard(self._entry.conn.cursor)(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._entry.conn, name)
+        return self._guard(attr) if callable(attr) else attr
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _PooledCursor:
+    """Cursor proxy that reports errors from its calls to the connection it came from."""
+
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        return self._connection._guard(attr) if callable(attr) else attr
+
+    def __iter__(self):
+        try:
+            yield from self._cursor
+        except self._connection._pool.discard_on:
+            self._connection._broken = True
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used_at = now
+
+
+class SnowflakeConnectionPool:
+    """
+    Bounded, thread-safe pool of Snowflake connections for a single database.
+
+    - Connections are created lazily up to `max_size`; callers wait up to
+      `acquire_timeout` seconds for a free one before PoolTimeoutError is raised.
+    - On borrow, closed connections are dropped, connections idle longer than
+      `idle_timeout` or older than `max_lifetime` are recycled, and connections
+      idle longer than `validate_after` are pinged with `SELECT 1`.
+    - A connection that raised one of `discard_on` while borrowed is closed on release
+      instead of going back to the pool.
+    """
+
+    def __init__(
+        self,
+        name,
+        connect_factory,
+        min_size=0,
+        max_size=5,
+        acquire_timeout=10.0,
+        idle_timeout=600.0,
+        max_lifetime=3600.0,
+        validate_after=30.0,
+        discard_on=(),
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.name = name
+        self._connect_factory = connect_factory
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self.discard_on = tuple(discard_on)
+
+        self._idle = deque()
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "acquired": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "peak_in_use": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    # Internal helpers
+    def _size(self):
+        return self._in_use + len(self._idle)
+
+    def _close_quietly(self, entry):
+        try:
+            entry.conn.close()
+        except Exception as e:
+            print(f"[{self.name} pool] Error closing connection: {str(e)}")
+
+    def _is_usable(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used_at > self.idle_timeout:
+            return False
+        try:
+            is_closed = getattr(entry.conn, "is_closed", None)
+            if callable(is_closed) and is_closed():
+                return False
+            if now - entry.last_used_at > self.validate_after:
+                cur = entry.conn.cursor()
+                try:
+                    cur.execute("SELECT 1")
+                finally:
+                    cur.close()
+        except Exception as e:
+            print(f"[{self.name} pool] Connection failed validation: {str(e)}")
+            return False
+        return True
+
+    def _create_entry(self):
+        try:
+            entry = _PoolEntry(self._connect_factory())
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        return entry
+
+    # Public API
+    def acquire(self, timeout=None):
+        """Borrow a connection, returning a PooledConnection proxy."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        start = time.monotonic()
+
+        while True:
+            stale = []
+            entry = None
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool '{self.name}' is closed.")
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._size() < self.max_size:
+                        self._in_use += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a '{self.name}' connection "
+                            f"({self._in_use}/{self.max_size} in use)."
+                        )
+                    waited = True
+                    self._lock.wait(remaining)
+
+            if create:
+                entry = self._create_entry()
+            elif not self._is_usable(entry):
+                stale.append(entry)
+                with self._lock:
+                    self._in_use -= 1
+                    self._stats["recycled"] += 1
+                    self._lock.notify()
+                entry = None
+
+            for old in stale:
+                self._close_quietly(old)
+
+            if entry is not None:
+                break
+
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["total_wait_seconds"] += time.monotonic() - start
+        return PooledConnection(self, entry)
+
+    def release(self, entry, broken=False):
+        """Return a borrowed connection to the pool."""
+        entry.last_used_at = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+            keep = not broken and not self._closed
+            if keep:
+                self._idle.append(entry)
+            elif broken:
+                self._stats["discarded"] += 1
+            self._lock.notify()
+        if not keep:
+            self._close_quietly(entry)
+
+    def prewarm(self):
+        """Open `min_size` connections up front so the first requests skip session setup."""
+        entries = []
+        try:
+            for _ in range(self.min_size):
+                entries.append(self.acquire())
+        finally:
+            for pooled in entries:
+                pooled.close()
+
+    def reap_idle(self):
+        """Close idle connections that exceeded idle_timeout or max_lifetime."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            keep = deque()
+            for entry in self._idle:
+                if now - entry.last_used_at > self.idle_timeout or now - entry.created_at > self.max_lifetime:
+                    expired.append(entry)
+                else:
+                    keep.append(entry)
+            self._idle = keep
+            self._stats["recycled"] += len(expired)
+        for entry in expired:
+            self._close_quietly(entry)
+        return len(expired)
+
+    def close_all(self):
+        """Close every idle connection and stop handing out new ones."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def stats(self):
+        """Snapshot of pool utilisation counters."""
+        with self._lock:
+            in_use = self._in_use
+            idle = len(self._idle)
+            stats = dict(self._stats)
+        stats.update({
+            "name": self.name,
+            "max_size": self.max_size,
+            "in_use": in_use,
+            "idle": idle,
+            "size": in_use + idle,
+            "utilisation": round(in_use / self.max_size, 3),
+        })
+        return stats
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import weakref
+from uuid import uuid4
+
+# Tasks that have not finished; a second submission with the same dedup key joins these
+PENDING_STATUSES = ("queued", "running")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TaskQueue:
+    """
+    Background jobs run as tasks on the application's event loop, at most `workers` at a
+    time, with every task's status and result kept in a local SQLite file.
+
+    Jobs are async functions and run on the loop that submitted them, so they share its
+    in-flight document jobs and process-pool limits with ordinary requests and outlive the
+    request that started them. Submitting a job with the `dedup_key` of a task that is still
+    queued or running returns that task instead of starting another. Finished tasks are kept
+    for `result_ttl` seconds.
+
+    Several server processes can share the file; each stamps its tasks with its instance
+    (host and pid). Pending tasks are failed by shutdown() in the process that owns them,
+    or on open when their owning process on this host is gone.
+    """
+
+    def __init__(self, path, workers=4, result_ttl=86400.0, clock=time.time):
+        self.path = path
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tasks = {}
+        # asyncio semaphores belong to one event loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "interrupted": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    owner TEXT,
+                    dedup_key TEXT,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    instance TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(tasks)")}
+            if "instance" not in columns:
+                self._db.execute("ALTER TABLE tasks ADD COLUMN instance TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_dedup_key ON tasks (dedup_key, status)")
+            self._fail_orphans()
+            self._prune()
+
+    def _fail_orphans(self):
+        # Pending tasks of server processes on this host that have exited died with them;
+        # tasks of live sibling processes (and of other hosts) are left alone
+        host = socket.gethostname()
+        instances = [row[0] for row in self._db.execute(
+            "SELECT DISTINCT instance FROM tasks WHERE status IN (?, ?)", PENDING_STATUSES
+        )]
+        for instance in instances:
+            task_host, _, pid = (instance or "").rpartition(":")
+            if instance and (task_host != host or not pid.isdigit() or _process_alive(int(pid))):
+                continue
+            self._stats["interrupted"] += self._db.execute(
+                "UPDATE tasks SET status = 'failed', error = 'Interrupted by a restart; please resubmit.', "
+                "updated_at = ? WHERE instance IS ? AND status IN (?, ?)",
+                (self._clock(), instance, *PENDING_STATUSES),
+            ).rowcount
+
+    def _prune(self):
+        self._db.execute(
+            "DELETE FROM tasks WHERE status NOT IN (?, ?) AND updated_at < ?",
+            (*PENDING_STATUSES, self._clock() - self.result_ttl),
+        )
+
+    def _semaphore(self, loop):
+        with self._lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(self.workers)
+            return self._semaphores[loop]
+
+    def _set_status(self, task_id, status, result=None, error=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, None if result is None else json.dumps(result, default=str), error, self._clock(), task_id),
+            )
+            if status in ("completed", "failed"):
+                self._stats[status] += 1
+
+    def submit(self, kind, job, *args, owner=None, dedup_key=None, **kwargs):
+        """
+        Queue `job(*args, **kwargs)`, an async function returning a JSON-serialisable result,
+        on the running event loop. Returns (task id, whether an identical pending task was reused).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock, self._db:
+            if dedup_key is not None:
+                row = self._db.execute(
+                    "SELECT id FROM tasks WHERE dedup_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (dedup_key, *PENDING_STATUSES),
+                ).fetchone()
+                if row is not None:
+                    self._stats["deduplicated"] += 1
+                    return row[0], True
+            task_id = str(uuid4())
+            now = self._clock()
+            self._db.execute(
+                "INSERT INTO tasks (id, kind, owner, dedup_key, status, created_at, updated_at, instance) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (task_id, kind, owner, dedup_key, now, now, self.instance),
+            )
+            self._stats["submitted"] += 1
+            self._prune()
+        task = loop.create_task(self._run(loop, task_id, job, args, kwargs))
+        # The loop keeps only weak references to tasks
+        self._tasks[task_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(task_id, None))
+        return task_id, False
+
+    async def _run(self, loop, task_id, job, args, kwargs):
+        async with self._semaphore(loop):
+            self._set_status(task_id, "running")
+            try:
+                result = await job(*args, **kwargs)
+            except asyncio.CancelledError:
+                self._set_status(task_id, "failed", error="Interrupted by a shutdown; please resubmit.")
+                raise
+            except Exception as e:
+                # HTTPException carries its message in `detail`
+                self._set_status(task_id, "failed", error=str(getattr(e, "detail", None) or e))
+                return
+        self._set_status(task_id, "completed", result=result)
+
+    async def join(self):
+        """Wait for every task this process has started to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def get(self, task_id):
+        """The task's id, kind, owner, status, result (once completed), error and timestamps, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, owner, status, result, error, created_at, updated_at FROM tasks WHERE id = ?",
+                (task_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        task = dict(zip(("id", "kind", "owner", "status", "result", "error", "created_at", "updated_at"), row))
+        task["result"] = None if task["result"] is None else json.loads(task["result"])
+        return task
+
+    def stats(self):
+        """Worker limit, this process's in-flight tasks and counters, and the number of tasks per status."""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            return {"workers": self.workers, "in_flight": len(self._tasks), **self._stats, "tasks": counts}
+
+    def shutdown(self):
+        """Cancel this process's tasks and fail any of its pending rows, so pollers don't wait forever."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        with self._lock, self._db:
+            self._stats["interrupted"] += self._db.execute(
+                "UPDATE tasks SET status = 'failed', error = 'Interrupted by a shutdown; please resubmit.', "
+                "updated_at = ? WHERE instance = ? AND status IN (?, ?)",
+                (self._clock(), self.instance, *PENDING_STATUSES),
+            ).rowcount
@@ -0,0 +1,295 @@
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from search_index import tokenize, top_k
+
+# Job-market abbreviations expanded alongside the original token, so "ML platform"
+# lands near "machine learning engineer"
+ABBREVIATIONS = {
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "sre": "site reliability engineer",
+    "swe": "software engineer",
+    "sde": "software development engineer",
+    "qa": "quality assurance",
+    "bi": "business intelligence",
+    "pm": "product manager",
+    "ux": "user experience",
+    "ui": "user interface",
+    "etl": "extract transform load",
+    "hr": "human resources",
+    "devops": "development operations",
+}
+_EXPANSIONS = {abbreviation: expansion.split() for abbreviation, expansion in ABBREVIATIONS.items()}
+
+# Columns embedded per listing and the weight of each column's terms
+VECTOR_FIELD_WEIGHTS = {"TITLE": 2.0, "JOB_HIGHLIGHTS": 1.0, "DESCRIPTION": 1.0}
+
+# Document frequencies are kept per hashed term slot rather than per term string
+IDF_SLOTS = 1 << 20
+# Share of a word's vector that comes from its character trigrams (typo and inflection tolerance)
+CHAR_NGRAM_WEIGHT = 0.5
+_MAX_CACHED_BIGRAMS = 500_000
+
+
+class HashedNgramEmbedder:
+    """
+    Fixed-size text vectors from signed feature hashing of words (plus their character
+    trigrams) and word bigrams, weighted by sub-linear TF-IDF and L2-normalised.
+
+    Hashing uses crc32, so vectors are identical across processes and machines; nothing is
+    downloaded and no model is trained beyond the IDF table. Each distinct word's hashed
+    vector is computed once and cached, so embedding a document is a gather and a sum.
+
+    Once frozen (after an index is built, or from the start for query-only use) the cache
+    stops growing: words it has not seen are hashed for the call that needs them and then
+    dropped, so arbitrary query text can't grow memory.
+    """
+
+    def __init__(self, dim=128, idf=None, frozen=False):
+        self.dim = dim
+        self.idf = idf
+        self.frozen = frozen
+        self._lock = threading.Lock()
+        self._word_index = {}
+        self._word_slots = np.zeros(1024, dtype=np.int32)
+        self._word_vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._bigram_cache = {}
+
+    def _hash(self, feature):
+        h = zlib.crc32(feature.encode("utf-8"))
+        return h % IDF_SLOTS, (h >> 12) % self.dim, 1.0 if (h >> 31) & 1 else -1.0
+
+    def freeze(self):
+        """Stop adding words and bigrams to the caches; later unseen ones are hashed per call."""
+        self.frozen = True
+
+    def _word_features(self, word):
+        # IDF slot and hashed vector of a word: its own bucket plus its character trigrams
+        slot, bucket, sign = self._hash(f"w:{word}")
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[bucket] += sign
+        padded = f"<{word}>"
+        trigrams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for trigram in trigrams:
+            _, trigram_bucket, trigram_sign = self._hash(f"c:{trigram}")
+            vector[trigram_bucket] += CHAR_NGRAM_WEIGHT * trigram_sign / len(trigrams)
+        return slot, vector
+
+    def _word_id(self, word):
+        """Cached id of `word`, or None when the cache is frozen and has not seen it."""
+        word_id = self._word_index.get(word)
+        if word_id is not None or self.frozen:
+            return word_id
+        with self._lock:
+            word_id = self._word_index.get(word)
+            if word_id is None:
+                slot, vector = self._word_features(word)
+                word_id = len(self._word_index)
+                if word_id == len(self._word_slots):
+                    # Grow into new arrays and fill them before publishing, so readers never see a gap
+                    slots = np.zeros(2 * word_id, dtype=np.int32)
+                    slots[:word_id] = self._word_slots
+                    vectors = np.zeros((2 * word_id, self.dim), dtype=np.float32)
+                    vectors[:word_id] = self._word_vectors
+                    self._word_slots, self._word_vectors = slots, vectors
+                self._word_slots[word_id] = slot
+                self._word_vectors[word_id] = vector
+                self._word_index[word] = word_id
+        return word_id
+
+    def _bigram(self, pair):
+        feature = self._bigram_cache.get(pair)
+        if feature is None:
+            feature = self._hash(f"b:{pair[0]} {pair[1]}")
+            if not self.frozen and len(self._bigram_cache) < _MAX_CACHED_BIGRAMS:
+                self._bigram_cache[pair] = feature
+        return feature
+
+    def terms(self, weighted_texts):
+        """
+        ({word: weighted count}, {(word, word): weighted count}) for an iterable of
+        (text, weight) pairs; abbreviations are expanded next to the original token.
+        """
+        words_weight, bigrams_weight = {}, {}
+        for text, weight in weighted_texts:
+            words = tokenize(text)
+            if not _EXPANSIONS.keys().isdisjoint(words):
+                words = [word for token in words for word in (token, *_EXPANSIONS.get(token, ()))]
+            for word, count in Counter(words).items():
+                words_weight[word] = words_weight.get(word, 0.0) + count * weight
+            for pair, count in Counter(zip(words, words[1:])).items():
+                bigrams_weight[pair] = bigrams_weight.get(pair, 0.0) + count * weight
+        return words_weight, bigrams_weight
+
+    def term_slots(self, terms):
+        """IDF slots of every word and bigram in one `terms()` result."""
+        words, bigrams = terms
+        slots = {self._hash(f"w:{word}")[0] for word in words}
+        slots.update(self._bigram(pair)[0] for pair in bigrams)
+        return slots
+
+    def vectorise(self, documents_terms):
+        """Stack unit-length vectors, one per `terms()` result, into a float32 matrix."""
+        n_rows = len(documents_terms)
+        word_rows, word_ids, word_counts = array("i"), array("i"), array("f")
+        # Words missing from a frozen cache get ids -1, -2, ... into these per-call features
+        uncached_ids, uncached_features = {}, []
+        bigram_rows, bigram_slots, bigram_buckets, bigram_values = array("i"), array("i"), array("i"), array("f")
+        for row, (words, bigrams) in enumerate(documents_terms):
+            for word, count in words.items():
+                word_id = self._word_id(word)
+                if word_id is None:
+                    word_id = uncached_ids.get(word)
+                    if word_id is None:
+                        uncached_features.append(self._word_features(word))
+                        word_id = uncached_ids[word] = -len(uncached_features)
+                word_rows.append(row)
+                word_ids.append(word_id)
+                word_counts.append(count)
+            for pair, count in bigrams.items():
+                slot, bucket, sign = self._bigram(pair)
+                bigram_rows.append(row)
+                bigram_slots.append(slot)
+                bigram_buckets.append(bucket)
+                bigram_values.append(sign * count)
+
+        idf = self.idf
+        matrix = np.zeros((n_rows, self.dim), dtype=np.float32)
+        if word_rows:
+            ids = np.frombuffer(word_ids, dtype=np.int32)
+            rows = np.frombuffer(word_rows, dtype=np.int32)
+            weights = 1 + np.log(np.frombuffer(word_counts, dtype=np.float32))
+            word_vectors, word_slots = self._word_vectors, self._word_slots
+            if uncached_features:
+                cached = ids >= 0
+                vectors = np.empty((len(ids), self.dim), dtype=np.float32)
+                slots = np.empty(len(ids), dtype=np.int32)
+                vectors[cached], slots[cached] = word_vectors[ids[cached]], word_slots[ids[cached]]
+                extra = -1 - ids[~cached]
+                vectors[~cached] = np.stack([vector for _, vector in uncached_features])[extra]
+                slots[~cached] = np.array([slot for slot, _ in uncached_features], dtype=np.int32)[extra]
+            else:
+                vectors, slots = word_vectors[ids], word_slots[ids]
+            if idf is not None:
+                weights = weights * idf[slots]
+            # Rows are appended in order, so each document's words form one contiguous run
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            matrix[rows[starts]] = np.add.reduceat(vectors * weights[:, None], starts, axis=0)
+        if bigram_rows:
+            values = np.frombuffer(bigram_values, dtype=np.float32)
+            values = np.sign(values) * (1 + np.log(np.abs(values)))
+            if idf is not None:
+                values = values * idf[np.frombuffer(bigram_slots, dtype=np.int32)]
+            flat = (np.frombuffer(bigram_rows, dtype=np.int32).astype(np.int64) * self.dim
+                    + np.frombuffer(bigram_buckets, dtype=np.int32))
+            matrix += np.bincount(flat, weights=values, minlength=n_rows * self.dim).reshape(n_rows, self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+    def embed(self, text):
+        """Unit-length float32 vector for a query; all zeros when `text` has no tokens."""
+        return self.vectorise([self.terms([(text, 1.0)])])[0]
+
+
+class VectorIndex:
+    """
+    Semantic index: one contiguous (documents x dim) float32 matrix of unit vectors.
+
+    A query is embedded with the same HashedNgramEmbedder, scored against every listing
+    with a single matrix-vector product (cosine similarity), and cut to the top k with
+    argpartition. Row i is the document at position i of the snapshot's rows.
+    """
+
+    def __init__(self, embedder, matrix):
+        self.embedder = embedder
+        self.matrix = matrix
+        self.n_docs = matrix.shape[0]
+
+    @staticmethod
+    def _document_texts(document, field_weights):
+        return [(document.get(field), weight) for field, weight in field_weights.items()]
+
+    @classmethod
+    def build(cls, documents, dim=128, field_weights=VECTOR_FIELD_WEIGHTS, chunk_size=2000, idf_sample=50000):
+        """
+        Embed `documents` (dicts keyed by column name). IDF is estimated from an evenly
+        spaced sample of at most `idf_sample` documents, then every document is embedded once.
+        """
+        embedder = HashedNgramEmbedder(dim)
+        n_docs = len(documents)
+
+        step = max(n_docs // idf_sample, 1) if idf_sample else 1
+        sample = documents[::step]
+        slots = array("i")
+        for document in sample:
+            slots.extend(embedder.term_slots(embedder.terms(cls._document_texts(document, field_weights))))
+        df = np.bincount(np.frombuffer(slots, dtype=np.int32), minlength=IDF_SLOTS) if slots else np.zeros(IDF_SLOTS)
+        embedder.idf = (np.log((1 + len(sample)) / (1 + df)) + 1).astype(np.float32)
+
+        matrix = np.zeros((n_docs, dim), dtype=np.float32)
+        for start in range(0, n_docs, chunk_size):
+            chunk = documents[start:start + chunk_size]
+            terms = [embedder.terms(cls._document_texts(document, field_weights)) for document in chunk]
+            matrix[start:start + len(chunk)] = embedder.vectorise(terms)
+        # Queries reuse the listings' word vectors but must not add their own
+        embedder.freeze()
+        return cls(embedder, matrix)
+
+    def score(self, text):
+        """Cosine similarity of every document to `text` (all zeros for an empty query)."""
+        query = self.embedder.embed(text)
+        if not query.any():
+            return np.zeros(self.n_docs, dtype=np.float32)
+        return self.matrix @ query
+
+    def search(self, text, k, restrict=None, min_score=0.15):
+        """
+        Top `k` documents by cosine similarity, best first, as (doc_ids, scores, total).
+        Documents below `min_score` do not match; `restrict(candidates)` applies filters.
+        Without query tokens every document matches with score 0, as in BM25Index.search.
+        """
+        scores = self.score(text)
+        if tokenize(text):
+            candidates = np.flatnonzero(scores >= min_score)
+        else:
+            candidates = np.arange(self.n_docs)
+        if restrict is not None:
+            candidates = restrict(candidates)
+        ranked = top_k(scores, candidates, k)
+        return ranked, scores[ranked], len(candidates)
+
+    def stats(self):
+        return {
+            "documents": self.n_docs,
+            "dim": int(self.matrix.shape[1]),
+            "dtype": str(self.matrix.dtype),
+            "bytes": int(self.matrix.nbytes),
+        }
+
+
+def hybrid_search(keyword_index, vector_index, text, k, alpha=0.5, restrict=None, min_score=0.15):
+    """
+    Blend BM25 and cosine scores: alpha * cosine + (1 - alpha) * BM25 / max(BM25).
+    A document matches if it contains a query term or is semantically close enough.
+    """
+    keyword = keyword_index.score(text)
+    semantic = vector_index.score(text)
+    top_keyword = keyword.max() if len(keyword) else 0.0
+    normalised = keyword / top_keyword if top_keyword > 0 else keyword
+    blended = (alpha * np.clip(semantic, 0, None) + (1 - alpha) * normalised).astype(np.float32)
+
+    if tokenize(text):
+        candidates = np.flatnonzero((keyword > 0) | (semantic >= min_score))
+    else:
+        candidates = np.arange(len(blended))
+    if restrict is not None:
+        candidates = restrict(candidates)
+    ranked = top_k(blended, candidates, k)
+    return ranked, blended[ranked], len(candidates)
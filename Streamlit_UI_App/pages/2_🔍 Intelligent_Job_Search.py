@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import search_jobs, save_job
+from utils import search_jobs, save_job, get_job_details
 
 st.set_page_config(page_title="Job Search", layout="centered")
 
@@ -144,6 +144,14 @@ if 'search_results' not in st.session_state:
     st.session_state['search_results'] = []
 if 'search_performed' not in st.session_state:
     st.session_state['search_performed'] = False
+if 'search_query' not in st.session_state:
+    st.session_state['search_query'] = ""
+if 'search_mode' not in st.session_state:
+    st.session_state['search_mode'] = "filter"
+if 'search_next_cursor' not in st.session_state:
+    st.session_state['search_next_cursor'] = None
+if 'search_total' not in st.session_state:
+    st.session_state['search_total'] = None
 
 # Ensure user is logged in
 if st.session_state['access_token'] is None:
@@ -176,11 +184,32 @@ def logout():
     if 'selected_saved_job_index' in st.session_state:
         st.session_state['selected_saved_job_index'] = None
     st.session_state['search_performed'] = False
+    st.session_state['search_next_cursor'] = None
+    st.session_state['search_total'] = None
+
+def load_more():
+    """Fetch the next page of results for the current search."""
+    response = search_jobs(
+        st.session_state['search_query'],
+        st.session_state['access_token'],
+        cursor=st.session_state['search_next_cursor'],
+        mode=st.session_state['search_mode'],
+    )
+    if response.status_code == 200:
+        data = response.json()
+        st.session_state['search_results'].extend(data.get('data', []))
+        st.session_state['search_next_cursor'] = data.get('next_cursor')
+    else:
+        st.error("Failed to fetch more jobs. Please try again.")
 
 # Functions to display content
 def show_job_list(jobs):
     st.markdown("---")
-    st.write(f"Found {len(jobs)} job(s).")
+    total = st.session_state.get('search_total')
+    if total is not None and total > len(jobs):
+        st.write(f"Showing {len(jobs)} of {total} job(s).")
+    else:
+        st.write(f"Found {len(jobs)} job(s).")
     for i, job in enumerate(jobs):
         title = job.get('TITLE', 'No Title')
         company = job.get('COMPANY', 'Unknown')
@@ -197,6 +226,8 @@ def show_job_list(jobs):
         """
         st.markdown(job_card_html, unsafe_allow_html=True)
         st.button("View Details", key=f"view_details_{i}", on_click=select_job, args=(i,))
+    if st.session_state.get('search_next_cursor'):
+        st.button("Load More", key="load_more_jobs", on_click=load_more)
 
 def show_job_details(job):
     st.markdown("---")
@@ -252,16 +283,28 @@ def show_job_details(job):
 
 # Handle search input
 search_query = st.text_input("Enter job search query")
+SEARCH_MODES = {
+    "Newest first": "filter",
+    "Best keyword match": "bm25",
+    "Similar meaning": "semantic",
+    "Keyword + meaning": "hybrid",
+}
+search_mode_label = st.selectbox("Sort results by", list(SEARCH_MODES))
 search_button = st.button("Search", key="search_button")
 
 if search_button and search_query:
     st.session_state['search_performed'] = True
     with st.spinner("Searching for jobs..."):
-        response = search_jobs(search_query, st.session_state['access_token'])
+        search_mode = SEARCH_MODES[search_mode_label]
+        response = search_jobs(search_query, st.session_state['access_token'], mode=search_mode)
         if response.status_code == 200:
             data = response.json()
             jobs = data.get('data', [])
             st.session_state['search_results'] = jobs
+            st.session_state['search_query'] = search_query
+            st.session_state['search_mode'] = search_mode
+            st.session_state['search_next_cursor'] = data.get('next_cursor')
+            st.session_state['search_total'] = data.get('total_estimate')
             st.session_state['selected_search_job_index'] = None
         else:
             st.error("Failed to fetch jobs. Please try again.")
@@ -271,6 +314,12 @@ if st.session_state['selected_search_job_index'] is not None:
     idx = st.session_state['selected_search_job_index']
     if idx < len(st.session_state['search_results']):
         selected_job = st.session_state['search_results'][idx]
+        # Search results carry summary columns only; load the full job once when opened
+        if "DESCRIPTION" not in selected_job:
+            detail_response = get_job_details(selected_job.get('JOB_ID'), st.session_state['access_token'])
+            if detail_response.status_code == 200:
+                selected_job = {**selected_job, **detail_response.json()}
+                st.session_state['search_results'][idx] = selected_job
         show_job_details(selected_job)
     else:
         st.session_state['selected_search_job_index'] = None
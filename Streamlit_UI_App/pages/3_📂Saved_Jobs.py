@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import get_saved_jobs, update_job_status, delete_saved_job, generate_feedback, save_feedback, chat_feedback
+from utils import get_saved_jobs, get_job_details, update_job_status, delete_saved_job, stream_feedback, save_feedback, stream_chat_feedback
 
 st.set_page_config(page_title="Saved Jobs", layout="centered")
 
@@ -144,11 +144,15 @@ if 'selected_saved_job_index' not in st.session_state:
     st.session_state['selected_saved_job_index'] = None
 if 'feedback' not in st.session_state:
     st.session_state['feedback'] = ""
+# Full rows of saved jobs already opened, by JOB_ID, so reruns don't refetch them
+if 'saved_job_details' not in st.session_state:
+    st.session_state['saved_job_details'] = {}
 
 # Logout function
 def logout():
     st.session_state['access_token'] = None
     st.session_state['selected_saved_job_index'] = None
+    st.session_state['saved_job_details'] = {}
     st.success("Logged out successfully!")
 
 # Fetch saved jobs
@@ -206,6 +210,17 @@ else:
     idx = st.session_state['selected_saved_job_index']
     if idx is not None and 0 <= idx < len(saved_jobs):
         selected_job = saved_jobs[idx]
+        # The saved jobs list carries summary columns only; load description, highlights and feedback once
+        job_id = selected_job.get('JOB_ID')
+        job_details = st.session_state['saved_job_details']
+        if job_id not in job_details:
+            detail_response = get_job_details(job_id, st.session_state['access_token'], source="saved")
+            if detail_response.status_code != 200:
+                st.error(f"Failed to load job details: {detail_response.json().get('detail', 'Unknown error')}")
+                st.button("Back to Saved Jobs", on_click=go_back_to_list)
+                st.stop()
+            job_details[job_id] = detail_response.json()
+        selected_job = {**selected_job, **job_details[job_id]}
         st.title(f"Job Details: {selected_job.get('TITLE', 'No Title')}")
         st.markdown("---")
         # Tabs for different operations
@@ -242,18 +257,16 @@ else:
             # Generate general feedback
             feedback_button = st.button("Generate Feedback")
             if feedback_button:
-                with st.spinner("Generating feedback..."):
-                    response = generate_feedback(
+                # Render the feedback as it is generated
+                try:
+                    st.session_state['feedback'] = st.write_stream(stream_feedback(
                         job_id=selected_job.get('JOB_ID', 'Unknown'),
                         description=selected_job.get('DESCRIPTION', ''),
                         highlights=selected_job.get('JOB_HIGHLIGHTS', ''),
                         token=st.session_state['access_token']
-                    )
-                    if response.status_code == 200:
-                        st.session_state['feedback'] = response.json().get('feedback', 'No feedback available.')
-                        st.write(st.session_state['feedback'])
-                    else:
-                        st.error(f"Failed to generate feedback: {response.json().get('detail', 'Unknown error')}")
+                    )) or 'No feedback available.'
+                except Exception as e:
+                    st.error(f"Failed to generate feedback: {str(e)}")
 
             if st.session_state['feedback']:
                 if st.button("Save Feedback"):
@@ -263,6 +276,7 @@ else:
                         token=st.session_state['access_token']
                     )
                     if save_response.status_code == 200:
+                        st.session_state['saved_job_details'].pop(job_id, None)
                         st.success("Feedback saved successfully!")
                     else:
                         st.error(f"Failed to save feedback: {save_response.json().get('detail', 'Unknown error')}")
@@ -291,19 +305,16 @@ else:
                 if not question.strip():
                     st.error("Please enter a question.")
                 else:
-                    with st.spinner("Getting specific feedback..."):
-                        chat_response = chat_feedback(
+                    try:
+                        st.write_stream(stream_chat_feedback(
                             document_type=document_type.lower(),
                             question=question,
                             description=selected_job.get('DESCRIPTION', ''),
                             highlights=selected_job.get('JOB_HIGHLIGHTS', ''),
                             token=st.session_state['access_token']
-                        )
-                        if chat_response.status_code == 200:
-                            response_text = chat_response.json().get("response", "No response available.")
-                            st.write(response_text)
-                        else:
-                            st.error(f"Failed to get feedback: {chat_response.json().get('detail', 'Unknown error')}")
+                        ))
+                    except Exception as e:
+                        st.error(f"Failed to get feedback: {str(e)}")
 
 
             with tab3:
@@ -336,6 +347,7 @@ else:
                 if st.button("Update Status"):
                     response = update_job_status(selected_job.get('JOB_ID'), new_status, st.session_state['access_token'])
                     if response.status_code == 200:
+                        st.session_state['saved_job_details'].pop(job_id, None)
                         st.success(f"Status updated to '{new_status}' successfully!")
                         saved_jobs = fetch_saved_jobs()
                         st.session_state['selected_saved_job_index'] = None
@@ -360,6 +372,7 @@ else:
                 if st.button("Delete Job"):
                     response = delete_saved_job(selected_job.get('JOB_ID'), st.session_state['access_token'])
                     if response.status_code == 200:
+                        st.session_state['saved_job_details'].pop(job_id, None)
                         st.success("Job deleted successfully!")
                         saved_jobs = fetch_saved_jobs()
                         st.session_state['selected_saved_job_index'] = None
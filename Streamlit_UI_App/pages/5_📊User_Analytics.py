@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
-from utils import fetch_user_jobs
+from utils import fetch_analytics, fetch_highlight_terms, fetch_user_jobs
 
 st.set_page_config(page_title="User Analytics", layout="wide")
 
@@ -28,75 +28,74 @@ if 'access_token' not in st.session_state or st.session_state['access_token'] is
     st.warning("You need to log in to view user analytics.")
     st.stop()
 
-# Fetch user jobs
-def fetch_user_jobs_data():
+# Filters; an empty selection means "All"
+FILTERS = [
+    ("location", "LOCATION", "Filter by Location"),
+    ("company", "COMPANY", "Filter by Company"),
+    ("status", "STATUS", "Filter by Status"),
+    ("posted_date", "POSTED_DATE", "Filter by Posted Dates"),
+]
+
+# Aggregates are computed by the API (GROUP BY in Snowflake); only the counts come back
+def fetch_user_analytics(selections=None, keyword=None, top_n=10):
     try:
-        return fetch_user_jobs(st.session_state['access_token'])
+        return fetch_analytics("user-jobs", st.session_state['access_token'], selections, keyword=keyword, top_n=top_n)
     except Exception as e:
         st.error(f"Error fetching user analytics data: {e}")
-        return []
-
-user_jobs = fetch_user_jobs_data()
+        return None
+
+def counts_series(items, key="value"):
+    return pd.Series({item[key]: item["count"] for item in items}, name="count", dtype="int64")
+
+def filter_saved_jobs(df, selections, keyword):
+    for name, field, _ in FILTERS:
+        if selections[name] and field in df.columns:
+            df = df[df[field].astype(str).isin(selections[name])]
+    # Same match as the API: title or description contains the keyword; the table has no descriptions
+    if keyword and "TITLE" in df.columns:
+        matches = df["TITLE"].str.contains(keyword, case=False, na=False, regex=False)
+        if "DESCRIPTION" in df.columns:
+            matches |= df["DESCRIPTION"].str.contains(keyword, case=False, na=False, regex=False)
+        df = df[matches]
+    return df
+
+selections = {name: st.session_state.get(f"user_filter_{name}", []) for name, _, _ in FILTERS}
+keyword = st.session_state.get("user_filter_keyword", "")
+# Unfiltered aggregates supply the filter options
+overview = fetch_user_analytics(top_n=100)
+analytics = fetch_user_analytics(selections, keyword) if any(selections.values()) or keyword else overview
 
 st.title("📊 User Analytics")
 st.markdown("---")
 
-if user_jobs:
-    st.write(f"Found {len(user_jobs)} saved job(s).")
-
-    # Convert data into a Pandas DataFrame
-    df = pd.DataFrame(user_jobs)
+if overview and overview["total"] and analytics:
+    st.write(f"Found {overview['total']} saved job(s).")
 
     # Add filters
     st.header("Filters")
-    col1, col2, col3, col4, col5 = st.columns(5)
-
-    # Filter by Location
-    if "LOCATION" in df.columns:
-        with col1:
-            unique_locations = ["All"] + sorted(df["LOCATION"].dropna().unique())
-            selected_locations = st.multiselect("Filter by Location", unique_locations, default=["All"])
-            if "All" not in selected_locations:
-                df = df[df["LOCATION"].isin(selected_locations)]
-
-    # Filter by Company
-    if "COMPANY" in df.columns:
-        with col2:
-            unique_companies = ["All"] + sorted(df["COMPANY"].dropna().unique())
-            selected_companies = st.multiselect("Filter by Company", unique_companies, default=["All"])
-            if "All" not in selected_companies:
-                df = df[df["COMPANY"].isin(selected_companies)]
-
-    # Filter by Status
-    if "STATUS" in df.columns:
-        with col3:
-            unique_status = ["All"] + sorted(df["STATUS"].dropna().unique())
-            selected_status = st.multiselect("Filter by Status", unique_status, default=["All"])
-            if "All" not in selected_status:
-                df = df[df["STATUS"].isin(selected_status)]
-
-    # Filter by Posted Date
-    if "POSTED_DATE" in df.columns:
-        with col4:
-            df["POSTED_DATE"] = pd.to_datetime(df["POSTED_DATE"], errors="coerce")
-            unique_dates = ["All"] + sorted(df["POSTED_DATE"].dropna().astype(str).unique())
-            selected_dates = st.multiselect("Filter by Posted Dates", unique_dates, default=["All"])
-            if "All" not in selected_dates:
-                selected_dates = pd.to_datetime(selected_dates)
-                df = df[df["POSTED_DATE"].isin(selected_dates)]
+    columns = st.columns(5)
+    for column, (name, field, label) in zip(columns, FILTERS):
+        with column:
+            if field == "POSTED_DATE":
+                options = sorted((item["date"] for item in overview["posted_dates"]), reverse=True)
+            else:
+                options = sorted(item["value"] for item in overview["top"][field])
+            st.multiselect(label, options, key=f"user_filter_{name}")
 
     # Keyword Search
-    with col5:
-        search_query = st.text_input("Search by Keyword", "")
-        if search_query:
-            df = df[
-                df["TITLE"].str.contains(search_query, case=False, na=False)
-                | df["DESCRIPTION"].str.contains(search_query, case=False, na=False)
-            ]
-
-    # Display filtered DataFrame
+    with columns[4]:
+        st.text_input("Search by Keyword", key="user_filter_keyword")
+
+    # Display filtered DataFrame: summary columns only; the export below fetches every column
     st.subheader("Filtered User Saved Jobs")
-    st.dataframe(df)
+    try:
+        df = pd.DataFrame(fetch_user_jobs(
+            st.session_state['access_token'], fields="JOB_ID,TITLE,COMPANY,LOCATION,APPLY_LINKS,POSTED_DATE,STATUS",
+        ))
+    except Exception as e:
+        st.error(f"Error fetching saved jobs: {e}")
+        df = pd.DataFrame()
+    st.dataframe(filter_saved_jobs(df, selections, keyword))
 
     # ----- Analytics Section -----
     st.markdown("---")
@@ -104,70 +103,81 @@ if user_jobs:
 
     # Total Jobs Saved
     st.subheader("📋 Total Jobs Saved")
-    st.write(f"Total jobs saved after filtering: **{len(df)}**")
+    st.write(f"Total jobs saved after filtering: **{analytics['total']}**")
 
     # Jobs by Status
-    if "STATUS" in df.columns:
-        st.subheader("🟢 Jobs by Status")
-        status_counts = df["STATUS"].value_counts()
-        st.bar_chart(status_counts)
-        st.write(status_counts)
+    st.subheader("🟢 Jobs by Status")
+    status_counts = counts_series(analytics["top"]["STATUS"])
+    st.bar_chart(status_counts)
+    st.write(status_counts)
 
     # Jobs by Location
-    if "LOCATION" in df.columns:
-        st.subheader("📍 Jobs by Location")
-        location_counts = df["LOCATION"].value_counts().head(10)
-        st.bar_chart(location_counts)
-        st.write(location_counts)
+    st.subheader("📍 Jobs by Location")
+    location_counts = counts_series(analytics["top"]["LOCATION"][:10])
+    st.bar_chart(location_counts)
+    st.write(location_counts)
 
     # Jobs Posted Over Time
-    if "POSTED_DATE" in df.columns:
-        st.subheader("🕒 Jobs Saved Over Time")
-        jobs_over_time = df["POSTED_DATE"].value_counts().sort_index()
-        st.line_chart(jobs_over_time)
-        st.write(jobs_over_time)
+    st.subheader("🕒 Jobs Saved Over Time")
+    jobs_over_time = counts_series(analytics["posted_dates"], key="date")
+    st.line_chart(jobs_over_time)
+    st.write(jobs_over_time)
 
     # Top Job Titles
-    if "TITLE" in df.columns:
-        st.subheader("💼 Top Job Titles")
-        title_counts = df["TITLE"].value_counts().head(10)
-        st.bar_chart(title_counts)
-        st.write(title_counts)
+    st.subheader("💼 Top Job Titles")
+    title_counts = counts_series(analytics["top"]["TITLE"][:10])
+    st.bar_chart(title_counts)
+    st.write(title_counts)
 
     # Top Companies
-    if "COMPANY" in df.columns:
-        st.subheader("🏢 Top Companies")
-        company_counts = df["COMPANY"].value_counts().head(10)
-        st.bar_chart(company_counts)
-        st.write(company_counts)
-
-    # Word Cloud for Job Highlights
-    if "JOB_HIGHLIGHTS" in df.columns:
+    st.subheader("🏢 Top Companies")
+    company_counts = counts_series(analytics["top"]["COMPANY"][:10])
+    st.bar_chart(company_counts)
+    st.write(company_counts)
+
+    # Word Cloud for Job Highlights (word counts over every filtered saved job, from the API)
+    try:
+        highlight_terms = fetch_highlight_terms("user-jobs", st.session_state['access_token'], selections, keyword=keyword)
+    except Exception as e:
+        st.error(f"Error fetching highlight terms: {e}")
+        highlight_terms = {}
+    if highlight_terms:
         st.subheader("📖 Key Skills and Highlights (Word Cloud)")
-        highlights_text = " ".join(df["JOB_HIGHLIGHTS"].dropna())
-        wordcloud = WordCloud(width=800, height=400, background_color="white").generate(highlights_text)
+        wordcloud = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(highlight_terms)
         plt.figure(figsize=(10, 5))
         plt.imshow(wordcloud, interpolation="bilinear")
         plt.axis("off")
         st.pyplot(plt)
 
     # Salary Range (if available)
-    if "DESCRIPTION" in df.columns:
-        st.subheader("💵 Salary Mentions")
-        salary_keywords = df["DESCRIPTION"].str.extract(r"(\$[\d,]+)").dropna()
-        if not salary_keywords.empty:
-            st.write(f"Found {len(salary_keywords)} salary mentions in job descriptions.")
-            st.write(salary_keywords[0].value_counts().head(10))
-        else:
-            st.write("No salary information found.")
-
-    # Download Analytics Data
+    st.subheader("💵 Salary Mentions")
+    salary = analytics["salary"]
+    if salary["mentions"]:
+        st.write(f"Found {salary['mentions']} salary mentions in job descriptions.")
+        st.write(pd.Series({key: salary[key] for key in ("min", "p25", "median", "p75", "max")}, name="Salary ($)"))
+        st.write(counts_series(salary["top"][:10]).rename("Most mentioned amounts"))
+    else:
+        st.write("No salary information found.")
+
+    # Download Analytics Data: every column of the filtered saved jobs, fetched only when requested
     st.subheader("📥 Download Filtered Data")
-    st.download_button(
-        label="Download Filtered User Data as CSV",
-        data=df.to_csv(index=False),
-        file_name="user_analytics.csv",
-        mime="text/csv"
-    )
+    export_key = (repr(selections), keyword)
+    if st.button("Prepare CSV of Filtered User Data"):
+        with st.spinner("Fetching saved jobs..."):
+            try:
+                export_df = filter_saved_jobs(
+                    pd.DataFrame(fetch_user_jobs(st.session_state['access_token'], fields="all")), selections, keyword
+                )
+                st.session_state["user_jobs_export"] = (export_key, export_df.to_csv(index=False))
+            except Exception as e:
+                st.error(f"Error exporting saved jobs: {e}")
+    export = st.session_state.get("user_jobs_export")
+    if export and export[0] == export_key:
+        st.download_button(
+            label="Download Filtered User Data as CSV",
+            data=export[1],
+            file_name="user_analytics.csv",
+            mime="text/csv"
+        )
 else:
     st.info("No saved jobs found for the user.")
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
-from utils import get_job_listings
+from utils import fetch_analytics, fetch_highlight_terms, fetch_job_facets, stream_job_facets
 
 st.set_page_config(page_title="Job Listings Analytics", layout="wide")
 
@@ -28,151 +28,144 @@ if 'access_token' not in st.session_state or st.session_state['access_token'] is
     st.warning("You need to log in to view job listings.")
     st.stop()
 
-# Fetch job listings
-def fetch_job_listings():
+# Facet filters; an empty selection means "All"
+FACETS = [
+    ("location", "LOCATION", "Filter by Location"),
+    ("company", "COMPANY", "Filter by Company"),
+    ("search_query", "SEARCH_QUERY", "Filter by Search Query"),
+    ("posted_date", "POSTED_DATE", "Filter by Posted Dates"),
+]
+PAGE_SIZE = 100
+
+# Filtering and counting happen in the API; only one page of rows and the facet counts come back
+def fetch_job_facets_page(keyword, page):
+    selections = {name: st.session_state.get(f"facet_{name}", []) for name, _, _ in FACETS}
     try:
-        response = get_job_listings(st.session_state['access_token'])
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Failed to fetch job listings: {response.json().get('detail', 'Unknown error')}")
-            return []
+        # The table shows every column
+        return fetch_job_facets(
+            st.session_state['access_token'], selections, keyword=keyword,
+            limit=PAGE_SIZE, offset=page * PAGE_SIZE, facet_limit=0, fields="all",
+        )
     except Exception as e:
         st.error(f"Error fetching job listings: {str(e)}")
-        return []
+        return None
 
-# Fetch the job listings
-job_listings = fetch_job_listings()
+def reset_page():
+    st.session_state["facet_page"] = 1
 
 st.title("📋 Job Listings Analytics")
 st.markdown("---")
 
-if job_listings:
-    st.write(f"Found {len(job_listings)} job listing(s).")
+keyword = st.session_state.get("facet_keyword", "")
+page = st.session_state.get("facet_page", 1) - 1
+result = fetch_job_facets_page(keyword, page)
 
-    # Convert data into a Pandas DataFrame
-    df = pd.DataFrame(job_listings)
+if result is not None and (result["total"] or any(st.session_state.get(f"facet_{name}") for name, _, _ in FACETS) or keyword):
+    st.write(f"Found {result['total']} job listing(s).")
 
     # Add filters
     st.header("Filters")
-    col1, col2, col3, col4, col5 = st.columns(5)
-
-    # Filter by Location (Multi-select with "All" option)
-    if "LOCATION" in df.columns:
-        with col1:
-            unique_locations = ["All"] + sorted(df["LOCATION"].dropna().unique())
-            selected_locations = st.multiselect("Filter by Location", unique_locations, default=["All"])
-            if "All" not in selected_locations:
-                df = df[df["LOCATION"].isin(selected_locations)]
-
-    # Filter by Company (Multi-select with "All" option)
-    if "COMPANY" in df.columns:
-        with col2:
-            unique_companies = ["All"] + sorted(df["COMPANY"].dropna().unique())
-            selected_companies = st.multiselect("Filter by Company", unique_companies, default=["All"])
-            if "All" not in selected_companies:
-                df = df[df["COMPANY"].isin(selected_companies)]
-
-    # Filter by Search Query (Multi-select with "All" option)
-    if "SEARCH_QUERY" in df.columns:
-        with col3:
-            unique_queries = ["All"] + sorted(df["SEARCH_QUERY"].dropna().unique())
-            selected_queries = st.multiselect("Filter by Search Query", unique_queries, default=["All"])
-            if "All" not in selected_queries:
-                df = df[df["SEARCH_QUERY"].isin(selected_queries)]
-
-    # Filter by Date Range (Multi-select for individual dates with "All" option)
-    if "POSTED_DATE" in df.columns:
-        with col4:
-            df["POSTED_DATE"] = pd.to_datetime(df["POSTED_DATE"], errors="coerce")
-            unique_dates = ["All"] + sorted(df["POSTED_DATE"].dropna().astype(str).unique())
-            selected_dates = st.multiselect("Filter by Posted Dates", unique_dates, default=["All"])
-            if "All" not in selected_dates:
-                selected_dates = pd.to_datetime(selected_dates)
-                df = df[df["POSTED_DATE"].isin(selected_dates)]
+    columns = st.columns(5)
+    for column, (name, field, label) in zip(columns, FACETS):
+        with column:
+            options = [facet["value"] for facet in result["facets"][field]]
+            if field == "POSTED_DATE":
+                options = sorted(options, reverse=True)
+            st.multiselect(label, options, key=f"facet_{name}", on_change=reset_page)
 
     # Keyword Search
-    with col5:
-        search_query = st.text_input("Search by Keyword", "")
-        if search_query:
-            df = df[
-                df["TITLE"].str.contains(search_query, case=False, na=False)
-                | df["DESCRIPTION"].str.contains(search_query, case=False, na=False)
-            ]
+    with columns[4]:
+        st.text_input("Search by Keyword", key="facet_keyword", on_change=reset_page)
 
     # Display filtered DataFrame
     st.subheader("Filtered Job Listings Data")
+    pages = max((result["total"] + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    if st.session_state.get("facet_page", 1) > pages:
+        st.session_state["facet_page"] = pages
+    st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="facet_page")
+    df = pd.DataFrame(result["rows"])
     st.dataframe(df)
 
     # ----- Analytics Section -----
     st.markdown("---")
     st.header("Analytics")
 
+    # Aggregates are computed by the API under the same filters; only the counts come back
+    selections = {name: st.session_state.get(f"facet_{name}", []) for name, _, _ in FACETS}
+    try:
+        analytics = fetch_analytics("listings", st.session_state['access_token'], selections, keyword=keyword)
+        highlight_terms = fetch_highlight_terms("listings", st.session_state['access_token'], selections, keyword=keyword)
+    except Exception as e:
+        st.error(f"Error fetching listing analytics: {str(e)}")
+        st.stop()
+
+    def counts_series(items, key="value"):
+        return pd.Series({item[key]: item["count"] for item in items}, name="count", dtype="int64")
+
     # Total Job Listings
     st.subheader("📊 Total Job Listings")
-    st.write(f"Total job listings after filtering: **{len(df)}**")
+    st.write(f"Total job listings after filtering: **{analytics['total']}**")
 
     # Jobs by Location
-    if "LOCATION" in df.columns:
-        st.subheader("📍 Jobs by Location")
-        location_counts = df["LOCATION"].value_counts().head(10)
-        st.bar_chart(location_counts)
-        st.write(location_counts)
+    st.subheader("📍 Jobs by Location")
+    location_counts = counts_series(analytics["top"]["LOCATION"])
+    st.bar_chart(location_counts)
+    st.write(location_counts)
 
     # Jobs by Company
-    if "COMPANY" in df.columns:
-        st.subheader("🏢 Jobs by Company")
-        company_counts = df["COMPANY"].value_counts().head(10)
-        st.bar_chart(company_counts)
-        st.write(company_counts)
+    st.subheader("🏢 Jobs by Company")
+    company_counts = counts_series(analytics["top"]["COMPANY"])
+    st.bar_chart(company_counts)
+    st.write(company_counts)
 
     # Posted Date Analysis
-    if "POSTED_DATE" in df.columns:
-        st.subheader("🕒 Jobs Posted Over Time")
-        posted_date_counts = df["POSTED_DATE"].value_counts().sort_index()
-        st.line_chart(posted_date_counts)
-        st.write(posted_date_counts)
+    st.subheader("🕒 Jobs Posted Over Time")
+    posted_date_counts = counts_series(analytics["posted_dates"], key="date")
+    st.line_chart(posted_date_counts)
+    st.write(posted_date_counts)
 
     # Top Job Titles
-    if "TITLE" in df.columns:
-        st.subheader("💼 Most Common Job Titles")
-        title_counts = df["TITLE"].value_counts().head(10)
-        st.bar_chart(title_counts)
-        st.write(title_counts)
-
-    # Skills and Highlights Analysis
-    if "JOB_HIGHLIGHTS" in df.columns:
+    st.subheader("💼 Most Common Job Titles")
+    title_counts = counts_series(analytics["top"]["TITLE"])
+    st.bar_chart(title_counts)
+    st.write(title_counts)
+
+    # Skills and Highlights Analysis (word counts over every filtered listing, from the API)
+    if highlight_terms:
         st.subheader("📖 Key Skills and Highlights (Word Cloud)")
-        highlights_text = " ".join(df["JOB_HIGHLIGHTS"].dropna())
-        wordcloud = WordCloud(width=800, height=400, background_color="white").generate(highlights_text)
+        wordcloud = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(highlight_terms)
         plt.figure(figsize=(10, 5))
         plt.imshow(wordcloud, interpolation="bilinear")
         plt.axis("off")
         st.pyplot(plt)
 
     # Salary Range (if available)
-    if "DESCRIPTION" in df.columns:
-        st.subheader("💵 Salary Insights")
-        salary_keywords = df["DESCRIPTION"].str.extract(r"(\$[\d,]+)").dropna()
-        if not salary_keywords.empty:
-            st.write(f"Found {len(salary_keywords)} salary mentions in job descriptions.")
-            salary_table = pd.DataFrame({
-                "Job Title": df.loc[salary_keywords.index, "TITLE"],
-                "Company": df.loc[salary_keywords.index, "COMPANY"],
-                "Location": df.loc[salary_keywords.index, "LOCATION"],
-                "Salary": salary_keywords[0]
-            })
-            st.write(salary_table)
-        else:
-            st.write("No salary information found.")
-
-    # Download Analytics Data
+    st.subheader("💵 Salary Insights")
+    salary = analytics["salary"]
+    if salary["mentions"]:
+        st.write(f"Found {salary['mentions']} salary mentions in job descriptions.")
+        st.write(pd.Series({key: salary[key] for key in ("min", "p25", "median", "p75", "max")}, name="Salary ($)"))
+        st.write(counts_series(salary["top"]).rename("Most mentioned amounts"))
+    else:
+        st.write("No salary information found.")
+
+    # Download Analytics Data: every filtered listing, streamed from the API only when requested
     st.subheader("📥 Download Filtered Data")
-    st.download_button(
-        label="Download Filtered Job Listings as CSV",
-        data=df.to_csv(index=False),
-        file_name="filtered_job_listings.csv",
-        mime="text/csv"
-    )
+    export_key = (repr(selections), keyword)
+    if st.button(f"Prepare CSV of All {result['total']} Filtered Job Listings"):
+        with st.spinner("Fetching filtered job listings..."):
+            try:
+                rows = list(stream_job_facets(st.session_state['access_token'], selections, keyword=keyword))
+                st.session_state["facet_export"] = (export_key, pd.DataFrame(rows).to_csv(index=False))
+            except Exception as e:
+                st.error(f"Error exporting job listings: {str(e)}")
+    export = st.session_state.get("facet_export")
+    if export and export[0] == export_key:
+        st.download_button(
+            label="Download Filtered Job Listings as CSV",
+            data=export[1],
+            file_name="filtered_job_listings.csv",
+            mime="text/csv"
+        )
 else:
     st.info("No job listings found.")
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import json
 
 API_BASE_URL = os.getenv("API_URL", "http://localhost:8000")
 
@@ -35,10 +36,12 @@ def get_current_user(token):
         return response.json()
     return None  # Return None if not successful
 
-def search_jobs(query, token):
+def search_jobs(query, token, limit=20, cursor=None, mode="filter"):
     url = f"{API_BASE_URL}/search/jobs"
     headers = {'Authorization': f'Bearer {token}'}
-    params = {'query': query}
+    params = {'query': query, 'limit': limit, 'mode': mode}
+    if cursor:
+        params['cursor'] = cursor
     response = requests.get(url, headers=headers, params=params)
     return response
 
@@ -65,6 +68,13 @@ def get_saved_jobs(token):
     response = requests.get(url, headers=headers)
     return response
 
+def get_job_details(job_id, token, source="listings"):
+    """Fetch every column of one job; list endpoints only return the summary columns."""
+    url = f"{API_BASE_URL}/jobs/{job_id}"
+    headers = {'Authorization': f'Bearer {token}'}
+    response = requests.get(url, headers=headers, params={'source': source})
+    return response
+
 def update_job_status(job_id, new_status, token):
     url = f"{API_BASE_URL}/jobs/update-status"
     headers = {'Authorization': f'Bearer {token}'}
@@ -100,6 +110,45 @@ def chat_feedback(document_type, question, description, highlights, token):
     response = requests.post(url, headers=headers, data=data)
     return response
 
+def iter_sse_text(response):
+    """Yield the text of each "token" event in a server-sent event stream; raise on an "error" event."""
+    event = None
+    for line in response.iter_lines():
+        line = line.decode("utf-8")
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):])
+            if event == "token":
+                yield data["text"]
+            elif event == "error":
+                raise Exception(data.get("detail", "Unknown error"))
+
+def stream_feedback(job_id, description, highlights, token):
+    """Yield /feedback text as it is generated, for st.write_stream."""
+    url = f"{API_BASE_URL}/feedback/stream"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"job_id": job_id, "description": description, "highlights": highlights}
+    with requests.post(url, headers=headers, params=params, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception(response.json().get('detail', 'Unknown error'))
+        yield from iter_sse_text(response)
+
+def stream_chat_feedback(document_type, question, description, highlights, token):
+    """Yield /chat-feedback text as it is generated, for st.write_stream."""
+    url = f"{API_BASE_URL}/chat-feedback/stream"
+    headers = {"Authorization": f"Bearer {token}"}
+    data = {
+        "document_type": document_type,
+        "question": question,
+        "description": description,
+        "highlights": highlights,
+    }
+    with requests.post(url, headers=headers, data=data, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception(response.json().get('detail', 'Unknown error'))
+        yield from iter_sse_text(response)
+
 def save_feedback(job_id, feedback, token):
     url = f"{API_BASE_URL}/jobs/save-feedback"
     headers = {"Authorization": f"Bearer {token}"}
@@ -113,12 +162,87 @@ def get_job_listings(token):
     response = requests.get(url, headers=headers)
     return response
 
-def fetch_user_jobs(token):
+def stream_job_listings(token, fields="summary"):
+    """Yield job listings one at a time from the NDJSON listings stream."""
+    url = f"{API_BASE_URL}/jobs/listings"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"format": "ndjson", "fields": fields}
+    with requests.get(url, headers=headers, params=params, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch job listings: {response.json().get('detail', 'Unknown error')}")
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+def fetch_job_facets(token, selections=None, keyword=None, limit=20, offset=0, facet_limit=100, fields="summary"):
+    """
+    One page of listings matching the facet `selections` ({"location": [...], "company": [...],
+    "search_query": [...], "posted_date": [...]}) plus the value counts of every facet.
+    """
+    url = f"{API_BASE_URL}/jobs/facets"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"limit": limit, "offset": offset, "facet_limit": facet_limit, "fields": fields}
+    params.update({name: values for name, values in (selections or {}).items() if values})
+    if keyword:
+        params["keyword"] = keyword
+    response = requests.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch job facets: {response.json().get('detail', 'Unknown error')}")
+    return response.json()
+
+def stream_job_facets(token, selections=None, keyword=None, fields="all"):
+    """Yield every listing matching the facet `selections` and `keyword`, for exports."""
+    url = f"{API_BASE_URL}/jobs/facets"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"format": "ndjson", "fields": fields}
+    params.update({name: values for name, values in (selections or {}).items() if values})
+    if keyword:
+        params["keyword"] = keyword
+    with requests.get(url, headers=headers, params=params, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch job listings: {response.json().get('detail', 'Unknown error')}")
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+def fetch_highlight_terms(kind, token, selections=None, keyword=None, top_n=200):
+    """
+    {word: count} of the JOB_HIGHLIGHTS words from /analytics/listings/terms or
+    /analytics/user-jobs/terms (`kind`) over every row matching `selections`.
+    """
+    url = f"{API_BASE_URL}/analytics/{kind}/terms"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"top_n": top_n}
+    params.update({name: values for name, values in (selections or {}).items() if values})
+    if keyword:
+        params["keyword"] = keyword
+    response = requests.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch highlight terms: {response.json().get('detail', 'Unknown error')}")
+    return {term["value"]: term["count"] for term in response.json()["terms"]}
+
+def fetch_analytics(kind, token, selections=None, keyword=None, top_n=10):
+    """
+    Aggregates from /analytics/listings or /analytics/user-jobs (`kind`): total, top-N
+    counts, posted-date series and salary stats under the filter `selections`.
+    """
+    url = f"{API_BASE_URL}/analytics/{kind}"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"top_n": top_n}
+    params.update({name: values for name, values in (selections or {}).items() if values})
+    if keyword:
+        params["keyword"] = keyword
+    response = requests.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch analytics: {response.json().get('detail', 'Unknown error')}")
+    return response.json()
+
+def fetch_user_jobs(token, fields="summary"):
     url = f"{API_BASE_URL}/users/jobs"
     headers = {"Authorization": f"Bearer {token}"}
 
     try:
-        response = requests.get(url, headers=headers)
+        response = requests.get(url, headers=headers, params={"fields": fields})
         if response.status_code == 200:
             return response.json()
         else:
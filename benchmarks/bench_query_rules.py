@@ -0,0 +1,128 @@
+"""
+Agreement of the rule-based query parser with the LLM parser, and the LLM calls and
+latency it avoids.
+
+Reads benchmarks/data/query_corpus.jsonl, one {"query", "source", "parsed"} per line:
+- "source": "llm" entries were recorded from the live parser with --record and also carry
+  "model", "llm_latency_ms" and "recorded_at";
+- "source": "hand-labelled" entries are the seed queries with hand-written expected parses.
+Agreement is reported separately for each source, so numbers against recorded LLM parses
+are never mixed with numbers against hand labels. Parses are compared per JOBLISTINGS
+column on case-insensitive term sets, which is what write_sql_query turns into ILIKE
+conditions.
+
+Usage:
+    python benchmarks/bench_query_rules.py            # compare against the stored parses
+    python benchmarks/bench_query_rules.py --record   # record live LLM parses and latency for every query
+                                                      # (needs OPENAI_API_KEY and network access)
+"""
+import json
+import os
+import sys
+import time
+
+# The service reads these at import time; dummy values are enough unless --record is used
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FastAPI_Services import main as service
+from FastAPI_Services.llm_gateway import chat_messages
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "query_corpus.jsonl")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def by_column(parsed):
+    """Collapse a parsed_query into {column: {lowercased terms}} as write_sql_query would."""
+    columns = {}
+    for field, terms in parsed.items():
+        column = service.SCHEMA_TO_TABLE_MAP.get(field)
+        if column and terms:
+            columns.setdefault(column, set()).update(term.lower() for term in terms)
+    return columns
+
+
+def record(corpus):
+    """Replace every stored parse with a fresh one from the live LLM parser (same prompt and model)."""
+    if os.environ["OPENAI_API_KEY"] == "sk-benchmark":
+        sys.exit("--record needs a real OPENAI_API_KEY")
+    for entry in corpus:
+        messages = chat_messages(service.PARSER_PROMPT.format_messages(natural_query=entry["query"]))
+        start = time.perf_counter()
+        response = service.llm_gateway.complete(messages, model=service.PARSER_MODEL, temperature=0)
+        latency_ms = round((time.perf_counter() - start) * 1e3, 1)
+        content = response.content.strip("```python").strip("```").strip()
+        entry.update({
+            "source": "llm",
+            "parsed": service.ast.literal_eval(content),
+            "model": response.model,
+            "llm_latency_ms": latency_ms,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        })
+        print(f"Recorded {entry['query']!r} in {latency_ms} ms")
+    with open(CORPUS_PATH, "w", encoding="utf-8") as f:
+        for entry in corpus:
+            f.write(json.dumps(entry) + "\n")
+
+
+def main():
+    corpus = load_corpus()
+    if "--record" in sys.argv:
+        record(corpus)
+
+    parser = service.rule_query_parser
+    rule_seconds = 0.0
+    handled = {}
+    agreed = {}
+    totals = {}
+    avoided_ms = []
+    disagreements = []
+    for entry in corpus:
+        source = entry["source"]
+        totals[source] = totals.get(source, 0) + 1
+        start = time.perf_counter()
+        parsed = parser.parse(entry["query"])
+        rule_seconds += time.perf_counter() - start
+        if parsed is None:
+            continue
+        handled[source] = handled.get(source, 0) + 1
+        # Every query the rules handle is one parser LLM call that never happens
+        if "llm_latency_ms" in entry:
+            avoided_ms.append(entry["llm_latency_ms"])
+        if by_column(parsed) == by_column(entry["parsed"]):
+            agreed[source] = agreed.get(source, 0) + 1
+        else:
+            disagreements.append((source, entry["query"], parsed, entry["parsed"]))
+
+    total = len(corpus)
+    all_handled = sum(handled.values())
+    print(f"Queries:                 {total} ({', '.join(f'{n} {source}' for source, n in sorted(totals.items()))})")
+    print(f"Handled by rules:        {all_handled} ({all_handled / total:.0%}); "
+          f"LLM calls avoided: {all_handled} of {total}")
+    print(f"Rule parse latency:      {rule_seconds / total * 1e6:.1f} us/query")
+    for source in sorted(totals):
+        n = handled.get(source, 0)
+        print(f"Agreement vs {source + ':':15} {agreed.get(source, 0)}/{n} handled ({agreed.get(source, 0) / max(n, 1):.0%})")
+    if "llm" not in totals:
+        print("No recorded LLM parses: run with --record (OPENAI_API_KEY and network access) to measure "
+              "agreement with the LLM parser and the latency avoided")
+    if avoided_ms:
+        recorded = sum(1 for entry in corpus if "llm_latency_ms" in entry)
+        recorded_ms = [entry["llm_latency_ms"] for entry in corpus if "llm_latency_ms" in entry]
+        print(f"LLM latency avoided:     {sum(avoided_ms) / 1e3:.1f} s over {len(avoided_ms)} handled queries "
+              f"(mean {sum(avoided_ms) / len(avoided_ms):.0f} ms per call; "
+              f"{sum(avoided_ms) / recorded:.0f} ms averaged over all {recorded} recorded queries, "
+              f"of {sum(recorded_ms) / recorded:.0f} ms mean LLM parse)")
+    for source, query, rules, expected in disagreements:
+        print(f"  disagree ({source}): {query!r}\n    rules: {rules}\n    {source}: {expected}")
+
+
+if __name__ == "__main__":
+    main()
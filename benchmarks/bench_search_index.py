@@ -0,0 +1,114 @@
+"""
+Query latency of the BM25 inverted index against the ILIKE-style scan at 10k, 100k and 1M postings.
+
+Listings are synthetic (seeded, so runs are repeatable) but shaped like JOBLISTINGS rows. The
+ILIKE path is ListingsSnapshot.search(), the in-memory equivalent of the WHERE ... ILIKE
+'%term%' query write_sql_query generates: a full scan with substring tests per row. Snowflake
+runs the same full scan plus network and warehouse overhead, so these numbers are a lower
+bound for the SQL path. Both paths run the parsed queries below; first pages only (with the
+match count), which is the expensive case for both.
+
+Usage: python benchmarks/bench_search_index.py [--sizes 10000,100000,1000000] [--queries 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FastAPI_Services.listings_snapshot import ListingsSnapshot
+from FastAPI_Services.search_index import BM25Index
+
+COLUMNS = ["JOB_ID", "SEARCH_QUERY", "TITLE", "COMPANY", "LOCATION", "DESCRIPTION",
+           "POSTED_AT", "POSTED_DATE", "APPLY_LINKS", "JOB_HIGHLIGHTS"]
+ROLES = ["data engineer", "data scientist", "data analyst", "software engineer", "machine learning engineer",
+         "devops engineer", "product manager", "business analyst", "cloud architect", "frontend developer"]
+SENIORITY = ["", "Senior ", "Junior ", "Lead ", "Staff "]
+COMPANIES = [f"{name} {suffix}" for name in ("Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli",
+                                              "Vandelay", "Soylent", "Cyberdyne")
+             for suffix in ("Inc", "Labs", "Systems", "Group")]
+CITIES = ["Boston, MA", "Austin, TX", "Seattle, WA", "New York, NY", "Chicago, IL", "Denver, CO",
+          "San Francisco, CA", "Atlanta, GA", "Remote", "Raleigh, NC"]
+SKILLS = ["python", "sql", "spark", "airflow", "snowflake", "aws", "azure", "gcp", "kubernetes", "docker",
+          "terraform", "pandas", "tableau", "react", "java", "scala", "go", "pytorch", "tensorflow", "dbt",
+          "kafka", "excel", "linux", "git", "fastapi", "streamlit", "etl", "ml", "statistics", "agile"]
+FILLER = ("build maintain design deliver collaborate team cross functional stakeholders pipelines platform "
+          "services customers product quality scalable reliable data systems experience years degree "
+          "communication ownership analytics reporting models infrastructure automation testing").split()
+
+QUERIES = [
+    {"SEARCH_QUERY": ["data engineer", "big data engineer"], "LOCATION": ["Boston"]},
+    {"SEARCH_QUERY": ["data scientist"]},
+    {"TITLE": ["machine learning"], "LOCATION": ["Seattle"]},
+    {"SEARCH_QUERY": ["devops engineer", "site reliability engineer"], "COMPANY": ["Acme"]},
+    {"DESCRIPTION": ["kubernetes"], "LOCATION": ["Remote"]},
+    {"SEARCH_QUERY": ["product manager"], "LOCATION": ["New York"]},
+]
+
+
+def synthetic_listings(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        role = rng.choice(ROLES)
+        skills = rng.sample(SKILLS, 6)
+        description = " ".join(rng.choice(FILLER) for _ in range(30)) + " " + " ".join(skills)
+        posted_date = f"2024-{rng.randint(9, 11):02d}-{rng.randint(1, 28):02d}"
+        rows.append((
+            f"job-{i:07d}", role, rng.choice(SENIORITY) + role.title(), rng.choice(COMPANIES), rng.choice(CITIES),
+            description, f"{rng.randint(1, 30)} days ago", posted_date, f"https://jobs.example.com/{i}",
+            "Qualifications: " + ", ".join(skills[:3]),
+        ))
+    return rows
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e3, samples[int(0.95 * (len(samples) - 1))] * 1e3
+
+
+def run_size(n, queries):
+    start = time.perf_counter()
+    snapshot = ListingsSnapshot("bench", COLUMNS, synthetic_listings(n), ["SEARCH_QUERY", "TITLE", "COMPANY",
+                                                                          "LOCATION", "DESCRIPTION", "POSTED_DATE"])
+    snapshot_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index = BM25Index.build(snapshot.rows)
+    build_seconds = time.perf_counter() - start
+
+    ilike, bm25 = [], []
+    for i in range(queries):
+        filters = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        snapshot.search(filters, limit=20, count=True)
+        ilike.append(time.perf_counter() - start)
+
+        text = " ".join(term for column in ("SEARCH_QUERY", "TITLE", "DESCRIPTION") for term in filters.get(column, []))
+        field_filters = {column: terms for column, terms in filters.items() if column in ("COMPANY", "LOCATION")}
+        start = time.perf_counter()
+        index.search(text, 21, filters=field_filters)
+        bm25.append(time.perf_counter() - start)
+
+    stats = index.stats()
+    print(f"{n:>9,} postings | snapshot {snapshot_seconds:6.1f}s | index build {build_seconds:6.1f}s, "
+          f"{stats['terms']:,} terms, {stats['bytes'] / 2**20:.0f} MiB")
+    for name, samples in (("ILIKE scan", ilike), ("BM25 index", bm25)):
+        p50, p95 = percentiles(samples)
+        print(f"    {name:<11} p50 {p50:9.2f} ms   p95 {p95:9.2f} ms")
+    print(f"    speed-up    {statistics.median(ilike) / statistics.median(bm25):.0f}x at p50")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    for size in (int(s) for s in args.sizes.split(",")):
+        run_size(size, args.queries)
+
+
+if __name__ == "__main__":
+    main()
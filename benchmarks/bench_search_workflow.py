@@ -0,0 +1,44 @@
+"""
+Per-request cost of building the /search/jobs LangGraph workflow.
+
+Compares the old behaviour (create_workflow() on every request) with the shared
+graph returned by get_search_workflow(). No LLM or Snowflake calls are made.
+
+Usage: python benchmarks/bench_search_workflow.py [iterations]
+"""
+import os
+import sys
+import time
+
+# The service reads these at import time; dummy values are enough for this benchmark
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FastAPI_Services.main import create_workflow, get_search_workflow
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    get_search_workflow()  # First compile happens at startup in the service
+    before = time_per_call(create_workflow, iterations)
+    after = time_per_call(get_search_workflow, iterations)
+
+    print(f"Iterations: {iterations}")
+    print(f"Compile per request (before): {before * 1e3:.3f} ms")
+    print(f"Shared graph lookup (after):  {after * 1e6:.3f} us")
+    print(f"Saved per request:            {(before - after) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Query latency of semantic (matrix-vector + argpartition) and hybrid search at 10k, 100k and 1M listings.
+
+Uses the synthetic listings from bench_search_index.py. Reported per query: embedding the
+query, the full matrix-vector product, and end-to-end search (including top-k and, for the
+filtered case, the BM25 company/location filter). Single process, single thread.
+
+Usage: python benchmarks/bench_vector_index.py [--sizes 10000,100000,1000000] [--queries 30] [--dim 128]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "FastAPI_Services"))
+
+from bench_search_index import COLUMNS, synthetic_listings
+from listings_snapshot import ListingsSnapshot
+from search_index import BM25Index
+from vector_index import VectorIndex, hybrid_search
+
+QUERIES = [
+    ("ML platform engineer", None),
+    ("machine learning engineer", {"LOCATION": ["Seattle"]}),
+    ("data pipelines spark airflow", None),
+    ("site reliability kubernetes", {"COMPANY": ["Acme"]}),
+    ("product manager analytics", {"LOCATION": ["New York"]}),
+]
+
+
+def median_ms(samples):
+    return statistics.median(samples) * 1e3
+
+
+def run_size(n, queries, dim):
+    snapshot = ListingsSnapshot("bench", COLUMNS, synthetic_listings(n), [])
+    start = time.perf_counter()
+    vectors = VectorIndex.build(snapshot.rows, dim=dim)
+    vector_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    keywords = BM25Index.build(snapshot.rows)
+    keyword_seconds = time.perf_counter() - start
+
+    timings = {"embed query": [], "matrix-vector": [], "semantic top-20": [], "semantic + filter": [],
+               "hybrid top-20": []}
+    for i in range(queries):
+        text, filters = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        query = vectors.embedder.embed(text)
+        timings["embed query"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        vectors.matrix @ query
+        timings["matrix-vector"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        vectors.search(text, 20)
+        timings["semantic top-20"].append(time.perf_counter() - start)
+
+        restrict = (lambda candidates: keywords.restrict(candidates, filters)) if filters else None
+        start = time.perf_counter()
+        vectors.search(text, 20, restrict=restrict)
+        timings["semantic + filter"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        hybrid_search(keywords, vectors, text, 20, restrict=restrict)
+        timings["hybrid top-20"].append(time.perf_counter() - start)
+
+    stats = vectors.stats()
+    print(f"{n:>9,} listings | vectors {vector_seconds:6.1f}s ({stats['bytes'] / 2**20:.0f} MiB {stats['dtype']} "
+          f"x{stats['dim']}) | BM25 {keyword_seconds:6.1f}s")
+    for name, samples in timings.items():
+        print(f"    {name:<18} p50 {median_ms(samples):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--dim", type=int, default=128)
+    args = parser.parse_args()
+    for size in (int(s) for s in args.sizes.split(",")):
+        run_size(size, args.queries, args.dim)
+
+
+if __name__ == "__main__":
+    main()
@@ -104,4 +104,593 @@ def test_register_missing_files(mock_dependencies):
     }
     
     response = client.post("/register", data=form_data)
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def test_current_user_profile_is_cached(mock_env):
+    from FastAPI_Services.main import create_access_token, user_profile_cache, invalidate_cached_user
+    user_profile_cache.clear()
+    row = (str(uuid4()), "cached@example.com", None, None, datetime.now(), None)
+    token = create_access_token({"sub": "cacheduser"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("FastAPI_Services.main.fetch_user_profile", return_value=row) as mock_fetch:
+        assert client.get("/users/me", headers=headers).status_code == 200
+        assert client.get("/users/me", headers=headers).status_code == 200
+        assert mock_fetch.call_count == 1
+
+        invalidate_cached_user("cacheduser")
+        assert client.get("/users/me", headers=headers).status_code == 200
+        assert mock_fetch.call_count == 2
+
+
+def test_job_listings_streams_ndjson(mock_env):
+    import json
+    from FastAPI_Services.main import get_current_user
+
+    mock_cursor = MagicMock()
+    mock_cursor.description = [("JOB_ID",), ("TITLE",)]
+    mock_cursor.fetchmany.side_effect = [[("1", "Data Engineer"), ("2", "Data Analyst")], [("3", "SRE")], []]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.get_snowflake_joblistings_connection", return_value=mock_conn):
+            response = client.get("/jobs/listings", params={"format": "ndjson"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["JOB_ID"] for row in rows] == ["1", "2", "3"]
+    mock_cursor.fetchall.assert_not_called()
+    mock_conn.close.assert_called_once()
+
+
+def test_job_listings_default_to_summary_projection(mock_env):
+    from FastAPI_Services.main import get_current_user
+
+    mock_cursor = MagicMock()
+    mock_cursor.description = [("JOB_ID",), ("TITLE",)]
+    mock_cursor.fetchall.return_value = [("1", "Data Engineer")]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.get_snowflake_joblistings_connection", return_value=mock_conn):
+            response = client.get("/jobs/listings")
+            bad_fields = client.get("/jobs/listings", params={"fields": "title,salary"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    executed_sql = mock_cursor.execute.call_args[0][0]
+    assert "DESCRIPTION" not in executed_sql and "JOB_HIGHLIGHTS" not in executed_sql
+    assert "SELECT *" not in executed_sql
+    assert bad_fields.status_code == 400
+    assert "SALARY" in bad_fields.json()["detail"]
+
+
+def test_job_details_returns_full_row_or_404(mock_env):
+    from FastAPI_Services.main import get_current_user
+
+    mock_cursor = MagicMock()
+    mock_cursor.description = [("JOB_ID",), ("DESCRIPTION",)]
+    mock_cursor.fetchone.side_effect = [("1", "Build pipelines"), None]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.get_snowflake_joblistings_connection", return_value=mock_conn):
+            found = client.get("/jobs/1")
+            missing = client.get("/jobs/2")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert found.status_code == 200
+    assert found.json() == {"JOB_ID": "1", "DESCRIPTION": "Build pipelines"}
+    assert mock_cursor.execute.call_args_list[0][0][1] == {"job_id": "1"}
+    assert missing.status_code == 404
+
+
+def test_job_facets_filter_with_bitmaps_and_count_other_facets(mock_env):
+    import json
+    from FastAPI_Services.main import get_current_user
+    from FastAPI_Services.facet_index import FacetIndex
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+
+    columns = ["JOB_ID", "TITLE", "COMPANY", "LOCATION", "SEARCH_QUERY", "POSTED_DATE"]
+    rows = [("1", "Data Engineer", "Acme", "Boston, MA", "data engineer", "2024-11-19"),
+            ("2", "Data Engineer", "Globex", "Boston, MA", "data engineer", "2024-11-18"),
+            ("3", "Data Scientist", "Acme", "Austin, TX", "data scientist", "2024-11-18"),
+            ("4", "Data Analyst", "Acme", None, "data analyst", None)]
+    store = ListingsSnapshotStore(lambda: "v1", lambda: (columns, rows), [],
+                                  index_builders={"facets": lambda snapshot: FacetIndex.build(snapshot.rows)})
+    store.refresh()
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.listings_snapshot", store):
+            response = client.get("/jobs/facets", params={"company": "Acme", "location": ["Boston, MA", "Austin, TX"],
+                                                          "fields": "JOB_ID"})
+            unfiltered = client.get("/jobs/facets", params={"limit": 1, "facet_limit": 1})
+            exported = client.get("/jobs/facets", params={"company": "Acme", "limit": 1, "format": "ndjson",
+                                                          "fields": "JOB_ID"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 2 and body["rows"] == [{"JOB_ID": "1"}, {"JOB_ID": "3"}]
+    # Each facet is counted under the other facets' selections only
+    assert body["facets"]["COMPANY"] == [{"value": "Acme", "count": 2}, {"value": "Globex", "count": 1}]
+    assert body["facets"]["LOCATION"] == [{"value": "Austin, TX", "count": 1}, {"value": "Boston, MA", "count": 1}]
+    assert body["facets"]["POSTED_DATE"] == [{"value": "2024-11-18", "count": 1}, {"value": "2024-11-19", "count": 1}]
+
+    assert unfiltered.json()["total"] == 4 and len(unfiltered.json()["rows"]) == 1
+    assert unfiltered.json()["facets"]["COMPANY"] == [{"value": "Acme", "count": 3}]
+    # The export streams every match, not one page
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in exported.text.splitlines()] == [{"JOB_ID": "1"}, {"JOB_ID": "3"}, {"JOB_ID": "4"}]
+
+
+def test_listings_analytics_from_snapshot_and_user_jobs_from_sql(mock_env):
+    from snowflake.connector import ProgrammingError
+    from FastAPI_Services.main import get_current_user
+    from FastAPI_Services.analytics import HighlightTermIndex, SalaryIndex
+    from FastAPI_Services.facet_index import FacetIndex
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+
+    columns = ["JOB_ID", "TITLE", "COMPANY", "LOCATION", "SEARCH_QUERY", "POSTED_DATE", "DESCRIPTION", "JOB_HIGHLIGHTS"]
+    rows = [("1", "Data Engineer", "Acme", "Boston, MA", "data engineer", "2024-11-19", "Pays $120,000 a year",
+             "Python and SQL pipelines"),
+            ("2", "Data Engineer", "Globex", "Boston, MA", "data engineer", "2024-11-18", "Up to $100,000",
+             "Python, Spark"),
+            ("3", "Data Scientist", "Acme", "Austin, TX", "data scientist", "2024-11-18", "No salary listed",
+             "R and statistics")]
+    store = ListingsSnapshotStore(lambda: "v1", lambda: (columns, rows), [], index_builders={
+        "facets": lambda snapshot: FacetIndex.build(snapshot.rows, fields=("LOCATION", "COMPANY", "SEARCH_QUERY",
+                                                                            "POSTED_DATE", "TITLE")),
+        "salaries": lambda snapshot: SalaryIndex.build(snapshot.rows),
+        "highlight_terms": lambda snapshot: HighlightTermIndex.build(snapshot.rows),
+    })
+    store.refresh()
+
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.side_effect = [(2,), (0, None, None, None, None, None)]
+    mock_cursor.fetchall.side_effect = [[("Boston, MA", 2)], [("Acme", 2)], [("Data Engineer", 2)],
+                                        [("Applied", 2)], [("2024-11-18", 2)]]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    # A user who has never saved a job has no table yet
+    missing_conn = MagicMock()
+    missing_conn.cursor.return_value.execute.side_effect = ProgrammingError(
+        "Object 'USER_U_1' does not exist or not authorized.", errno=2003
+    )
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock(id="u-1")
+    try:
+        with patch("FastAPI_Services.main.listings_snapshot", store):
+            listings = client.get("/analytics/listings", params={"location": "Boston, MA"})
+            listing_terms = client.get("/analytics/listings/terms", params={"location": "Boston, MA"})
+        with patch("FastAPI_Services.main.get_user_results_db_connection", return_value=mock_conn):
+            user_jobs = client.get("/analytics/user-jobs", params={"status": ["Applied", "Saved"]})
+        with patch("FastAPI_Services.main.get_user_results_db_connection", return_value=missing_conn):
+            no_saved_jobs = client.get("/analytics/user-jobs")
+            no_saved_terms = client.get("/analytics/user-jobs/terms")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert listings.status_code == 200
+    body = listings.json()
+    assert body["source"] == "snapshot" and body["total"] == 2
+    assert body["top"]["TITLE"] == [{"value": "Data Engineer", "count": 2}]
+    assert body["posted_dates"] == [{"date": "2024-11-18", "count": 1}, {"date": "2024-11-19", "count": 1}]
+    assert body["salary"]["mentions"] == 2 and body["salary"]["median"] == 110000.0
+    # Word cloud counts cover every filtered listing, stopwords dropped, ties alphabetical
+    assert listing_terms.json() == {"terms": [{"value": "python", "count": 2}, {"value": "pipelines", "count": 1},
+                                              {"value": "spark", "count": 1}, {"value": "sql", "count": 1}],
+                                    "source": "snapshot"}
+
+    assert user_jobs.status_code == 200
+    body = user_jobs.json()
+    assert body["source"] == "snowflake" and body["total"] == 2
+    assert body["top"]["STATUS"] == [{"value": "Applied", "count": 2}] and body["salary"]["mentions"] == 0
+    sql, params = mock_cursor.execute.call_args_list[0][0]
+    assert sql == "SELECT COUNT(*) FROM user_u_1 WHERE STATUS IN (%(status_0)s, %(status_1)s)"
+    assert params == {"status_0": "Applied", "status_1": "Saved"}
+    assert all("GROUP BY" in call[0][0] for call in mock_cursor.execute.call_args_list[1:6])
+
+    assert no_saved_jobs.status_code == 200
+    body = no_saved_jobs.json()
+    assert body["total"] == 0 and body["posted_dates"] == [] and body["salary"]["mentions"] == 0
+    assert all(values == [] for values in body["top"].values()) and "STATUS" in body["top"]
+    assert no_saved_terms.status_code == 200 and no_saved_terms.json()["terms"] == []
+    assert missing_conn.close.call_count == 2
+
+
+def test_keyword_matches_the_same_rows_in_facets_snapshot_analytics_and_sql(mock_env):
+    from FastAPI_Services.main import analytics_filter_clause, get_current_user
+    from FastAPI_Services.analytics import SalaryIndex
+    from FastAPI_Services.facet_index import FacetIndex
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+
+    columns = ["JOB_ID", "TITLE", "COMPANY", "LOCATION", "SEARCH_QUERY", "POSTED_DATE", "DESCRIPTION"]
+    rows = [("1", "Data Engineer", "Acme", "Boston, MA", "data engineer", "2024-11-19", "Spark pipelines"),
+            ("2", "Engineering Manager", "Globex", "Boston, MA", "manager", "2024-11-18", "Lead a team"),
+            ("3", "Data Scientist", "Engine Co", "Austin, TX", "data scientist", "2024-11-18", None)]
+    store = ListingsSnapshotStore(lambda: "v1", lambda: (columns, rows), ["TITLE", "DESCRIPTION"], index_builders={
+        "facets": lambda snapshot: FacetIndex.build(snapshot.rows, fields=("LOCATION", "COMPANY", "SEARCH_QUERY",
+                                                                            "POSTED_DATE", "TITLE")),
+        "salaries": lambda snapshot: SalaryIndex.build(snapshot.rows),
+    })
+    store.refresh()
+
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.listings_snapshot", store):
+            facets = client.get("/jobs/facets", params={"keyword": "ENGINE", "fields": "JOB_ID"}).json()
+            analytics = client.get("/analytics/listings", params={"keyword": "ENGINE"}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    # A case-insensitive substring of TITLE or DESCRIPTION; COMPANY ("Engine Co") is not searched
+    assert [row["JOB_ID"] for row in facets["rows"]] == ["1", "2"]
+    assert analytics["source"] == "snapshot" and analytics["total"] == facets["total"] == 2
+    where, params = analytics_filter_clause({}, "ENGINE")
+    assert where == " WHERE (CONTAINS(LOWER(TITLE), %(keyword)s) OR CONTAINS(LOWER(DESCRIPTION), %(keyword)s))"
+    assert params == {"keyword": "engine"}
+
+
+def test_unfiltered_listings_analytics_read_materialized_aggregates(mock_env):
+    from FastAPI_Services import main
+    from FastAPI_Services.main import get_current_user
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+
+    store = ListingsSnapshotStore(lambda: "v7", lambda: (["JOB_ID"], [("1",)]), [])
+    store.refresh()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [
+        ("TOTAL", None, 3), ("LOCATION", "Boston, MA", 2), ("LOCATION", "Austin, TX", 1),
+        ("POSTED_DATE", "2024-11-19", 1), ("POSTED_DATE", "2024-11-18", 2),
+        ("SALARY", "100000", 1), ("SALARY", "120000", 1),
+    ]
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    main.listing_aggregates_cache.clear()
+    app.dependency_overrides[get_current_user] = lambda: MagicMock()
+    try:
+        with patch("FastAPI_Services.main.listings_snapshot", store), \
+                patch("FastAPI_Services.main.get_snowflake_joblistings_connection", return_value=mock_conn) as connect:
+            first = client.get("/analytics/listings")
+            second = client.get("/analytics/listings", params={"top_n": 1})
+    finally:
+        app.dependency_overrides.clear()
+        main.listing_aggregates_cache.clear()
+
+    assert connect.call_count == 1  # the second dashboard load is served from the cache
+    assert mock_cursor.execute.call_args[0][1] == {"version": "v7"}
+    body = first.json()
+    assert body["source"] == "materialized" and body["total"] == 3
+    assert body["top"]["LOCATION"] == [{"value": "Boston, MA", "count": 2}, {"value": "Austin, TX", "count": 1}]
+    assert body["posted_dates"] == [{"date": "2024-11-18", "count": 2}, {"date": "2024-11-19", "count": 1}]
+    assert body["salary"]["median"] == 110000.0
+    assert second.json()["top"]["LOCATION"] == [{"value": "Boston, MA", "count": 2}]
+
+
+def test_documents_processed_after_upload_skip_download_on_feedback(mock_dependencies, tmp_path):
+    import asyncio
+    import json
+    import fitz
+    from FastAPI_Services import main
+    from FastAPI_Services.caching import PersistentCache
+    from FastAPI_Services.main import get_current_user, UserOut
+
+    def pdf(text):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), text)
+        return doc.tobytes()
+
+    mock_cursor, mock_s3, _ = mock_dependencies
+    created_at = datetime(2024, 11, 19, 10, 0, 0)
+    mock_cursor.fetchone.side_effect = [None, (created_at,)]
+    cache = PersistentCache(str(tmp_path / "documents.sqlite3"), version="test")
+    mock_gateway = MagicMock()
+    mock_gateway.complete.return_value = MagicMock(content="Looks good")
+    resume = pdf("Jane Doe\nSkills\nPython, SQL\nExperience\nData engineer at Acme")
+
+    # Load the tokenizer (tiktoken may fetch it with requests) before requests.get is patched
+    main.count_tokens("warm up")
+    with patch("FastAPI_Services.main.document_text_cache", cache), \
+            patch("FastAPI_Services.main.llm_gateway", mock_gateway), \
+            patch("FastAPI_Services.main.schedule_document_processing") as mock_schedule, \
+            patch("FastAPI_Services.main.requests.get") as mock_get:
+        registered = client.post(
+            "/register",
+            files={"resume": ("resume.pdf", BytesIO(resume), "application/pdf"),
+                   "cover_letter": ("cover.pdf", BytesIO(pdf("Dear hiring manager")), "application/pdf")},
+            data={"email": "test@example.com", "username": "testuser", "password": "securepass123"},
+        )
+        user = UserOut(**{**registered.json(), "created_at": created_at})
+        # The upload only schedules processing; run the resume's job as the event loop would
+        assert [call.args[1] for call in mock_schedule.call_args_list] == ["resume", "cover_letter"]
+        processed = asyncio.run(main.process_uploaded_document(*mock_schedule.call_args_list[0].args))
+
+        app.dependency_overrides[get_current_user] = lambda: user
+        try:
+            responses = [
+                client.post("/chat-feedback", data={"document_type": "resume", "question": "Any gaps?",
+                                                    "description": "Data role", "highlights": "Python"})
+                for _ in range(3)
+            ]
+        finally:
+            app.dependency_overrides.clear()
+
+    assert registered.status_code == 200
+    assert processed["sections"]["skills"] == "Python, SQL"
+    assert processed["sections"]["experience"] == "Data engineer at Acme"
+    assert processed["token_count"] > 0
+    persisted = mock_s3.put_object.call_args.kwargs
+    assert persisted["Key"] == f"user-profiles/{user.id}/resume.json"
+    assert json.loads(persisted["Body"])["sections"] == processed["sections"]
+    assert all(response.status_code == 200 for response in responses)
+    mock_get.assert_not_called()
+    assert "Python, SQL" in str(mock_gateway.complete.call_args[0][0])
+    cache.close()
+
+def test_feedback_loads_documents_concurrently_and_reports_stage_timings(mock_dependencies, tmp_path):
+    import threading
+    import fitz
+    from FastAPI_Services.caching import PersistentCache
+    from FastAPI_Services.main import get_current_user, UserOut
+
+    def pdf(text):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), text)
+        return doc.tobytes()
+
+    documents = {"resume.pdf": pdf("Python data engineer"), "cover_letter.pdf": pdf("Dear hiring manager")}
+    # Each download waits for the other one, so serial downloads would fail
+    both_downloading = threading.Barrier(2, timeout=5)
+
+    def download(url, timeout):
+        both_downloading.wait()
+        return MagicMock(status_code=200, content=documents[url.rsplit("/", 1)[1]])
+
+    user = UserOut(id=uuid4(), username="testuser", email="test@example.com",
+                   resume_link="https://bucket/resume.pdf", cover_letter_link="https://bucket/cover_letter.pdf",
+                   created_at=datetime(2024, 11, 19, 10, 0, 0), updated_at=None)
+    cache = PersistentCache(str(tmp_path / "documents.sqlite3"), version="test")
+    mock_gateway = MagicMock()
+    mock_gateway.complete.return_value = MagicMock(content="Looks good")
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        with patch("FastAPI_Services.main.document_text_cache", cache), \
+                patch("FastAPI_Services.main.feedback_cache", PersistentCache(str(tmp_path / "feedback.sqlite3"), "test")), \
+                patch("FastAPI_Services.main.llm_gateway", mock_gateway), \
+                patch("FastAPI_Services.main.requests.get", side_effect=download):
+            response = client.post("/feedback", params={"job_id": "1", "description": "Data role", "highlights": "Python"})
+    finally:
+        app.dependency_overrides.clear()
+        cache.close()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["feedback"] == "Looks good"
+    assert {"documents", "resume_download", "cover_letter_process", "prompt", "llm", "total"} <= set(body["timings"])
+    assert "documents;dur=" in response.headers["Server-Timing"]
+    messages = mock_gateway.complete.call_args[0][0]
+    assert messages[0]["role"] == "system" and "{" not in messages[0]["content"]
+    assert "Dear hiring manager" in messages[1]["content"]
+    assert body["prompt_tokens"]["resume_text"]["tokens"] > 0
+
+def test_feedback_served_from_cache_until_a_document_changes(tmp_path):
+    from FastAPI_Services.caching import PersistentCache
+    from FastAPI_Services.main import get_current_user, UserOut
+
+    user = UserOut(id=uuid4(), username="testuser", email="test@example.com",
+                   resume_link="https://bucket/resume.pdf", cover_letter_link="https://bucket/cover_letter.pdf",
+                   created_at=datetime(2024, 11, 19, 10, 0, 0), updated_at=None)
+    texts = {"resume": "Python data engineer", "cover_letter": "Dear hiring manager"}
+
+    async def processed(user, document_type, timings=None):
+        return {"text": texts[document_type]}
+
+    cache = PersistentCache(str(tmp_path / "feedback.sqlite3"), version="test")
+    mock_gateway = MagicMock()
+    mock_gateway.complete.return_value = MagicMock(content="Looks good")
+    params = {"job_id": "1", "description": "Data role", "highlights": "Python"}
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        with patch("FastAPI_Services.main.feedback_cache", cache), \
+                patch("FastAPI_Services.main.get_processed_document", side_effect=processed), \
+                patch("FastAPI_Services.main.llm_gateway", mock_gateway):
+            first, repeat = (client.post("/feedback", params=params) for _ in range(2))
+            first, repeat = first.json(), repeat.json()
+            texts["resume"] = "Python and Spark data engineer"
+            replaced = client.post("/feedback", params=params).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert (first["cached"], repeat["cached"], replaced["cached"]) == (False, True, False)
+    assert repeat["feedback"] == "Looks good" and "llm" not in repeat["timings"]
+    assert mock_gateway.complete.call_count == 2
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+def test_feedback_stream_sends_tokens_as_server_sent_events(tmp_path):
+    import json
+    from FastAPI_Services.caching import PersistentCache
+    from FastAPI_Services.main import get_current_user, UserOut
+
+    user = UserOut(id=uuid4(), username="testuser", email="test@example.com",
+                   resume_link="https://bucket/resume.pdf", cover_letter_link="https://bucket/cover_letter.pdf",
+                   created_at=datetime(2024, 11, 19, 10, 0, 0), updated_at=None)
+
+    async def processed(user, document_type, timings=None):
+        return {"text": f"{document_type} text"}
+
+    def stream(messages, **params):
+        yield from ["Strong ", "match."]
+
+    def events(response):
+        parsed = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return parsed
+
+    cache = PersistentCache(str(tmp_path / "feedback.sqlite3"), version="test")
+    mock_gateway = MagicMock()
+    mock_gateway.stream.side_effect = stream
+    params = {"job_id": "1", "description": "Data role", "highlights": "Python"}
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        with patch("FastAPI_Services.main.feedback_cache", cache), \
+                patch("FastAPI_Services.main.get_processed_document", side_effect=processed), \
+                patch("FastAPI_Services.main.llm_gateway", mock_gateway):
+            streamed = client.post("/feedback/stream", params=params)
+            replayed = client.post("/feedback/stream", params=params)
+            chat = client.post("/chat-feedback/stream", data={"document_type": "resume", "question": "Gaps?",
+                                                              "description": "Data role", "highlights": "Python"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    streamed_events = events(streamed)
+    assert streamed_events[:2] == [("token", {"text": "Strong "}), ("token", {"text": "match."})]
+    assert streamed_events[2][0] == "done" and streamed_events[2][1]["cached"] is False
+    assert "first_token" in streamed_events[2][1]["timings"]
+    # The completed stream was cached, so the repeat is replayed without the LLM
+    assert events(replayed)[0] == ("token", {"text": "Strong match."})
+    assert events(replayed)[1][1]["cached"] is True
+    assert [event for event, _ in events(chat)] == ["token", "token", "done"]
+    cache.close()
+
+def test_feedback_stream_times_out_while_waiting_for_a_chunk():
+    import asyncio
+    import threading
+    import time
+    from FastAPI_Services import main
+
+    class StalledStream:
+        def __init__(self):
+            self.closed = threading.Event()
+            self.sent = False
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            if not self.sent:
+                self.sent = True
+                return "Strong "
+            # Blocks like a socket read until close() aborts it
+            self.closed.wait(5)
+            raise StopIteration
+
+        def close(self):
+            self.closed.set()
+
+    stalled = StalledStream()
+    mock_gateway = MagicMock()
+    mock_gateway.stream.return_value = stalled
+
+    async def collect():
+        return [event async for event in main.stream_llm_as_sse([], {}, time.perf_counter())]
+
+    with patch("FastAPI_Services.main.llm_gateway", mock_gateway), \
+            patch("FastAPI_Services.main.FEEDBACK_LLM_TIMEOUT", 0.3):
+        start = time.perf_counter()
+        events = asyncio.run(collect())
+    assert time.perf_counter() - start < 2
+    assert events == [main.sse_event("token", {"text": "Strong "}),
+                      main.sse_event("error", {"detail": "Timed out in the llm stage."})]
+    assert stalled.closed.is_set()
+
+def test_background_feedback_deduplicates_and_saves_result(tmp_path):
+    import asyncio
+    from fastapi import HTTPException, Response
+    from FastAPI_Services import main
+    from FastAPI_Services.caching import PersistentCache
+    from FastAPI_Services.main import UserOut
+    from FastAPI_Services.task_queue import TaskQueue
+
+    user = UserOut(id=uuid4(), username="testuser", email="test@example.com",
+                   resume_link="https://bucket/resume.pdf", cover_letter_link="https://bucket/cover_letter.pdf",
+                   created_at=datetime(2024, 11, 19, 10, 0, 0), updated_at=None)
+    texts = {"resume": "Python data engineer", "cover_letter": "Dear hiring manager"}
+    mock_gateway = MagicMock()
+    mock_gateway.complete.return_value = MagicMock(content="Looks good")
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.rowcount = 1
+    tasks = TaskQueue(str(tmp_path / "tasks.sqlite3"), workers=2)
+    params = {"job_id": "42", "description": "Data role", "highlights": "Python", "background": True}
+    # Load the tokenizer (tiktoken may fetch it with requests) before requests.get is patched
+    main.count_tokens("warm up")
+
+    async def scenario():
+        uploaded = asyncio.Event()
+
+        async def process(user_id, document_type, version, content):
+            await uploaded.wait()
+            processed = {"text": texts[document_type]}
+            main.document_text_cache.set(main.document_cache_key(user_id, document_type, version), processed)
+            return processed
+
+        # Feedback requested right after an upload waits for the upload's own processing jobs
+        with patch("FastAPI_Services.main.process_uploaded_document", side_effect=process):
+            for document_type in texts:
+                main.schedule_document_processing(user.id, document_type, main.profile_version(user.created_at, None), b"")
+            first = await main.generate_feedback(**params, response=Response(), current_user=user)
+            repeat = await main.generate_feedback(**params, response=Response(), current_user=user)
+            reuploaded = await main.generate_feedback(
+                **params, response=Response(), current_user=user.model_copy(update={"updated_at": datetime(2024, 11, 20)})
+            )
+            await asyncio.sleep(0.05)  # The tasks are now waiting on the upload jobs
+            uploaded.set()
+            await tasks.join()
+        status = await main.get_task(first["task_id"], current_user=user)
+        try:
+            await main.get_task(first["task_id"], current_user=user.model_copy(update={"id": uuid4()}))
+        except HTTPException as e:
+            other_user = e.status_code
+        # A job missing from the saved jobs table still returns the generated feedback
+        mock_conn.cursor.return_value.rowcount = 0
+        unsaved = await main.generate_feedback(**{**params, "job_id": "43"}, response=Response(), current_user=user)
+        await tasks.join()
+        return first, repeat, reuploaded, status, other_user, await main.get_task(unsaved["task_id"], current_user=user)
+
+    with patch("FastAPI_Services.main.feedback_cache", PersistentCache(str(tmp_path / "feedback.sqlite3"), "test")), \
+            patch("FastAPI_Services.main.document_text_cache", PersistentCache(str(tmp_path / "documents.sqlite3"), "test")), \
+            patch("FastAPI_Services.main.feedback_tasks", tasks), \
+            patch("FastAPI_Services.main.get_user_results_db_connection", return_value=mock_conn), \
+            patch("FastAPI_Services.main.requests.get", return_value=MagicMock(status_code=404)), \
+            patch("FastAPI_Services.main.llm_gateway", mock_gateway):
+        first, repeat, reuploaded, status, other_user, unsaved = asyncio.run(scenario())
+
+    assert first["deduplicated"] is False and repeat == {**first, "deduplicated": True}
+    assert reuploaded["task_id"] != first["task_id"] and reuploaded["deduplicated"] is False
+    assert status["status"] == "completed", status["error"]
+    assert status["result"]["feedback"] == "Looks good" and status["result"]["saved"] is True
+    assert "Python data engineer" in str(mock_gateway.complete.call_args_list[0])
+    update_query, update_params = mock_conn.cursor.return_value.execute.call_args_list[0][0]
+    assert "SET feedback" in update_query and update_params == {"job_id": "42", "feedback": "Looks good"}
+    assert other_user == 404
+    assert unsaved["status"] == "completed" and unsaved["result"]["saved"] is False
+    assert unsaved["result"]["feedback"] == "Looks good"
+    assert tasks.stats()["deduplicated"] == 1
+
+def test_metrics_require_the_operator_token():
+    with patch("FastAPI_Services.main.METRICS_TOKEN", "operator-secret"):
+        missing = client.get("/metrics/executors")
+        wrong = client.get("/metrics/llm", headers={"X-Metrics-Token": "guess"})
+        allowed = client.get("/metrics/executors", headers={"X-Metrics-Token": "operator-secret"})
+    with patch("FastAPI_Services.main.METRICS_TOKEN", None):
+        disabled = client.get("/metrics/executors", headers={"X-Metrics-Token": ""})
+    assert missing.status_code == wrong.status_code == disabled.status_code == 403
+    assert allowed.status_code == 200 and "snowflake" in allowed.json()
@@ -26,3 +26,568 @@ def test_create_access_token_expiry():
     # Attempt to decode the token and expect an ExpiredSignatureError
     with pytest.raises(ExpiredSignatureError):
         jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+from unittest.mock import MagicMock, patch
+from FastAPI_Services.snowflake_pool import SnowflakeConnectionPool, PoolTimeoutError
+
+def make_pool(**kwargs):
+    factory = MagicMock(side_effect=lambda: MagicMock(is_closed=MagicMock(return_value=False)))
+    return SnowflakeConnectionPool("test", factory, **kwargs), factory
+
+def test_pool_reuses_released_connection():
+    pool, factory = make_pool(max_size=2)
+    conn = pool.acquire()
+    raw = conn._entry.conn
+    conn.close()
+    again = pool.acquire()
+    assert again._entry.conn is raw
+    assert factory.call_count == 1
+    raw.close.assert_not_called()
+
+def test_pool_times_out_when_exhausted():
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["utilisation"] == 1.0
+
+def test_pool_recycles_idle_and_closed_connections():
+    pool, factory = make_pool(max_size=2, idle_timeout=0)
+    conn = pool.acquire()
+    raw = conn._entry.conn
+    conn.close()
+    time.sleep(0.01)
+    pool.acquire()
+    raw.close.assert_called_once()
+    assert factory.call_count == 2
+    assert pool.stats()["recycled"] == 1
+
+def test_pool_discards_connections_that_raised_during_a_query():
+    from snowflake.connector.errors import DatabaseError, OperationalError
+    pool, factory = make_pool(max_size=2, discard_on=(DatabaseError,))
+    conn = pool.acquire()
+    raw = conn._entry.conn
+    raw.cursor.return_value.execute.side_effect = OperationalError("connection reset")
+    cur = conn.cursor()
+    with pytest.raises(OperationalError):
+        cur.execute("SELECT 1")
+    cur.close()
+    conn.close()
+    raw.close.assert_called_once()
+    assert pool.stats()["discarded"] == 1 and pool.stats()["idle"] == 0
+
+    # Errors the pool was not told about leave the connection reusable
+    healthy = pool.acquire()
+    healthy._entry.conn.commit.side_effect = ValueError("not a database error")
+    with pytest.raises(ValueError):
+        healthy.commit()
+    healthy.close()
+    assert pool.acquire()._entry.conn is healthy._entry.conn
+    assert factory.call_count == 2
+
+import asyncio
+import numpy as np
+from FastAPI_Services.executors import ResourceExecutors
+
+def test_executors_run_blocking_calls_concurrently():
+    executors = ResourceExecutors({"http": 4, "cpu": 1})
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(executors.run("http", time.sleep, 0.2) for _ in range(4)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    executors.shutdown()
+    assert elapsed < 0.6
+    stats = executors.stats()
+    assert stats["http"]["completed"] == 4
+    assert stats["cpu"]["submitted"] == 0
+
+def test_executors_reject_unknown_kind():
+    executors = ResourceExecutors({"cpu": 1})
+    with pytest.raises(ValueError):
+        asyncio.run(executors.run("gpu", len, []))
+
+def test_process_pool_limits_task_types_and_times_out():
+    from FastAPI_Services.process_pool import ManagedProcessPool, TaskTimeoutError
+    pool = ManagedProcessPool(2, {"document": 1, "password": 2}, {"document": 0.5})
+    pool.start()
+
+    async def run():
+        await pool.run("password", len, [])  # Wait for the workers to spawn
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.run("document", time.sleep, 0.2) for _ in range(2)))
+        serialized = time.perf_counter() - start
+        with pytest.raises(TaskTimeoutError):
+            await pool.run("document", time.sleep, 2)
+        return serialized
+
+    try:
+        assert asyncio.run(run()) >= 0.4  # One document task at a time
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run("gpu", len, []))
+        stats = pool.stats()["tasks"]
+        assert stats["document"]["completed"] == 2 and stats["document"]["timed_out"] == 1
+        assert stats["password"] == {**stats["password"], "submitted": 1, "queued": 0, "limit": 2}
+    finally:
+        pool.shutdown(wait=False)
+
+from FastAPI_Services.caching import TTLCache
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+def test_ttl_cache_invalidate_where():
+    cache = TTLCache()
+    cache.set(("alice", 1), "x")
+    cache.set(("alice", 2), "y")
+    cache.set(("bob", 1), "z")
+    assert cache.invalidate_where(lambda key: key[0] == "alice") == 2
+    assert len(cache) == 1
+
+def test_search_workflow_is_compiled_once():
+    from FastAPI_Services.main import get_search_workflow
+    assert get_search_workflow() is get_search_workflow()
+
+def test_write_sql_query_uses_schema_map():
+    from FastAPI_Services.main import write_sql_query
+    state = write_sql_query({"parsed_query": {"role": ["data engineer"], "job": ["data engineering"], "location": ["Boston"]}})
+    assert "SEARCH_QUERY ILIKE %(term_0)s OR SEARCH_QUERY ILIKE %(term_1)s" in state["sql"]
+    assert "LOCATION ILIKE %(term_2)s" in state["sql"]
+    assert state["sql_params"] == {"term_0": "%data engineer%", "term_1": "%data engineering%", "term_2": "%Boston%"}
+
+def test_write_sql_query_pages_with_keyset_cursor():
+    from FastAPI_Services.main import write_sql_query, encode_search_cursor, decode_search_cursor, SEARCH_MAX_LIMIT
+    cursor = decode_search_cursor(encode_search_cursor("2024-11-19", "job-42"))
+    state = write_sql_query({"parsed_query": {}, "limit": 10_000, "cursor": cursor})
+    assert state["limit"] == SEARCH_MAX_LIMIT
+    assert state["sql"].endswith(f"ORDER BY POSTED_DATE DESC NULLS LAST, JOB_ID ASC LIMIT {SEARCH_MAX_LIMIT + 1}")
+    assert state["sql_params"] == {"cursor_job_id": "job-42", "cursor_posted_date": "2024-11-19"}
+    assert state["count_sql"] == "SELECT COUNT(*) FROM JOBLISTINGS"
+
+def test_resolve_projection_summary_and_required_columns():
+    from FastAPI_Services.main import resolve_projection, LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS
+    summary = resolve_projection(None, LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS)
+    assert "DESCRIPTION" not in summary and "JOB_ID" in summary
+    assert resolve_projection("all", LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS) == LISTING_COLUMNS
+    projection = resolve_projection("title, company", LISTING_COLUMNS, LISTING_SUMMARY_COLUMNS,
+                                    required_columns=("JOB_ID", "POSTED_DATE"))
+    assert projection == ["TITLE", "COMPANY", "JOB_ID", "POSTED_DATE"]
+
+def test_execute_query_returns_next_cursor_when_more_rows():
+    from FastAPI_Services import main
+    mock_cursor = MagicMock()
+    mock_cursor.description = [("JOB_ID",), ("POSTED_DATE",)]
+    mock_cursor.fetchall.return_value = [("a", "2024-11-20"), ("b", "2024-11-19"), ("c", "2024-11-19")]
+    mock_cursor.fetchone.return_value = (57,)
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    with patch.object(main, "get_snowflake_joblistings_connection", return_value=mock_conn):
+        state = main.write_sql_query({"parsed_query": {"location": ["Boston"]}, "limit": 2, "cursor": None})
+        state = main.execute_query(state)
+    assert len(state["results"]) == 2
+    assert main.decode_search_cursor(state["next_cursor"]) == {"posted_date": "2024-11-19", "job_id": "b"}
+    assert state["total_estimate"] == 57
+
+from FastAPI_Services.caching import PersistentCache
+
+def test_persistent_cache_survives_restart_and_versions(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = PersistentCache(path, version="v1")
+    cache.set("data engineer jobs in boston", {"role": ["data engineer"]})
+    cache.close()
+
+    reopened = PersistentCache(path, version="v1")
+    assert reopened.get("data engineer jobs in boston") == {"role": ["data engineer"]}
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
+
+    bumped = PersistentCache(path, version="v2")
+    assert bumped.get("data engineer jobs in boston") is None
+
+def test_persistent_cache_evicts_least_recently_used_past_byte_budget(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite3"), version="v1", max_memory_entries=1, max_disk_bytes=250)
+    for key in "abc":
+        cache.set(key, {"feedback": key * 100})
+        time.sleep(0.01)
+    # Each value is ~117 bytes of JSON, so only the two most recent fit
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 250 and stats["max_disk_bytes"] == 250
+    assert cache.get("a") is None
+    assert cache.get("b") == {"feedback": "b" * 100}
+    cache.close()
+
+def test_task_queue_limits_workers_and_fails_only_orphaned_tasks(tmp_path):
+    import asyncio
+    import sqlite3
+    from FastAPI_Services.task_queue import TaskQueue
+
+    path = str(tmp_path / "tasks.sqlite3")
+    tasks = TaskQueue(path, workers=1)
+    active = []
+
+    async def job(value):
+        active.append(value)
+        await asyncio.sleep(0.01)
+        assert active == [value]  # One worker: jobs never overlap
+        active.remove(value)
+        if value is None:
+            raise ValueError("no value")
+        return {"value": value}
+
+    async def scenario():
+        ids = [tasks.submit("test", job, value, owner="u1")[0] for value in (1, None, 2)]
+        await asyncio.sleep(0)
+        assert tasks.stats()["tasks"] == {"running": 1, "queued": 2}
+        await tasks.join()
+        return ids
+
+    done, failed, _ = asyncio.run(scenario())
+    assert tasks.get(done)["status"] == "completed" and tasks.get(done)["result"] == {"value": 1}
+    assert tasks.get(failed)["status"] == "failed" and tasks.get(failed)["error"] == "no value"
+
+    # Pending rows of a live sibling process survive a new process starting; a dead one's don't
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE tasks SET status = 'queued', instance = ? WHERE id = ?", (tasks.instance, done))
+        db.execute("UPDATE tasks SET status = 'running', instance = ? WHERE id = ?",
+                   (tasks.instance.rsplit(":", 1)[0] + ":999999999", failed))
+    reopened = TaskQueue(path, workers=1)
+    assert reopened.get(done)["status"] == "queued"
+    assert reopened.get(failed)["status"] == "failed" and reopened.stats()["interrupted"] == 1
+    # Shutting down fails the pending rows this process owns
+    tasks.shutdown()
+    assert reopened.get(done)["status"] == "failed"
+
+def test_parse_natural_query_skips_llm_on_cache_hit():
+    from FastAPI_Services import main
+    main.parsed_query_cache.set("remote sre jobs in austin", {"role": ["devops engineer"], "location": ["Austin"]})
+    with patch.object(main, "llm_gateway") as mock_gateway:
+        state = main.parse_natural_query({"natural_query": "  Remote SRE jobs in Austin? "})
+    mock_gateway.complete.assert_not_called()
+    assert state["parsed_query"] == {"role": ["devops engineer"], "location": ["Austin"]}
+
+def test_rule_parser_handles_role_and_location():
+    from FastAPI_Services.main import rule_query_parser
+    parsed = rule_query_parser.parse("Show me ML engineer jobs at Google in New York, NY.")
+    assert parsed["role"] == ["machine learning engineer", "ML engineer"]
+    assert parsed["company"] == ["Google"]
+    assert parsed["location"] == ["New York, NY"]
+
+def test_rule_parser_falls_back_on_ambiguous_queries():
+    from FastAPI_Services.main import rule_query_parser
+    assert rule_query_parser.parse("senior software engineer jobs in Boston") is None
+    assert rule_query_parser.parse("product manager jobs") is None
+    assert rule_query_parser.parse("data scientist jobs posted last week") is None
+
+def test_listings_snapshot_search_matches_sql_order_and_paging():
+    from FastAPI_Services.listings_snapshot import ListingsSnapshot
+    rows = [
+        ("3", "Data Engineer", "Boston, MA", None),
+        ("2", "Data Engineer", "Boston, MA", "2024-11-19"),
+        ("1", "Data Analyst", "Austin, TX", "2024-11-19"),
+        ("4", "Data Engineer", "Boston, MA", "2024-11-20"),
+    ]
+    snapshot = ListingsSnapshot("v1", ["JOB_ID", "TITLE", "LOCATION", "POSTED_DATE"], rows, ["TITLE", "LOCATION"])
+    assert [r["JOB_ID"] for r in snapshot.rows] == ["4", "1", "2", "3"]
+
+    filters = {"TITLE": ["engineer"], "LOCATION": ["boston", "chicago"]}
+    page, has_more, total = snapshot.search(filters, limit=2, count=True)
+    assert [r["JOB_ID"] for r in page] == ["4", "2"] and has_more and total == 3
+    cursor = {"posted_date": "2024-11-19", "job_id": "2"}
+    page, has_more, total = snapshot.search(filters, limit=2, cursor=cursor)
+    assert [r["JOB_ID"] for r in page] == ["3"] and not has_more and total is None
+
+def test_listings_snapshot_store_skips_unchanged_and_swaps_atomically():
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+    versions = iter(["v1", "v1", "v2"])
+    load_rows = MagicMock(side_effect=[(["JOB_ID"], [("1",)]), (["JOB_ID"], [("1",), ("2",)])])
+    store = ListingsSnapshotStore(lambda: next(versions), load_rows, ["JOB_ID"])
+    assert store.current() is None
+    assert store.refresh() is True
+    first = store.current()
+    assert store.refresh() is False
+    assert store.refresh() is True
+    assert len(first) == 1 and len(store.current()) == 2
+    assert store.stats()["unchanged"] == 1 and store.stats()["version"] == "v2"
+
+def test_execute_query_serves_from_snapshot_without_snowflake():
+    from FastAPI_Services import main
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+    rows = [("1", "Data Engineer", "Boston, MA", "2024-11-19"), ("2", "Nurse", "Boston, MA", "2024-11-19")]
+    store = ListingsSnapshotStore(
+        lambda: "v1", lambda: (["JOB_ID", "TITLE", "LOCATION", "POSTED_DATE"], rows), ["TITLE", "LOCATION"]
+    )
+    store.refresh()
+    state = main.write_sql_query({"parsed_query": {"title": ["engineer"]}, "limit": 5, "cursor": None,
+                                  "select_columns": ["JOB_ID", "TITLE", "POSTED_DATE"]})
+    with patch.object(main, "listings_snapshot", store), \
+            patch.object(main, "get_snowflake_joblistings_connection") as mock_connection:
+        state = main.execute_query(state)
+    mock_connection.assert_not_called()
+    assert state["results"].to_dict(orient="records") == [{"JOB_ID": "1", "TITLE": "Data Engineer", "POSTED_DATE": "2024-11-19"}]
+    assert state["total_estimate"] == 1 and state["next_cursor"] is None
+
+def test_bm25_index_ranks_by_field_weight_and_filters():
+    from FastAPI_Services.search_index import BM25Index, tokenize
+    assert tokenize("Senior Data Engineers, C++ & AWS") == ["senior", "data", "engineer", "c++", "aws"]
+    documents = [
+        {"TITLE": "Nurse", "DESCRIPTION": "Work with data engineers", "COMPANY": "Mercy", "LOCATION": "Boston, MA"},
+        {"TITLE": "Data Engineer", "DESCRIPTION": "Build pipelines", "COMPANY": "Acme", "LOCATION": "Boston, MA"},
+        {"TITLE": "Data Engineer", "DESCRIPTION": "Build pipelines", "COMPANY": "Acme", "LOCATION": "Austin, TX"},
+        {"TITLE": "Accountant", "DESCRIPTION": "Ledgers", "COMPANY": "Acme", "LOCATION": "Boston, MA"},
+    ]
+    index = BM25Index.build(documents)
+    doc_ids, scores, total = index.search("data engineer", k=10)
+    assert list(doc_ids[:2]) == [1, 2] and total == 3
+    assert scores[0] > scores[-1] > 0
+    doc_ids, _, total = index.search("data engineer", k=1, filters={"LOCATION": ["boston, ma"]})
+    assert list(doc_ids) == [1] and total == 2
+    doc_ids, _, total = index.search("", k=10, filters={"COMPANY": ["acme"], "LOCATION": ["Boston"]})
+    assert list(doc_ids) == [1, 3]
+
+def test_execute_query_ranks_with_bm25_and_pages_by_offset():
+    from FastAPI_Services import main
+    from FastAPI_Services.listings_snapshot import ListingsSnapshotStore
+    columns = ["JOB_ID", "SEARCH_QUERY", "TITLE", "COMPANY", "LOCATION", "DESCRIPTION", "POSTED_DATE"]
+    rows = [
+        ("1", "nurse", "Nurse", "Mercy", "Boston", "Partner with data engineers", "2024-11-20"),
+        ("2", "data engineer", "Data Engineer", "Acme", "Boston", "Spark pipelines", "2024-11-19"),
+        ("3", "data engineer", "Senior Data Engineer", "Acme", "Boston", "Data engineer for data pipelines", "2024-11-18"),
+    ]
+    store = ListingsSnapshotStore(lambda: "v1", lambda: (columns, rows), ["TITLE"],
+                                  index_builders={"bm25": lambda snapshot: main.BM25Index.build(snapshot.rows)})
+    store.refresh()
+    state = main.write_sql_query({"parsed_query": {"role": ["data engineer"], "location": ["Boston"]},
+                                  "mode": "bm25", "limit": 2, "cursor": None, "select_columns": ["JOB_ID"]})
+    with patch.object(main, "listings_snapshot", store):
+        first = main.execute_query(dict(state))
+        second = main.execute_query({**state, "cursor": main.decode_search_cursor(first["next_cursor"])})
+    assert list(first["results"]["JOB_ID"]) == ["3", "2"]
+    assert first["total_estimate"] == 3
+    assert list(second["results"]["JOB_ID"]) == ["1"] and second["next_cursor"] is None
+
+def test_facet_index_lists_selected_values_outside_limit_with_real_counts():
+    from FastAPI_Services.facet_index import FacetIndex
+    rows = ([{"COMPANY": "A", "LOCATION": "NY"}] * 5 + [{"COMPANY": "B", "LOCATION": "SF"}] * 4
+            + [{"COMPANY": "C", "LOCATION": "SF"}] * 3)
+    index = FacetIndex.build(rows, fields=("COMPANY", "LOCATION"))
+    mask, facets = index.select({"COMPANY": ["C"], "LOCATION": ["NY"]}, limit=2)
+    assert int(mask.sum()) == 0
+    # C is outside the top 2 and excluded by LOCATION=NY; LOCATION is counted under COMPANY=C only
+    assert facets["COMPANY"] == [{"value": "A", "count": 5}, {"value": "C", "count": 0}]
+    assert facets["LOCATION"] == [{"value": "SF", "count": 3}, {"value": "NY", "count": 0}]
+    _, facets = index.select({"COMPANY": ["C"]}, limit=2)
+    assert facets["COMPANY"][-1] == {"value": "C", "count": 3}
+
+def test_highlight_terms_counted_under_a_mask_and_in_sql():
+    from FastAPI_Services import main
+    from FastAPI_Services.analytics import HighlightTermIndex
+    rows = [{"JOB_HIGHLIGHTS": "Python, SQL and Python"}, {"JOB_HIGHLIGHTS": None}, {"JOB_HIGHLIGHTS": "C++ or C#; SQL"}]
+    index = HighlightTermIndex.build(rows)
+    # Stopwords ("and", "or") are dropped; equal counts rank alphabetically
+    assert index.counts(top_n=2) == [{"value": "python", "count": 2}, {"value": "sql", "count": 2}]
+    assert index.counts(np.array([False, True, True])) == [
+        {"value": "c#", "count": 1}, {"value": "c++", "count": 1}, {"value": "sql", "count": 1}
+    ]
+    assert index.stats()["tokens"] == 6
+
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [("python", 2)]
+    conn = MagicMock()
+    conn.cursor.return_value = cursor
+    result = main.highlight_terms_with_sql(conn, "JOBLISTINGS", {"COMPANY": ["Acme"]}, None, 50)
+    assert result == {"terms": [{"value": "python", "count": 2}], "source": "snowflake"}
+    sql, params = cursor.execute.call_args[0]
+    assert "FROM (SELECT JOB_HIGHLIGHTS FROM JOBLISTINGS WHERE COMPANY IN (%(company_0)s)) J" in sql
+    assert "REGEXP_SUBSTR_ALL(LOWER(J.JOB_HIGHLIGHTS)" in sql and sql.endswith("LIMIT 50")
+    assert params["company_0"] == "Acme" and "and" in params.values()
+    cursor.close.assert_called_once()
+
+def test_vector_index_finds_semantic_matches_and_blends_with_bm25():
+    from FastAPI_Services.search_index import BM25Index
+    from FastAPI_Services.vector_index import HashedNgramEmbedder, VectorIndex, hybrid_search
+    documents = [
+        {"TITLE": "ML Platform Engineer", "DESCRIPTION": "Build the ML platform for model training", "LOCATION": "Boston"},
+        {"TITLE": "Registered Nurse", "DESCRIPTION": "Patient care", "LOCATION": "Boston"},
+        {"TITLE": "Machine Learning Engineer", "DESCRIPTION": "Train and deploy models", "LOCATION": "Austin"},
+        {"TITLE": "Software Engineer", "DESCRIPTION": "Backend services in Go", "LOCATION": "Boston"},
+    ]
+    vectors = VectorIndex.build(documents, dim=128)
+    keywords = BM25Index.build(documents)
+    assert vectors.matrix.dtype == np.float32 and vectors.matrix.flags["C_CONTIGUOUS"]
+
+    doc_ids, scores, total = vectors.search("machine learning engineer", k=2)
+    assert list(doc_ids) == [2, 0] and total >= 2
+    restrict = lambda candidates: keywords.restrict(candidates, {"LOCATION": ["Boston"]})
+    doc_ids, _, _ = vectors.search("machine learning engineer", k=1, restrict=restrict)
+    assert list(doc_ids) == [0]
+    doc_ids, scores, _ = hybrid_search(keywords, vectors, "machine learning engineer", k=3, alpha=0.5)
+    assert doc_ids[0] == 2 and 1 not in doc_ids
+
+    # Query words are hashed per call, never added to the built index's word cache
+    vocabulary = len(vectors.embedder._word_index)
+    query = "kubernetes mlops engineer in boston"
+    scored = vectors.score(query)
+    assert len(vectors.embedder._word_index) == vocabulary
+    unfrozen = HashedNgramEmbedder(128, idf=vectors.embedder.idf)
+    np.testing.assert_allclose(scored, vectors.matrix @ unfrozen.embed(query), rtol=1e-5, atol=1e-6)
+
+def test_search_index_artifact_round_trips_and_is_memory_mapped(tmp_path):
+    from FastAPI_Services.index_artifact import artifact_id, load_artifact, write_artifact
+    from FastAPI_Services.listings_snapshot import ListingsSnapshot, ListingsSnapshotStore
+    from FastAPI_Services.search_index import BM25Index
+    from FastAPI_Services.vector_index import VectorIndex
+    columns = ["JOB_ID", "TITLE", "COMPANY", "LOCATION", "POSTED_DATE"]
+    rows = [("1", "Data Engineer", "Acme", "Boston, MA", "2024-11-18"),
+            ("2", "Machine Learning Engineer", "Globex", "Austin, TX", "2024-11-19"),
+            ("3", "Registered Nurse", "Acme", "Boston, MA", None)]
+    snapshot = ListingsSnapshot("v1", columns, rows, [])
+    bm25, vectors = BM25Index.build(snapshot.rows), VectorIndex.build(snapshot.rows, dim=64)
+    path = write_artifact(str(tmp_path), snapshot, bm25, vectors)
+    assert path.endswith(artifact_id("v1"))
+
+    load_rows = MagicMock()
+    build = MagicMock()
+    store = ListingsSnapshotStore(lambda: "v1", load_rows, ["TITLE"], index_builders={"bm25": build},
+                                  load_artifact=lambda version: load_artifact(path, ["TITLE"]))
+    assert store.refresh() is True
+    load_rows.assert_not_called()
+    build.assert_not_called()
+    loaded = store.current()
+    assert [row["JOB_ID"] for row in loaded.rows] == ["2", "1", "3"]
+    assert isinstance(loaded.indexes["bm25"].impacts, np.memmap)
+    assert isinstance(loaded.indexes["semantic"].matrix, np.memmap)
+    assert list(loaded.indexes["bm25"].search("engineer", 5, filters={"COMPANY": ["acme"]})[0]) == [1]
+    np.testing.assert_allclose(loaded.indexes["semantic"].score("machine learning"), vectors.score("machine learning"))
+    assert store.stats()["artifact_loads"] == 1
+
+def test_document_processing_normalizes_and_splits_sections():
+    from FastAPI_Services.document_processing import count_tokens, normalize_text, split_sections
+    text = normalize_text("Jane  Doe\r\nData engi-\nneer\n\n\n\nTECHNICAL SKILLS:\n• Python\n▪ ﬁne-tuning\n"
+                          "Work Experience\nAcme   Corp\nEducation & Training\nBSc\nSkills\nSQL")
+    assert text.startswith("Jane Doe\nData engineer\n\nTECHNICAL SKILLS:\n- Python\n- fine-tuning")
+    sections = split_sections(text)
+    assert list(sections) == ["header", "skills", "experience", "education"]
+    assert sections["skills"] == "- Python\n- fine-tuning\n\nSQL"
+    assert sections["experience"] == "Acme Corp"
+    assert count_tokens(sections["experience"]) > 0
+
+def test_count_tokens_retries_loading_the_encoding_after_a_failure():
+    import tiktoken
+    from FastAPI_Services import document_processing
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2]
+    with patch.object(document_processing, "_encoding", None), \
+            patch.object(document_processing, "_encoding_failed_at", None), \
+            patch.object(document_processing.time, "monotonic", return_value=1000.0) as clock, \
+            patch.object(tiktoken, "get_encoding", side_effect=[OSError("offline"), encoding]) as get_encoding:
+        assert document_processing.count_tokens("data engineer, Python") == 4
+        assert document_processing.count_tokens("data engineer") == 2
+        assert get_encoding.call_count == 1
+        clock.return_value += document_processing.TOKENIZER_RETRY_SECONDS
+        assert document_processing.count_tokens("data engineer") == 2
+        assert get_encoding.call_count == 2 and encoding.encode.called
+
+def test_prompt_budget_keeps_relevant_passages_within_budget():
+    from FastAPI_Services.document_processing import count_tokens
+    from FastAPI_Services.prompt_budget import OMISSION, PromptBudget
+    resume = ("Summary\nData engineer with 6 years building pipelines.\n\nSkills\nPython, SQL, Spark, Airflow, Snowflake\n\n"
+              "Hobbies\nPainting, hiking, chess and baking sourdough bread every weekend with friends and family.\n\n"
+              "Education\nBSc Computer Science")
+    budget = PromptBudget(40, {"resume": 0.8, "highlights": 0.2})
+    fitted, report = budget.fit({"resume": resume, "highlights": "Airflow"}, {"resume": "Snowflake Airflow data pipelines"})
+    assert fitted["highlights"] == "Airflow"
+    assert "Airflow, Snowflake" in fitted["resume"] and "sourdough" not in fitted["resume"]
+    assert OMISSION in fitted["resume"] and fitted["resume"].index("Summary") < fitted["resume"].index("Skills")
+    assert report["resume"]["tokens"] == count_tokens(fitted["resume"]) <= 40 - report["highlights"]["tokens"]
+    assert budget.fit({"resume": resume}, {}, reserved=-1000)[0] == {"resume": resume}
+
+def test_llm_gateway_against_openai_compatible_stub():
+    import json
+    import threading
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from FastAPI_Services.llm_gateway import LLMGateway, chat_messages
+    from langchain.prompts import ChatPromptTemplate
+
+    seen, ports = Counter(), []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body, content_type="application/json", headers=()):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            assert self.path == "/v1/chat/completions"
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = request["messages"][-1]["content"]
+            seen[prompt] += 1
+            ports.append(self.client_address[1])
+            if prompt == "flaky" and seen[prompt] == 1:
+                return self.reply(429, '{"error": "rate limited"}', headers=[("Retry-After", "0")])
+            if prompt == "slow" and seen[prompt] == 1:
+                time.sleep(1.0)
+            if request.get("stream"):
+                events = [{"choices": [{"delta": {"content": word}}]} for word in ("Hello", " there")]
+                events.append({"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}})
+                body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+                return self.reply(200, body, content_type="text/event-stream")
+            self.reply(200, json.dumps({
+                "model": request["model"],
+                "choices": [{"message": {"role": "assistant", "content": f"echo {prompt}"}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 2},
+            }))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.handle_error = lambda request, client_address: None  # Clients closing kept-alive sockets
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    messages = lambda text: chat_messages(ChatPromptTemplate.from_messages([("user", "{text}")]).format_messages(text=text))
+    gateway = LLMGateway(base_url, "sk-test", max_concurrency=2, requests_per_minute=600, backoff_base=0.01)
+    hedging = LLMGateway(base_url, "sk-test", hedge_after=0.1)
+    try:
+        assert gateway.complete(messages("hi"), model="gpt-4o-mini").content == "echo hi"
+        assert gateway.complete(messages("flaky"), model="gpt-4o-mini").content == "echo flaky"
+        assert list(gateway.stream(messages("stream"), model="gpt-4o-mini")) == ["Hello", " there"]
+        assert len(set(ports)) == 1  # One kept-alive connection for sequential calls
+
+        start = time.perf_counter()
+        result = hedging.complete(messages("slow"), model="gpt-4o-mini")
+        assert result.content == "echo slow" and result.hedged
+        assert time.perf_counter() - start < 0.9
+    finally:
+        gateway.close()
+        hedging.close()
+        server.shutdown()
+
+    stats = gateway.stats()["models"]["gpt-4o-mini"]
+    assert stats["requests"] == 3 and stats["retries"] == 1 and stats["failed"] == 0 and stats["in_flight"] == 0
+    assert stats["prompt_tokens"] == 5 + 5 + 3 and stats["completion_tokens"] == 2 + 2 + 2
+    assert stats["latency_ms"]["p50"] is not None and stats["first_token_ms"]["max"] is not None
+    assert hedging.stats()["models"]["gpt-4o-mini"]["hedge_wins"] == 1